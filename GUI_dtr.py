@@ -1,184 +1,25 @@
+import argparse
 import datetime
 import calendar
-from datetime import timedelta
+import functools
+import itertools
 import tkinter as tk
 from tkinter import ttk, messagebox
-import json
-import os
+from dtr_core import DTR
+from dtr_profile import enable_from_env, span
+from dtr_storage import ConflictError, ShardedStore
+from dtr_table import VirtualTable
+from dtr_worker import BackgroundWorker
 
-class DTR:
-    def __init__(self, month=None, year=None):
-        # Set default to current month and year if not provided
-        today = datetime.datetime.now()
-        self.month = month if month else today.month
-        self.year = year if year else today.year
-        
-        self.data_file = f"dtr_data_{self.year}.json"
-        self.logs = self.load_data()
-    
-    def load_data(self):
-        """Load time records from JSON file or create empty structure"""
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r') as f:
-                data = json.load(f)
-                # Convert string keys back to integers for the month we're viewing
-                month_key = str(self.month)
-                if month_key in data:
-                    return {int(day): value for day, value in data[month_key].items()}
-                return {}
-        else:
-            return {}
-    
-    def save_data(self):
-        """Save time records to JSON file"""
-        # Load existing data first to avoid overwriting other months
-        all_data = {}
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r') as f:
-                all_data = json.load(f)
-        
-        # Convert int keys to strings for JSON compatibility
-        month_key = str(self.month)
-        all_data[month_key] = {str(day): entries for day, entries in self.logs.items()}
-        
-        with open(self.data_file, 'w') as f:
-            json.dump(all_data, f, indent=2)
-    
-    def parse_time(self, t):
-        """Parse time strings in 12-hour format."""
-        try:
-            return datetime.datetime.strptime(t, "%I:%M %p")
-        except ValueError:
-            return None
-
-    def validate_time_entry(self, start, end):
-        """Validate time entries to ensure they make logical sense"""
-        start_dt = self.parse_time(start)
-        end_dt = self.parse_time(end)
-        
-        if not start_dt or not end_dt:
-            return False, "Invalid time format. Use '12:00 am/pm' format."
-        
-        if end_dt <= start_dt:
-            return False, "End time must be after start time."
-            
-        return True, ""
+# Edits are written once no further edit has come in for this long
+SAVE_DELAY_MS = 500
 
-    def add_time_entry(self, day, start_time, end_time):
-        """Add a time entry for a specific day with validation"""
-        # Ensure day is within valid range for the month
-        days_in_month = calendar.monthrange(self.year, self.month)[1]
-        if not 1 <= day <= days_in_month:
-            return False, f"Invalid day. Must be between 1 and {days_in_month}."
-        
-        valid, message = self.validate_time_entry(start_time, end_time)
-        if not valid:
-            return False, message
-        
-        # Initialize the day entry if it doesn't exist
-        if day not in self.logs:
-            self.logs[day] = []
-        
-        self.logs[day].append((start_time, end_time))
-        self.save_data()
-        return True, "Entry added successfully."
-
-    def delete_time_entry(self, day, index):
-        """Delete a specific time entry"""
-        if day in self.logs and 0 <= index < len(self.logs[day]):
-            self.logs[day].pop(index)
-            self.save_data()
-            return True, "Entry deleted successfully."
-        return False, "Entry not found."
-
-    def calculate_hours(self):
-        """Calculate total hours worked and generate daily breakdown."""
-        total_minutes = 0
-        daily_hours = {}
-        
-        days_in_month = calendar.monthrange(self.year, self.month)[1]
-        for day in range(1, days_in_month + 1):
-            day_minutes = 0
-            if day in self.logs and self.logs[day]:
-                for start, end in self.logs[day]:
-                    start_dt = self.parse_time(start)
-                    end_dt = self.parse_time(end)
-                    if start_dt and end_dt and end_dt > start_dt:
-                        diff = end_dt - start_dt
-                        minutes = diff.total_seconds() / 60
-                        day_minutes += minutes
-                
-                daily_hours[day] = round(day_minutes / 60, 2)
-                total_minutes += day_minutes
-            else:
-                daily_hours[day] = 0
-        
-        total_hours = round(total_minutes / 60, 2)
-        return total_hours, daily_hours
-
-    def load_all_data(self):
-        """Load all available data across all months for the year"""
-        all_data = {}
-        if os.path.exists(self.data_file):
-            with open(self.data_file, 'r') as f:
-                all_data = json.load(f)
-        return all_data
-    
-    def calculate_all_hours(self):
-        """Calculate total hours across all months for the year"""
-        all_data = self.load_all_data()
-        total_minutes = 0
-        months_data = {}
-        
-        for month_key, month_data in all_data.items():
-            month_minutes = 0
-            month_num = int(month_key)
-            
-            for day_key, entries in month_data.items():
-                day_minutes = 0
-                
-                for start, end in entries:
-                    start_dt = self.parse_time(start)
-                    end_dt = self.parse_time(end)
-                    if start_dt and end_dt and end_dt > start_dt:
-                        diff = end_dt - start_dt
-                        minutes = diff.total_seconds() / 60
-                        day_minutes += minutes
-                
-                month_minutes += day_minutes
-            
-            months_data[month_num] = round(month_minutes / 60, 2)
-            total_minutes += month_minutes
-        
-        total_hours = total_minutes / 60
-        hours = int(total_hours)
-        minutes = int((total_hours - hours) * 60)
-        
-        return hours, minutes, months_data
-
-    def generate_report(self):
-        """Generate a summary report of worked hours."""
-        total_hours, daily_hours = self.calculate_hours()
-        month_name = calendar.month_name[self.month]
-        days_in_month = calendar.monthrange(self.year, self.month)[1]
-        
-        report = []
-        report.append(f"Daily Time Record Summary for {month_name} {self.year}")
-        report.append(f"================================================")
-        
-        for day in range(1, days_in_month + 1):
-            if day in self.logs and self.logs[day]:
-                day_sessions = []
-                for start, end in self.logs[day]:
-                    day_sessions.append(f"{start} - {end}")
-                sessions_str = ", ".join(day_sessions)
-                report.append(f"Day {day}: {daily_hours[day]} hours ({sessions_str})")
-        
-        report.append(f"================================================")
-        report.append(f"Total hours worked: {total_hours}")
-        
-        return report, total_hours
+# Report lines inserted per pass of the Tk loop, so long reports fill in
+# gradually instead of freezing the window in one huge insert
+REPORT_CHUNK_LINES = 200
 
+# Status bar text for work running in the background, most important first
+STATUS_TEXT = {"saving": "Saving\u2026", "loading": "Loading\u2026", "computing": "Computing\u2026"}
 
 class DTRApp:
     def __init__(self, root):
@@ -203,9 +44,25 @@ class DTRApp:
         self.current_month = today.month
         self.current_year = today.year
         
-        self.dtr = DTR(self.current_month, self.current_year)
+        # One store for the whole session so journals and totals are reused across switches
+        self.store = ShardedStore(journaled=True)
+        self.dtr = DTR(self.current_month, self.current_year, store=self.store, autosave=False)
+        
+        # Saves, loads and reports run on a worker thread so slow disks don't freeze the window
+        self.worker = BackgroundWorker(self.root)
+        self.busy = dict.fromkeys(STATUS_TEXT, 0)
+        self._save_timer = None
+        # DTRs whose last save failed, possibly for a month no longer shown
+        self.failed_saves = []
+        # The Report and Total Hours tabs are only computed when shown
+        self.stale = {"report": True, "totals": True}
+        # Identifies the report being inserted; a newer one stops it
+        self._report_job = None
+        # (day, Entry) behind each row of the entries table when last shown
+        self._entry_rows = {}
         
         self.setup_ui()
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
     
     def setup_ui(self):
         # Main frame with padding
@@ -246,6 +103,11 @@ class DTRApp:
         ttk.Button(button_frame, text="Total Hours", 
                   command=self.show_total_hours).pack(side=tk.LEFT, padx=5)
         
+        # Shows what is running in the background
+        self.status_var = tk.StringVar()
+        ttk.Label(header_frame, textvariable=self.status_var, style='Stats.TLabel',
+                  width=12).grid(row=1, column=5, padx=5)
+        
         # Add a notebook/tab control for different views
         self.notebook = ttk.Notebook(main_frame)
         self.notebook.pack(expand=True, fill=tk.BOTH, padx=5, pady=10)
@@ -258,6 +120,7 @@ class DTRApp:
         self.notebook.add(self.data_entry_tab, text="Data Entry")
         self.notebook.add(self.report_tab, text="Monthly Report")
         self.notebook.add(self.total_hours_tab, text="Total Hours")
+        self.notebook.bind("<<NotebookTabChanged>>", self.on_tab_changed)
         
         # Set up the data entry tab
         self.setup_data_entry_tab()
@@ -293,7 +156,8 @@ class DTRApp:
         button_frame = ttk.Frame(entry_frame)
         button_frame.grid(row=3, column=0, columnspan=3, pady=10)
         
-        ttk.Button(button_frame, text="Add Entry", command=self.add_entry).pack(side=tk.LEFT, padx=5)
+        self.add_button = ttk.Button(button_frame, text="Add Entry", command=self.add_entry)
+        self.add_button.pack(side=tk.LEFT, padx=5)
         ttk.Button(button_frame, text="Clear", command=self.clear_entry_fields).pack(side=tk.LEFT, padx=5)
         
         # Display current entries
@@ -314,9 +178,9 @@ class DTRApp:
         self.tree.column("end_time", width=150)
         self.tree.column("duration", width=100)
         
-        # Add a scrollbar
-        scrollbar = ttk.Scrollbar(display_frame, orient=tk.VERTICAL, command=self.tree.yview)
-        self.tree.configure(yscroll=scrollbar.set)
+        # Add a scrollbar; the table drives it so only visible rows are in the tree
+        scrollbar = ttk.Scrollbar(display_frame, orient=tk.VERTICAL)
+        self.entries_table = VirtualTable(self.tree, scrollbar)
         
         # Pack the tree and scrollbar
         self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -325,8 +189,9 @@ class DTRApp:
         # Button to delete selected entry
         button_frame = ttk.Frame(display_frame)
         button_frame.pack(fill=tk.X, pady=5)
-        ttk.Button(button_frame, text="Delete Selected", 
-                  command=self.delete_selected_entry).pack(side=tk.LEFT, padx=5)
+        self.delete_button = ttk.Button(button_frame, text="Delete Selected",
+                                        command=self.delete_selected_entry)
+        self.delete_button.pack(side=tk.LEFT, padx=5)
         
         # Populate the tree with existing entries
         self.update_entries_display()
@@ -386,26 +251,28 @@ class DTRApp:
         self.months_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
     
+    @span("DTRApp.update_entries_display")
     def update_entries_display(self):
-        # Clear current entries
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        
-        # Add entries from the DTR object
+        # Rows are keyed by entry id, so only new entries get formatted and
+        # only the rows that changed are touched in the tree
+        rows = {}
         for day, entries in sorted(self.dtr.logs.items()):
-            for i, (start, end) in enumerate(entries):
-                start_dt = self.dtr.parse_time(start)
-                end_dt = self.dtr.parse_time(end)
-                
-                if start_dt and end_dt:
-                    diff = end_dt - start_dt
-                    duration_hrs = round(diff.total_seconds() / 3600, 2)
-                    self.tree.insert("", tk.END, values=(day, start, end, duration_hrs),
-                                   tags=(f"{day}_{i}",))
+            for entry in entries:
+                rows[str(entry.id)] = (day, entry)
+        # An updated entry keeps its id but is a new Entry with other times
+        self.entries_table.invalidate([key for key, row in rows.items()
+                                       if key in self._entry_rows and self._entry_rows[key] != row])
+        self._entry_rows = rows
+        self.entries_table.set_rows(list(rows), lambda key: self.entry_row_values(*rows[key]))
+    
+    def entry_row_values(self, day, entry):
+        duration_hrs = round((entry.end - entry.start) / 60, 2)
+        return (day, entry.start_text, entry.end_text, duration_hrs)
     
-    def update_total_hours_display(self):
-        # Calculate total hours across all months
-        hours, minutes, months_data = self.dtr.calculate_all_hours()
+    @span("DTRApp.update_total_hours_display")
+    def update_total_hours_display(self, all_hours):
+        # Totals across all months, as computed by DTR.calculate_all_hours
+        hours, minutes, months_data = all_hours
         
         # Update the summary label
         self.total_hours_label.config(text=f"Total Hours: {hours} hours and {minutes} minutes")
@@ -424,6 +291,8 @@ class DTRApp:
             self.months_tree.insert("", tk.END, values=(month_name, f"{hours:.2f}", f"{percentage:.1f}%"))
     
     def add_entry(self):
+        if self.busy["loading"]:
+            return
         try:
             day = int(self.day_var.get())
             start_time = self.start_var.get()
@@ -432,7 +301,12 @@ class DTRApp:
             success, message = self.dtr.add_time_entry(day, start_time, end_time)
             
             if success:
+                self.schedule_save()
+                self.mark_stale()
                 self.update_entries_display()
+                # Ids only grow, so the newest entry of the day has the highest
+                newest = max(self.dtr.logs[day], key=lambda entry: entry.id)
+                self.entries_table.see(str(newest.id))
                 self.clear_entry_fields()
             else:
                 messagebox.showerror("Error", message)
@@ -441,22 +315,22 @@ class DTRApp:
             messagebox.showerror("Error", "Please enter a valid day number.")
     
     def delete_selected_entry(self):
-        selected = self.tree.selection()
+        if self.busy["loading"]:
+            return
+        selected = self.entries_table.selection()
         if not selected:
             messagebox.showinfo("Info", "No entry selected")
             return
         
-        for item in selected:
-            values = self.tree.item(item, "values")
-            day = int(values[0])
-            
-            # Find the index based on start and end times
-            for i, (start, end) in enumerate(self.dtr.logs.get(day, [])):
-                if start == values[1] and end == values[2]:
-                    success, message = self.dtr.delete_time_entry(day, i)
-                    if success:
-                        break
+        # Rows are keyed by entry id, so each selected row deletes exactly
+        # its own entry, even when another has the same times
+        success, message = self.dtr.delete_entries([int(item) for item in selected])
+        if not success:
+            messagebox.showerror("Error", message)
+            return
         
+        self.schedule_save()
+        self.mark_stale()
         self.update_entries_display()
     
     def clear_entry_fields(self):
@@ -471,35 +345,187 @@ class DTRApp:
                 self.current_month = i
                 break
         
-        self.dtr = DTR(self.current_month, self.current_year)
-        self.update_entries_display()
+        self.load_month()
     
     def update_year(self, event):
         try:
             self.current_year = int(self.year_var.get())
-            self.dtr = DTR(self.current_month, self.current_year)
-            self.update_entries_display()
         except ValueError:
             messagebox.showerror("Error", "Invalid year format")
+            return
+        self.load_month()
+    
+    def load_month(self):
+        # Pending edits are queued first, so the load sees them
+        self.flush_saves()
+        # Edits made now would go to the month being replaced
+        self.set_editable(False)
+        month, year = self.current_month, self.current_year
+        self.run_in_background("loading",
+                               lambda: DTR(month, year, store=self.store, autosave=False),
+                               on_done=self.set_dtr, on_error=self.load_failed)
+    
+    @span("DTRApp.set_dtr")
+    def set_dtr(self, dtr):
+        # Queue any edit still waiting for the save timer before the DTR holding it goes away
+        self.flush_saves()
+        self.dtr = dtr
+        self.mark_stale()
+        self.update_entries_display()
+        self.set_editable(not self.busy["loading"])
+    
+    def load_failed(self, error):
+        self.set_editable(not self.busy["loading"])
+        self.show_error(error)
+    
+    def set_editable(self, editable):
+        """Enable or disable the buttons that change entries"""
+        state = ["!disabled"] if editable else ["disabled"]
+        self.add_button.state(state)
+        self.delete_button.state(state)
+    
+    def on_tab_changed(self, event):
+        # Compute a tab the first time it is shown after its data changed
+        selected = self.notebook.select()
+        if selected == str(self.report_tab) and self.stale["report"]:
+            self.show_report()
+        elif selected == str(self.total_hours_tab) and self.stale["totals"]:
+            self.show_total_hours()
+    
+    def mark_stale(self):
+        """Note that the report and totals no longer match the entries"""
+        self.stale = {"report": True, "totals": True}
+        # A tab that is on screen is refreshed right away
+        self.on_tab_changed(None)
     
     def show_report(self):
-        report, _ = self.dtr.generate_report()
+        self.stale["report"] = False
+        self.flush_saves()
+        self.run_in_background("computing", self.dtr.generate_report, on_done=self.display_report)
+    
+    @span("DTRApp.display_report")
+    def display_report(self, result):
+        report, _ = result
         
-        # Clear and update the report text
+        # Clear the report text and fill it in a chunk at a time
         self.report_text.delete(1.0, tk.END)
-        self.report_text.insert(tk.END, "\n".join(report))
+        self._report_job = job = object()
+        self.insert_report_lines(job, iter(report), first=True)
         
         # Switch to the report tab
         self.notebook.select(self.report_tab)
     
+    def insert_report_lines(self, job, lines, first=False):
+        if job is not self._report_job:
+            return
+        chunk = list(itertools.islice(lines, REPORT_CHUNK_LINES))
+        if not chunk:
+            return
+        self.report_text.insert(tk.END, ("" if first else "\n") + "\n".join(chunk))
+        self.root.after(1, self.insert_report_lines, job, lines)
+    
     def show_total_hours(self):
+        self.stale["totals"] = False
+        self.flush_saves()
+        self.run_in_background("computing", self.dtr.calculate_all_hours, on_done=self.display_total_hours)
+    
+    def display_total_hours(self, all_hours):
         # Update the total hours display
-        self.update_total_hours_display()
+        self.update_total_hours_display(all_hours)
         
         # Switch to the total hours tab
         self.notebook.select(self.total_hours_tab)
+    
+    def run_in_background(self, state, func, on_done=None, on_error=None):
+        """Run func on the worker, showing state in the status bar until it finishes"""
+        self.busy[state] += 1
+        self.update_status()
+        
+        def finished(callback):
+            def run(value):
+                self.busy[state] -= 1
+                self.update_status()
+                if callback is not None:
+                    callback(value)
+            return run
+        
+        self.worker.submit(func, finished(on_done), finished(on_error or self.show_error))
+    
+    def show_error(self, error):
+        messagebox.showerror("Error", str(error))
+    
+    def update_status(self):
+        for state, text in STATUS_TEXT.items():
+            # Edits waiting for the save timer count as saving too
+            if self.busy[state] or (state == "saving" and self._save_timer is not None):
+                self.status_var.set(text)
+                return
+        self.status_var.set("")
+    
+    def schedule_save(self):
+        """Save edited days once edits stop coming in for SAVE_DELAY_MS"""
+        if self._save_timer is not None:
+            self.root.after_cancel(self._save_timer)
+        self._save_timer = self.root.after(SAVE_DELAY_MS, self.flush_saves)
+        self.update_status()
+    
+    def flush_saves(self):
+        """Queue one write of every edited day right away"""
+        if self._save_timer is not None:
+            self.root.after_cancel(self._save_timer)
+            self._save_timer = None
+        for dtr in self.unsaved_dtrs():
+            days = dtr.take_unsaved()
+            if days:
+                self.run_in_background("saving", functools.partial(dtr.save_days, days),
+                                       on_error=functools.partial(self.save_failed, dtr, days))
+        self.failed_saves = []
+        self.update_status()
+    
+    def unsaved_dtrs(self):
+        return [self.dtr] + [dtr for dtr in self.failed_saves if dtr is not self.dtr]
+    
+    def save_failed(self, dtr, days, error):
+        if isinstance(error, ConflictError):
+            # Trying again can't help; show what was saved elsewhere instead
+            messagebox.showerror("Error", f"Could not save changes: {error}")
+            if dtr is self.dtr:
+                self.load_month()
+            return
+        # Keep the days marked so the next save, or closing the window, tries again
+        dtr.unsaved.update(days)
+        self.failed_saves.append(dtr)
+        messagebox.showerror("Error", f"Could not save changes: {error}")
+    
+    def on_close(self):
+        # Write pending edits and wait for every queued job before exiting
+        self.flush_saves()
+        self.root.update_idletasks()
+        self.worker.close()
+        for dtr in self.unsaved_dtrs():
+            if not dtr.unsaved:
+                continue
+            # A save failed in the background; one more try on this thread
+            days = dtr.take_unsaved()
+            try:
+                dtr.save_days(days)
+            except Exception as e:
+                dtr.unsaved.update(days)
+                self.failed_saves.append(dtr)
+                if not messagebox.askokcancel("Error", f"Could not save changes: {e}\n\nClose anyway?"):
+                    self.worker = BackgroundWorker(self.root)
+                    return
+        self.store.close()
+        self.root.destroy()
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daily Time Record Manager")
+    parser.add_argument("--profile", nargs="?", const="summary", metavar="TRACE_FILE",
+                        help="print timings on exit, or write a Chrome trace to TRACE_FILE (.json)")
+    args = parser.parse_args(argv)
+    if args.profile:
+        enable_from_env(args.profile)
+    
     root = tk.Tk()
     root.configure(bg="#f5f5f5")
     app = DTRApp(root)
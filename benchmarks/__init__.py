@@ -0,0 +1,5 @@
+"""Performance benchmarks and the synthetic data they run on.
+
+Each bench_*.py script measures one optimization in isolation; suite.py
+runs the core DTR operations against a saved baseline.
+"""
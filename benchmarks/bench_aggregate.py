@@ -0,0 +1,73 @@
+"""Measure how dtr_aggregate scales with the number of worker processes.
+
+Writes a synthetic records tree (one directory per employee, one JSON file
+per year) to a temporary directory, then totals it serially and with
+increasing pool sizes.  Run from the repository root:
+
+    python benchmarks/bench_aggregate.py --employees 200 --years 3
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dtr_aggregate import aggregate_hours, discover_employees
+from dtr_time import format_minutes
+
+
+def write_records(root, employees, years, seed=0):
+    rng = random.Random(seed)
+    for e in range(employees):
+        directory = os.path.join(root, f"emp{e:04d}")
+        os.makedirs(directory)
+        for year in range(2020, 2020 + years):
+            data = {}
+            for month in range(1, 13):
+                data[str(month)] = {
+                    str(day): [[format_minutes(rng.randint(470, 520)), "12:00 pm"],
+                               [format_minutes(rng.randint(775, 790)), format_minutes(rng.randint(1010, 1140))]]
+                    for day in range(1, 29)
+                }
+            with open(os.path.join(directory, f"dtr_data_{year}.json"), 'w') as f:
+                json.dump(data, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--employees", type=int, default=200)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1,
+                        help="largest pool to try (default: CPU count)")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    worker_counts = [n for n in (1, 2, 4, 8, 16, 32, 64) if n < args.max_workers] + [args.max_workers]
+
+    with tempfile.TemporaryDirectory() as root:
+        write_records(root, args.employees, args.years)
+        sources = discover_employees(root)
+        print(f"{args.employees} employees x {args.years} years = "
+              f"{args.employees * args.years} files, {cpus} CPU(s)")
+
+        expected = None
+        baseline = None
+        for workers in worker_counts:
+            best = float("inf")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                totals = aggregate_hours(sources, workers=workers)
+                best = min(best, time.perf_counter() - started)
+            if expected is None:
+                expected, baseline = totals, best
+            assert totals == expected, "parallel result differs from serial"
+            print(f"  workers={workers:<3} {best:8.3f} s  {baseline / best:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Compare a year stored as JSON with the same year packed by dtr_archive.
+
+Writes a synthetic year file, archives a copy of it, checks both give the
+same months and totals, then prints file sizes and the time to load the
+whole year, load one month and compute the year's totals.  Run from the
+repository root:
+
+    python benchmarks/bench_archive.py --sessions 6
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import Profile, write_employee
+from dtr_archive import archive_year
+from dtr_cache import FileCache
+from dtr_storage import JSONStore
+
+YEAR = 2024
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=6, help="sessions per working day")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        json_dir = os.path.join(root, "json")
+        archive_dir = os.path.join(root, "archive")
+        write_employee(json_dir, [YEAR], Profile(sessions=args.sessions))
+        shutil.copytree(json_dir, archive_dir)
+        json_size, archive_size = archive_year(archive_dir, YEAR)
+
+        # A zero budget keeps nothing, so every JSON load parses the file
+        json_store = JSONStore(json_dir, cache=FileCache(max_bytes=0))
+        archive_store = JSONStore(archive_dir)
+
+        def plain(months):
+            return {month: {day: [(e.start, e.end) for e in entries] for day, entries in days.items()}
+                    for month, days in months.items()}
+
+        assert plain(json_store.load_year(YEAR)) == plain(archive_store.load_year(YEAR))
+        assert json_store.load_totals(YEAR).months == archive_store.load_totals(YEAR).months
+        entries = sum(len(e) for days in json_store.load_year(YEAR).values() for e in days.values())
+
+        print(f"{entries:,} entries, {args.sessions} sessions per day")
+        print(f"  JSON file      {json_size:10,} bytes")
+        print(f"  archive        {archive_size:10,} bytes  {json_size / archive_size:5.1f}x smaller")
+
+        def totals(store):
+            # What calculate_all_hours needs, without any cached totals
+            def run():
+                store.cache.clear()
+                store.load_totals(YEAR)
+            return run
+
+        print(f"  {'':18}{'JSON':>12}{'archive':>12}")
+        for name, json_func, archive_func in (
+                ("load year", lambda: json_store.load_year(YEAR), lambda: archive_store.load_year(YEAR)),
+                ("load one month", lambda: json_store.load_month(YEAR, 6), lambda: archive_store.load_month(YEAR, 6)),
+                ("year totals", totals(json_store), totals(archive_store))):
+            before = best_of(args.repeat, json_func)
+            after = best_of(args.repeat, archive_func)
+            print(f"  {name:18}{before * 1000:9.2f} ms{after * 1000:9.2f} ms  {before / after:6.1f}x")
+        json_store.close()
+        archive_store.close()
+
+
+if __name__ == "__main__":
+    main()
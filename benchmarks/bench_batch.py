@@ -0,0 +1,70 @@
+"""Compare deleting entries one at a time with one batched delete.
+
+Writes a synthetic year, then deletes --count entries from one month with
+autosave on: first one delete_time_entry call per entry, each saving on
+its own, then a single delete_entries call that saves once.  Both start
+from the same records and must leave the same entries behind.  Run from
+the repository root:
+
+    python benchmarks/bench_batch.py --count 50
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import Profile, write_employee
+from dtr_cache import FileCache
+from dtr_core import DTR
+from dtr_storage import JSONStore
+
+YEAR = 2024
+MONTH = 6
+
+
+def one_at_a_time(dtr, ids):
+    for entry_id in ids:
+        day, i = dtr.find_entry(entry_id)
+        dtr.delete_time_entry(day, i)
+
+
+def batched(dtr, ids):
+    dtr.delete_entries(ids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=50, help="entries to delete")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        source = os.path.join(root, "source")
+        write_employee(source, [YEAR], Profile(sessions=4))
+        print(f"Deleting {args.count} entries from one month")
+        print(f"  {'':12}{'one at a time':>16}{'batched':>12}")
+        for journaled in (False, True):
+            timings, left = [], []
+            for name, func in (("single", one_at_a_time), ("batch", batched)):
+                directory = os.path.join(root, f"{name}-{journaled}")
+                shutil.copytree(source, directory)
+                store = JSONStore(directory, journaled=journaled, cache=FileCache())
+                dtr = DTR(MONTH, YEAR, store=store)
+                ids = [entry.id for _, entries in sorted(dtr.logs.items()) for entry in entries][:args.count]
+                started = time.perf_counter()
+                func(dtr, ids)
+                timings.append(time.perf_counter() - started)
+                store.close()
+                reloaded = DTR(MONTH, YEAR, store=JSONStore(directory, cache=FileCache()))
+                left.append({day: [(e.start, e.end) for e in entries] for day, entries in reloaded.logs.items()})
+            assert left[0] == left[1]
+            label = "journaled" if journaled else "year file"
+            print(f"  {label:12}{timings[0] * 1000:13.2f} ms{timings[1] * 1000:9.2f} ms  "
+                  f"{timings[0] / timings[1]:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Check the NumPy columnar engine against the pure-Python path and time both.
+
+Every month of every synthetic employee is compared with DTR.calculate_hours
+and DTR.calculate_all_hours, and the worked/late/overtime summary with
+dtr_columnar.python_monthly_summary.  Some days are rewritten with the
+overlapping, nested, duplicated, touching and unsorted sessions older
+files can hold, so the overlap clipping is checked too.  Any mismatch
+fails with an assertion.
+Run from the repository root (requires NumPy):
+
+    python benchmarks/bench_columnar.py --employees 100 --years 2
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_aggregate import write_records
+from dtr_aggregate import discover_employees
+from dtr_columnar import ColumnarReport, iter_store_rows, python_monthly_summary
+from dtr_core import DTR
+from dtr_storage import JSONStore
+from dtr_time import format_minutes
+
+# Sessions as (start, end) minutes after a random start time
+LEGACY_DAYS = [
+    [(0, 240), (120, 300)],             # overlapping
+    [(0, 480), (60, 120)],              # nested
+    [(0, 240), (0, 240)],               # duplicated
+    [(0, 240), (240, 480)],             # touching
+    [(300, 480), (0, 120), (60, 360)],  # unsorted, chained overlaps
+]
+
+
+def best_of(repeat, func):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def add_legacy_days(root, seed=1):
+    """Rewrite a few days of every month with one of LEGACY_DAYS"""
+    rng = random.Random(seed)
+    for path in glob.glob(os.path.join(root, "*", "dtr_data_*.json")):
+        with open(path) as f:
+            data = json.load(f)
+        for month_data in data.values():
+            for day in rng.sample(sorted(month_data), 4):
+                start = rng.randint(420, 600)
+                month_data[day] = [[format_minutes(start + first), format_minutes(start + last)]
+                                   for first, last in rng.choice(LEGACY_DAYS)]
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--employees", type=int, default=100)
+    parser.add_argument("--years", type=int, default=2)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        write_records(root, args.employees, args.years)
+        add_legacy_days(root)
+        stores = {name: JSONStore(path) for name, path in discover_employees(root).items()}
+        years = range(2020, 2020 + args.years)
+
+        present = []
+        rows = list(iter_store_rows(stores, years, present))
+        report = ColumnarReport(rows, present)
+
+        for employee, store in stores.items():
+            for year in years:
+                for month in range(1, 13):
+                    dtr = DTR(month, year, store=store)
+                    assert report.calculate_hours(employee, year, month) == dtr.calculate_hours(), \
+                        (employee, year, month)
+                assert report.calculate_all_hours(employee, year) == dtr.calculate_all_hours(), (employee, year)
+        assert report.monthly_summary() == python_monthly_summary(rows)
+        print(f"Columnar results match the pure-Python path for {len(rows):,} entries")
+
+        python_time, _ = best_of(args.repeat, lambda: python_monthly_summary(rows))
+        build_time, report = best_of(args.repeat, lambda: ColumnarReport(rows, present))
+        numpy_time, _ = best_of(args.repeat, report.monthly_summary)
+        print(f"  pure Python summary       {python_time:8.4f} s")
+        print(f"  columnar build (arrays)   {build_time:8.4f} s")
+        print(f"  columnar summary          {numpy_time:8.4f} s  {python_time / numpy_time:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Time redrawing the entry table for a large month, full rebuild vs VirtualTable.
+
+"Full rebuild" is what DTRApp.update_entries_display used to do after every
+add or delete: delete every Treeview item and insert all of them again.
+"Virtual" is VirtualTable.set_rows, which only keeps the visible rows in
+the Treeview and only touches the ones that changed.  Each timing includes
+root.update() so Tk's own layout and drawing are counted.  Needs a display;
+run from the repository root:
+
+    python benchmarks/bench_entry_table.py --rows 10000
+"""
+import argparse
+import os
+import sys
+import time
+import tkinter as tk
+from tkinter import ttk
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dtr_table import VirtualTable
+from dtr_time import Entry
+
+COLUMNS = ("day", "start_time", "end_time", "duration")
+
+
+def make_rows(count):
+    """{key: (day, Entry)} spread evenly over 28 days"""
+    rows = {}
+    for i in range(count):
+        start = (i * 7) % (23 * 60)
+        entry = Entry(start, start + 30)
+        rows[str(entry.id)] = (i % 28 + 1, entry)
+    return rows
+
+
+def row_values(day, entry):
+    return (day, entry.start_text, entry.end_text, round((entry.end - entry.start) / 60, 2))
+
+
+def make_tree(root):
+    frame = ttk.Frame(root)
+    frame.pack(fill=tk.BOTH, expand=True)
+    tree = ttk.Treeview(frame, columns=COLUMNS, show="headings")
+    scrollbar = ttk.Scrollbar(frame, orient=tk.VERTICAL)
+    tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+    return frame, tree, scrollbar
+
+
+def timed(root, func):
+    started = time.perf_counter()
+    func()
+    root.update()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10000)
+    args = parser.parse_args()
+
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        sys.exit(f"Tk is not available: {e}")
+    root.geometry("900x650")
+
+    rows = make_rows(args.rows)
+    ordered = sorted(rows, key=lambda key: rows[key][0])
+    added = make_rows(1)
+    rows.update(added)
+    with_added = ordered[:len(ordered) // 2] + list(added) + ordered[len(ordered) // 2:]
+    print(f"{args.rows:,} rows")
+
+    frame, tree, _ = make_tree(root)
+    root.update()
+
+    def rebuild(keys):
+        def run():
+            for item in tree.get_children():
+                tree.delete(item)
+            for key in keys:
+                tree.insert("", tk.END, values=row_values(*rows[key]))
+        return run
+
+    full = [("initial fill", timed(root, rebuild(ordered))),
+            ("add one entry", timed(root, rebuild(with_added))),
+            ("delete one entry", timed(root, rebuild(ordered))),
+            ("scroll one page", timed(root, lambda: tree.yview_scroll(1, "pages")))]
+    frame.destroy()
+
+    frame, tree, scrollbar = make_tree(root)
+    table = VirtualTable(tree, scrollbar)
+    root.update()
+
+    def set_rows(keys):
+        return lambda: table.set_rows(keys, lambda key: row_values(*rows[key]))
+
+    virtual = [("initial fill", timed(root, set_rows(ordered))),
+               ("add one entry", timed(root, set_rows(with_added))),
+               ("delete one entry", timed(root, set_rows(ordered))),
+               ("scroll one page", timed(root, lambda: table.yview("scroll", 1, "pages")))]
+    assert tree.get_children() == tuple(ordered[table.first:table.first + len(tree.get_children())])
+    root.destroy()
+
+    print(f"  {'':18}{'full rebuild':>14}{'virtual':>12}")
+    for (name, before), (_, after) in zip(full, virtual):
+        print(f"  {name:18}{before * 1000:11.1f} ms{after * 1000:9.1f} ms  {before / after:6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
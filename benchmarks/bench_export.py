@@ -0,0 +1,73 @@
+"""Compare building every report in memory with streaming them to a file.
+
+Writes synthetic records for --employees employees, then produces the
+year's reports for all of them twice: once the old way, collecting
+DTR.generate_report for every employee and month into one list and
+writing it out at the end, and once through dtr_export's pipeline
+straight to a file.  Prints the time taken and the peak memory traced
+by tracemalloc for each.  Run from the repository root:
+
+    python benchmarks/bench_export.py --employees 200
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import write_tree
+from dtr_cache import FileCache
+from dtr_core import DTR
+from dtr_export import employee_stores, export_report, report_rows
+from dtr_storage import JSONStore
+
+YEAR = 2024
+
+
+def in_memory(root, names, path):
+    lines = []
+    for name in names:
+        store = JSONStore(os.path.join(root, name), cache=FileCache(max_bytes=0))
+        for month in range(1, 13):
+            report, _ = DTR(month, YEAR, store=store).generate_report()
+            lines.extend(report)
+        store.close()
+    with open(path, "w") as f:
+        f.write("\n".join(lines))
+
+
+def streamed(root, names, path):
+    with open(path, "w") as f:
+        export_report(report_rows(employee_stores(root)), f, "text")
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    started = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--employees", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        names = write_tree(root, args.employees, [YEAR])
+        output = os.path.join(root, "report.txt")
+        print(f"{args.employees} employees, 12 months")
+        for name, func in (("in memory", in_memory), ("streamed", streamed)):
+            elapsed, peak = measure(func, root, names, output)
+            print(f"  {name:12} {elapsed:8.2f} s  peak {peak / 1024 / 1024:8.2f} MB  "
+                  f"output {os.path.getsize(output) / 1024 / 1024:6.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
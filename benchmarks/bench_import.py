@@ -0,0 +1,107 @@
+"""Time bulk importing punches into each kind of storage.
+
+Generates --punches synthetic punches for --employees employees, two
+sessions a day each, in date order as a time clock export would list
+them, and feeds them through dtr_import.parse_rows and import_punches
+into JSON year files, journaled JSON, monthly shards and SQLite.  Rows
+are generated lazily, so any number of punches can be fed through; the
+time taken to generate them is measured on its own and left out.  Each
+store is timed in one run and its peak memory traced by tracemalloc in a
+second, since tracing slows everything down.  Run from the repository
+root:
+
+    python benchmarks/bench_import.py --punches 1000000
+"""
+import argparse
+import datetime
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dtr_import import import_punches, parse_rows
+from dtr_storage import JSONStore, ShardedStore, SQLiteStore
+
+FIRST_DAY = datetime.date(2024, 1, 1)
+SESSIONS = (("8:00 am", "12:00 pm"), ("1:00 pm", "5:00 pm"))
+MODES = ["json", "journaled", "sharded", "sqlite"]
+
+
+def generate(employees, punches):
+    """Yield (line, row) for each punch, one day at a time"""
+    line = 1
+    day = FIRST_DAY
+    while True:
+        date = day.isoformat()
+        for employee in employees:
+            for start, end in SESSIONS:
+                if line > punches:
+                    return
+                line += 1
+                yield line, {"employee": employee, "date": date, "start": start, "end": end}
+        day += datetime.timedelta(days=1)
+
+
+def run(mode, root, employees, punches):
+    """Import the punches into a fresh directory; returns the ImportSummary"""
+    stores = {}
+    database = SQLiteStore(os.path.join(root, "dtr_data.sqlite3")) if mode == "sqlite" else None
+
+    def store_for(employee):
+        if employee not in stores:
+            if database is not None:
+                stores[employee] = database.for_employee(employee)
+            else:
+                directory = os.path.join(root, employee)
+                os.makedirs(directory)
+                if mode == "sharded":
+                    stores[employee] = ShardedStore(directory)
+                else:
+                    stores[employee] = JSONStore(directory, journaled=(mode == "journaled"))
+        return stores[employee]
+
+    try:
+        return import_punches(parse_rows(generate(employees, punches)), store_for, on_error=lambda _: None)
+    finally:
+        for store in stores.values():
+            store.close()
+        if database is not None:
+            database.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--punches", type=int, default=200000)
+    parser.add_argument("--employees", type=int, default=500)
+    parser.add_argument("--mode", choices=MODES + ["all"], default="all")
+    args = parser.parse_args()
+
+    employees = [f"emp{i:05d}" for i in range(args.employees)]
+    started = time.perf_counter()
+    for _ in generate(employees, args.punches):
+        pass
+    generating = time.perf_counter() - started
+    days = -(-args.punches // (args.employees * len(SESSIONS)))
+    print(f"{args.punches:,} punches, {args.employees} employees, {days} days")
+
+    for mode in MODES if args.mode == "all" else [args.mode]:
+        with tempfile.TemporaryDirectory() as root:
+            started = time.perf_counter()
+            summary = run(mode, root, employees, args.punches)
+            elapsed = time.perf_counter() - started - generating
+        assert summary.imported == args.punches and summary.rejected == 0
+
+        with tempfile.TemporaryDirectory() as root:
+            tracemalloc.start()
+            run(mode, root, employees, args.punches)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        print(f"  {mode:14} {elapsed:8.2f} s  {args.punches / elapsed:12,.0f} punches/s  "
+              f"peak {peak / 1024 / 1024:7.1f} MB  {summary.months_written:,} month writes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Time pairing raw clock taps into sessions, then ingesting them into storage.
+
+Generates --events synthetic taps for --employees employees: one shift a
+day each, a night shift across midnight every tenth day, a repeated tap
+now and then, a forgotten clock-out now and then, and arrival order
+shuffled by up to two minutes.  Rows are generated lazily, so any number
+of events can be fed through.  Times the pairing pipeline alone
+(parse_events, reorder and pair_events) and then dtr_events.ingest_events
+into JSON year files (skip with --no-store), and checks the counts
+against what was generated.  The time taken to generate the rows is
+measured on its own and left out.  Run from the repository root:
+
+    python benchmarks/bench_ingest.py --events 1000000
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dtr_events import EventSummary, ingest_events, pair_events, parse_events, reorder
+from dtr_storage import JSONStore
+
+FIRST_DAY = datetime.date(2024, 1, 1)
+# Latest an event arrives after taps that happened later
+MAX_DELAY = 120
+
+
+class Expected:
+    def __init__(self):
+        self.events = self.sessions = self.overnight = self.duplicates = self.orphans = 0
+
+
+def shift(rng, day, night, expected):
+    """[(time, kind), ...] for one shift's taps"""
+    start = datetime.datetime.combine(day, datetime.time(22 if night else 8)) + \
+        datetime.timedelta(seconds=rng.randrange(-900, 900))
+    end = start + datetime.timedelta(hours=8, seconds=rng.randrange(-900, 900))
+    taps = [(start, "in")]
+    if rng.random() < 0.02:
+        expected.orphans += 1
+    else:
+        taps.append((end, "out"))
+        expected.sessions += 1
+        expected.overnight += night
+    if rng.random() < 0.05:
+        time, kind = taps[0]
+        taps.append((time + datetime.timedelta(seconds=rng.randrange(2, 30)), kind))
+        expected.duplicates += 1
+    return taps
+
+
+def generate(employees, days, seed, expected):
+    """Yield (line, row) for every tap, in a slightly shuffled arrival order"""
+    rng = random.Random(seed)
+    # Taps waiting to arrive, by the day they arrive on
+    arriving = {}
+    line = 1
+    for offset in range(days + 2):
+        day = FIRST_DAY + datetime.timedelta(days=offset)
+        if offset < days:
+            for i, employee in enumerate(employees):
+                for time, kind in shift(rng, day, (offset + i) % 10 == 0, expected):
+                    arrival = time + datetime.timedelta(seconds=rng.randrange(MAX_DELAY))
+                    arriving.setdefault(arrival.date(), []).append((arrival, employee, time, kind))
+        for _, employee, time, kind in sorted(arriving.pop(day, []), key=lambda tap: tap[0]):
+            line += 1
+            expected.events += 1
+            yield line, {"employee": employee, "time": time.isoformat(), "type": kind}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=1000000)
+    parser.add_argument("--employees", type=int, default=500)
+    parser.add_argument("--no-store", action="store_true", help="only time the pairing")
+    args = parser.parse_args()
+
+    employees = [f"emp{i:05d}" for i in range(args.employees)]
+    # About 2.05 taps per shift
+    days = max(1, round(args.events / args.employees / 2.05))
+
+    started = time.perf_counter()
+    for _ in generate(employees, days, 0, Expected()):
+        pass
+    generating = time.perf_counter() - started
+
+    expected = Expected()
+    summary = EventSummary()
+    started = time.perf_counter()
+    punches = 0
+    for item in pair_events(reorder(parse_events(generate(employees, days, 0, expected), summary=summary),
+                                    summary=summary), summary=summary):
+        punches += 1
+    elapsed = time.perf_counter() - started - generating
+    assert (summary.events, summary.sessions, summary.overnight, summary.duplicates, summary.orphans) == \
+        (expected.events, expected.sessions, expected.overnight, expected.duplicates, expected.orphans)
+    assert summary.late == summary.rejected == 0
+    print(f"{summary.events:,} events, {args.employees} employees, {days} days")
+    print(f"  pairing        {elapsed:8.2f} s  {summary.events / elapsed:12,.0f} events/s")
+    print(f"  {summary.sessions:,} sessions, {summary.overnight:,} overnight, "
+          f"{summary.duplicates:,} duplicate taps, {summary.orphans:,} orphans")
+
+    if args.no_store:
+        return
+    with tempfile.TemporaryDirectory() as root:
+        stores = {}
+
+        def store_for(employee):
+            if employee not in stores:
+                directory = os.path.join(root, employee)
+                os.makedirs(directory)
+                stores[employee] = JSONStore(directory)
+            return stores[employee]
+
+        expected = Expected()
+        started = time.perf_counter()
+        events, imported = ingest_events(generate(employees, days, 0, expected), store_for, on_error=lambda _: None)
+        elapsed = time.perf_counter() - started - generating
+        for store in stores.values():
+            store.close()
+        assert imported.imported == punches - events.orphans
+        print(f"  ingest to JSON {elapsed:8.2f} s  {events.events / elapsed:12,.0f} events/s  "
+              f"{imported.imported:,} entries in {imported.months_written:,} month files")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Time switching months on a large year file, with and without the month index.
+
+"Full parse" is what DTR.load_data used to do: json.load the whole year file
+and pick one month out of it.  "Indexed" is JSONStore.load_month with the
+shared cache disabled, which reads only the chosen month's bytes using
+dtr_data_YEAR.idx.  "Cached" is JSONStore.load_month once every month has
+been loaded, which only stats the year files.  Run from the repository root:
+
+    python benchmarks/bench_month_switch.py --sessions 40
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dtr_cache import FileCache
+from dtr_journal import Journal
+from dtr_storage import JSONStore
+from dtr_time import format_minutes
+
+
+def write_year(directory, year, sessions, seed=0):
+    """Write a year file with the given number of sessions on every day"""
+    rng = random.Random(seed)
+    data = {}
+    for month in range(1, 13):
+        data[str(month)] = {}
+        for day in range(1, 29):
+            starts = sorted(rng.sample(range(0, 23 * 60), sessions))
+            data[str(month)][str(day)] = [[format_minutes(s), format_minutes(s + rng.randint(1, 59))]
+                                          for s in starts]
+    # Written through the journal so the month index is created as well
+    Journal(os.path.join(directory, f"dtr_data_{year}.json")).replace_snapshot(data)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=40, help="sessions per day")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_year(directory, 2025, args.sessions)
+        data_file = os.path.join(directory, "dtr_data_2025.json")
+        print(f"Year file: {os.path.getsize(data_file) / 1024:,.0f} KiB, "
+              f"{12 * 28 * args.sessions:,} entries")
+
+        def full_parse():
+            for month in range(1, 13):
+                with open(data_file, 'r') as f:
+                    json.load(f).get(str(month), {})
+
+        # A zero budget means nothing is ever kept, so every load reads the file
+        store = JSONStore(directory, cache=FileCache(max_bytes=0))
+        cached_store = JSONStore(directory, cache=FileCache())
+
+        def indexed():
+            for month in range(1, 13):
+                store.load_month(2025, month)
+
+        def cached():
+            for month in range(1, 13):
+                cached_store.load_month(2025, month)
+
+        for month in range(1, 13):
+            with open(data_file, 'r') as f:
+                expected = json.load(f)[str(month)]
+            assert {str(day): [list(e) for e in entries]
+                    for day, entries in store.load_month(2025, month).items()} == expected
+            assert {str(day): [list(e) for e in entries]
+                    for day, entries in cached_store.load_month(2025, month).items()} == expected
+
+        results = []
+        for name, func in (("full parse", full_parse), ("indexed", indexed), ("cached", cached)):
+            best = float("inf")
+            for _ in range(args.repeat):
+                started = time.perf_counter()
+                func()
+                best = min(best, time.perf_counter() - started)
+            results.append((name, best / 12))
+
+        baseline = results[0][1]
+        for name, per_switch in results:
+            print(f"  {name:12} {per_switch * 1000:8.2f} ms per month switch  {baseline / per_switch:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Compare the cached 12-hour parser in dtr_time against datetime.strptime.
+
+Run from the repository root:
+
+    python benchmarks/bench_parse_time.py
+"""
+import datetime
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dtr_time import _parse_minutes, format_minutes, parse_minutes
+
+
+def make_times(count, seed=0):
+    """Build a realistic stream of punch times (repeats are the common case)"""
+    rng = random.Random(seed)
+    return [format_minutes(rng.randrange(24 * 60)) for _ in range(count)]
+
+
+def strptime_minutes(t):
+    dt = datetime.datetime.strptime(t, "%I:%M %p")
+    return dt.hour * 60 + dt.minute
+
+
+def run(count=100_000, repeat=5):
+    times = make_times(count)
+    assert [strptime_minutes(t) for t in times] == [parse_minutes(t) for t in times]
+
+    def bench(func, clear_cache=False):
+        def loop():
+            if clear_cache:
+                _parse_minutes.cache_clear()
+            for t in times:
+                func(t)
+        return min(timeit.repeat(loop, number=1, repeat=repeat))
+
+    results = [
+        ("datetime.strptime", bench(strptime_minutes)),
+        ("parse_minutes (cold cache)", bench(parse_minutes, clear_cache=True)),
+        ("parse_minutes (warm cache)", bench(parse_minutes)),
+    ]
+
+    baseline = results[0][1]
+    print(f"Parsing {count:,} times, best of {repeat}")
+    for name, seconds in results:
+        per_call = seconds / count * 1e9
+        print(f"  {name:28} {seconds:8.4f} s  {per_call:7.0f} ns/call  {baseline / seconds:6.1f}x")
+
+
+if __name__ == "__main__":
+    run()
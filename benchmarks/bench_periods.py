@@ -0,0 +1,84 @@
+"""Time date-range hour queries with and without the cumulative day index.
+
+Writes three years of synthetic records, then answers --queries random
+date ranges (pay periods up to a fiscal year long, crossing month and
+year boundaries) two ways: loading every month the range touches and
+summing its days, as had to be done by hand before, and through
+dtr_periods.CalendarIndex.  Both must agree.  Also times the index
+update each edit now makes, shifting the sums after the edited day
+(January 2nd, the worst case).  Run from the repository root:
+
+    python benchmarks/bench_periods.py --queries 2000
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import write_employee
+from dtr_periods import CalendarIndex
+from dtr_storage import JSONStore
+from dtr_time import merged_minutes
+
+YEARS = [2023, 2024, 2025]
+
+
+def by_hand(store, start, end):
+    total = 0
+    year, month = start.year, start.month
+    while (year, month) <= (end.year, end.month):
+        for day, entries in store.load_month(year, month).items():
+            if start <= datetime.date(year, month, day) <= end:
+                total += merged_minutes(entries)
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    first_day = datetime.date(YEARS[0], 1, 1)
+    ranges = []
+    for _ in range(args.queries):
+        start = first_day + datetime.timedelta(days=rng.randrange(365 * len(YEARS) - 366))
+        ranges.append((start, start + datetime.timedelta(days=rng.randint(14, 365))))
+
+    with tempfile.TemporaryDirectory() as root:
+        write_employee(root, YEARS)
+        store = JSONStore(root)
+        index = CalendarIndex(store)
+        assert all(by_hand(store, start, end) == index.minutes(start, end) for start, end in ranges[:50])
+
+        print(f"{args.queries:,} ranges of 2 weeks to a year")
+        results = []
+        for name, func in (("by hand", lambda start, end: by_hand(store, start, end)),
+                           ("calendar index", index.minutes)):
+            started = time.perf_counter()
+            for start, end in ranges:
+                func(start, end)
+            results.append((time.perf_counter() - started) / args.queries)
+            print(f"  {name:18} {results[-1] * 1e6:10.1f} us per range")
+        print(f"  {'':18} {results[0] / results[1]:10.1f}x faster")
+
+        # What the index adds to every save: shifting the sums after the day
+        totals = store.load_totals(YEARS[0])
+        minutes = totals.day_minutes(1, 2)
+        edits = 10000
+        started = time.perf_counter()
+        for i in range(edits):
+            totals.set_day(1, 2, minutes + i % 2)
+        totals.set_day(1, 2, minutes)
+        print(f"  index update       {(time.perf_counter() - started) / edits * 1e6:10.1f} us per edited day")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Time how long each entry point takes to import in a fresh interpreter.
+
+Every statement runs in its own `python -c` process, so nothing is already
+imported or cached; the bare interpreter is listed first for reference.
+Also checks that the headless modules import with tkinter unavailable.
+Run from the repository root:
+
+    python benchmarks/bench_startup.py --repeat 10
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+STATEMENTS = [
+    ("python (no imports)", "pass"),
+    ("dtr_core", "import dtr_core"),
+    ("dtr.py", "import dtr"),
+    ("dtr_service", "import dtr_service"),
+    ("GUI_dtr", "import GUI_dtr"),
+]
+
+# Blocks tkinter the way a server without Tk would
+HEADLESS = "import sys; sys.modules['tkinter'] = None; import dtr_core, dtr, dtr_service"
+
+
+def run(statement):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, "-c", statement], cwd=ROOT, check=True)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    run(HEADLESS)
+    print("Headless modules import without tkinter")
+    for name, statement in STATEMENTS:
+        best = min(run(statement) for _ in range(args.repeat))
+        print(f"  {name:22} {best * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+"""Load test dtr_service with concurrent keep-alive clients.
+
+Starts a ReportService on a free local port over synthetic records (or
+targets a running one with --url), then has --clients connections send
+requests for --duration seconds: mostly monthly reports and year totals
+for random employees and months, plus --write-ratio entry adds and
+deletes.  Prints requests per second and latency percentiles.  Run from
+the repository root:
+
+    python -m benchmarks.load_test --clients 32 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.synthetic import write_tree
+from dtr_service import ReportService
+
+YEAR = 2024
+
+
+async def request(reader, writer, method, target, payload=None):
+    body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: load-test\r\n"
+                 f"Content-Length: {len(body)}\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.lower() == "content-length":
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+
+async def client(host, port, employees, deadline, write_ratio, seed, latencies, errors):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            employee = rng.choice(employees)
+            month = rng.randint(1, 12)
+            roll = rng.random()
+            if roll < write_ratio:
+                # Add a short late-night entry and delete it again right away
+                entry = {"employee": employee, "year": YEAR, "month": month, "day": rng.randint(1, 28),
+                         "start": "11:00 pm", "end": "11:30 pm"}
+                calls = [("POST", "/entries", entry), ("DELETE", "/entries?" + urlencode(entry), None)]
+            elif roll < (1 + write_ratio) / 2:
+                calls = [("GET", "/report?" + urlencode({"employee": employee, "year": YEAR,
+                                                          "month": month}), None)]
+            else:
+                calls = [("GET", "/totals?" + urlencode({"employee": employee, "year": YEAR}), None)]
+            for method, target, payload in calls:
+                started = time.perf_counter()
+                status = await request(reader, writer, method, target, payload)
+                latencies.append(time.perf_counter() - started)
+                # An add can be refused if the day already ends past 11 pm
+                if status >= 500 or (status >= 400 and method == "GET"):
+                    errors.append(status)
+    finally:
+        writer.close()
+
+
+async def run_clients(host, port, employees, args):
+    latencies, errors = [], []
+    started = time.perf_counter()
+    deadline = started + args.duration
+    await asyncio.gather(*(client(host, port, employees, deadline, args.write_ratio, i, latencies, errors)
+                           for i in range(args.clients)))
+    return time.perf_counter() - started, latencies, errors
+
+
+def start_service(directory):
+    """Run a ReportService on its own event loop thread; returns (port, stop)"""
+    loop = asyncio.new_event_loop()
+    service = ReportService(directory, default_employee="")
+    server = loop.run_until_complete(service.start("127.0.0.1", 0))
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    async def shutdown():
+        server.close()
+        await server.wait_closed()
+        # Let connection handlers see their clients hang up
+        others = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        if others:
+            await asyncio.wait(others, timeout=5)
+
+    def stop():
+        asyncio.run_coroutine_threadsafe(shutdown(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+        service.close()
+    return server.sockets[0].getsockname()[1], stop
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", help="load test a running service instead, e.g. http://127.0.0.1:8080")
+    parser.add_argument("--employees", type=int, default=20, help="synthetic employees to generate")
+    parser.add_argument("--clients", type=int, default=32, help="concurrent connections")
+    parser.add_argument("--duration", type=float, default=10, help="seconds to run")
+    parser.add_argument("--write-ratio", type=float, default=0.05, help="share of requests that edit")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        employees = [f"emp{e:04d}" for e in range(args.employees)]
+        stop = None
+        if args.url:
+            url = urlsplit(args.url)
+            host, port = url.hostname, url.port or 80
+        else:
+            write_tree(root, args.employees, [YEAR])
+            host, (port, stop) = "127.0.0.1", start_service(root)
+        try:
+            elapsed, latencies, errors = asyncio.run(run_clients(host, port, employees, args))
+        finally:
+            if stop is not None:
+                stop()
+
+    latencies.sort()
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+
+    print(f"{len(latencies):,} requests from {args.clients} clients in {elapsed:.1f}s, "
+          f"{len(errors)} error(s)")
+    print(f"  {len(latencies) / elapsed:10,.0f} requests/s")
+    print(f"  p50 {percentile(0.50):8.2f} ms   p90 {percentile(0.90):8.2f} ms   "
+          f"p99 {percentile(0.99):8.2f} ms   max {latencies[-1] * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Run many writer processes against one records directory at once.
+
+Each of --writers processes owns one day (writer i edits month i % 12 + 1,
+day i // 12 + 1) and adds --entries short entries to it, one save per
+entry, all at the same time.  Writers share year files (or month files,
+with --mode sharded) with the others, so any update lost to a race shows
+up as missing entries or wrong totals when the directory is read back.
+
+With --same-day every writer adds its entries to the same day instead,
+through one DTR kept for the whole run the way a GUI keeps one per
+month, so each save has to be combined with the entries the others
+saved since that DTR read the day.  Run from the repository root:
+
+    python -m benchmarks.stress_writers --writers 24 --entries 50 --mode sharded
+    python -m benchmarks.stress_writers --writers 24 --entries 20 --same-day
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dtr_cache import FileCache
+from dtr_core import DTR
+from dtr_storage import JSONStore, ShardedStore, SQLiteStore
+from dtr_time import Entry
+
+YEAR = 2024
+# Each entry is 5 minutes long, one every 10 minutes from 6:00 am
+ENTRY_MINUTES = 5
+# With --same-day, entries are 1 minute long and the writers take turns
+# filling the minutes from 6:00 am
+SAME_DAY_MINUTES = 1
+
+
+def open_store(mode, directory):
+    if mode == "sharded":
+        return ShardedStore(directory, cache=FileCache())
+    if mode == "sqlite":
+        return SQLiteStore(os.path.join(directory, "dtr_data.sqlite3"))
+    return JSONStore(directory, journaled=(mode == "journaled"), cache=FileCache())
+
+
+def place(index, k, writers, same_day):
+    """(month, day, Entry) for writer index's k-th entry"""
+    if same_day:
+        start = 6 * 60 + k * writers + index
+        return 1, 1, Entry(start, start + SAME_DAY_MINUTES)
+    start = 6 * 60 + 10 * k
+    return index % 12 + 1, index // 12 + 1, Entry(start, start + ENTRY_MINUTES)
+
+
+def writer(mode, directory, index, entries, writers, same_day, barrier):
+    store = open_store(mode, directory)
+    barrier.wait()
+    dtr = DTR(1, YEAR, store=store) if same_day else None
+    for k in range(entries):
+        month, day, entry = place(index, k, writers, same_day)
+        # A fresh DTR per save, like a service request would use, or one
+        # long-lived DTR that never sees the others' entries
+        target = dtr or DTR(month, YEAR, store=store)
+        success, message = target.add_time_entry(day, entry.start_text, entry.end_text)
+        if not success:
+            raise RuntimeError(f"writer {index}: {message}")
+    store.close()
+
+
+def check(mode, directory, writers, entries, same_day):
+    """Return a list of problems found in the written records"""
+    store = open_store(mode, directory)
+    months = store.load_year(YEAR)
+    problems = []
+    expected_days = {}
+    for index in range(writers):
+        for k in range(entries):
+            month, day, entry = place(index, k, writers, same_day)
+            expected_days.setdefault((month, day), set()).add((entry.start, entry.end))
+    for (month, day), expected in sorted(expected_days.items()):
+        found = {(entry.start, entry.end) for entry in months.get(month, {}).get(day, [])}
+        if found != expected:
+            problems.append(f"month {month} day {day}: {len(found & expected)} of {len(expected)} entries")
+    expected = writers * entries * (SAME_DAY_MINUTES if same_day else ENTRY_MINUTES)
+    if store.load_totals(YEAR).year != expected:
+        problems.append(f"year total {store.load_totals(YEAR).year} min, expected {expected}")
+    problems.extend(store.verify_totals(YEAR))
+    store.close()
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=24, help="concurrent writer processes")
+    parser.add_argument("--entries", type=int, default=50, help="entries each writer adds (at most 108)")
+    parser.add_argument("--mode", choices=["json", "journaled", "sharded", "sqlite", "all"], default="all")
+    parser.add_argument("--same-day", action="store_true", help="have every writer edit the same day")
+    args = parser.parse_args()
+    if args.same_day and args.writers * args.entries > 18 * 60 - 1:
+        parser.error("--same-day fits at most 1079 entries in total")
+
+    modes = ["json", "journaled", "sharded", "sqlite"] if args.mode == "all" else [args.mode]
+    failed = False
+    for mode in modes:
+        with tempfile.TemporaryDirectory() as directory:
+            barrier = multiprocessing.Barrier(args.writers + 1)
+            processes = [multiprocessing.Process(target=writer, args=(mode, directory, i, args.entries,
+                                                                      args.writers, args.same_day, barrier))
+                         for i in range(args.writers)]
+            for process in processes:
+                process.start()
+            barrier.wait()
+            started = time.perf_counter()
+            for process in processes:
+                process.join()
+            elapsed = time.perf_counter() - started
+
+            problems = check(mode, directory, args.writers, args.entries, args.same_day)
+            if any(process.exitcode for process in processes):
+                problems.append("a writer process failed")
+        saves = args.writers * args.entries
+        status = "ok" if not problems else f"{len(problems)} problem(s)"
+        print(f"{mode:10} {saves:7,} saves from {args.writers} writers in {elapsed:6.2f}s "
+              f"{saves / elapsed:9,.0f} saves/s  {status}")
+        for problem in problems[:10]:
+            print(f"    {problem}")
+        failed = failed or bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
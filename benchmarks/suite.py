@@ -0,0 +1,246 @@
+"""Repeatable benchmarks for the DTR core, with a JSON baseline to compare against.
+
+Generates synthetic records (see benchmarks/synthetic.py) in a temporary
+directory, times the DTR operations the GUI and the dtr.py script use, and
+optionally saves the results or compares them with a saved baseline.  Run
+from the repository root:
+
+    python -m benchmarks.suite --save baseline.json
+    python -m benchmarks.suite --compare baseline.json
+
+A comparison prints the change for every benchmark and exits with status 1
+if any got slower than the baseline by more than --threshold.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dtr
+from benchmarks.synthetic import Profile, write_tree
+from dtr_cache import FileCache
+from dtr_core import DTR
+from dtr_storage import JSONStore
+
+# Month and year every DTR benchmark works on
+YEAR = 2024
+MONTH = 3
+
+
+class Context:
+    """Synthetic records on disk plus the stores the benchmarks read them through"""
+
+    def __init__(self, root, args):
+        self.root = root
+        self.names = write_tree(root, args.employees, range(YEAR - args.years + 1, YEAR + 1),
+                                Profile(sessions=args.sessions), seed=args.seed)
+        self.directory = os.path.join(root, self.names[0])
+        self._stores = []
+        self._scratch = 0
+
+    def store(self, journaled=False, cached=True, scratch=False):
+        """A store for the first employee's records.
+
+        Benchmarks that write pass scratch=True to get a private copy, so
+        they never change the data other benchmarks measure.
+        """
+        directory = self.directory
+        if scratch:
+            self._scratch += 1
+            directory = os.path.join(self.root, f"scratch{self._scratch}")
+            shutil.copytree(self.directory, directory)
+        # A zero budget keeps nothing, so every load goes to disk
+        cache = FileCache() if cached else FileCache(max_bytes=0)
+        store = JSONStore(directory, journaled=journaled, cache=cache)
+        self._stores.append(store)
+        return store
+
+    def close(self):
+        # Background compactions would otherwise slow down the next benchmark
+        for store in self._stores:
+            store.close()
+        self._stores = []
+
+    def dtr(self, **kwargs):
+        return DTR(MONTH, YEAR, store=self.store(**kwargs))
+
+
+def bench_load_data_uncached(ctx):
+    instance = ctx.dtr(cached=False)
+    return instance.load_data
+
+
+def bench_load_data_cached(ctx):
+    instance = ctx.dtr()
+    return instance.load_data
+
+
+def bench_save_data_day(ctx):
+    instance = ctx.dtr(scratch=True)
+    day = min(instance.logs)
+    return lambda: instance.save_data(day)
+
+
+def bench_save_data_day_journaled(ctx):
+    instance = ctx.dtr(journaled=True, scratch=True)
+    day = min(instance.logs)
+    return lambda: instance.save_data(day)
+
+
+def bench_save_data_month(ctx):
+    instance = ctx.dtr(scratch=True)
+    return instance.save_data
+
+
+def bench_add_time_entry(ctx):
+    instance = ctx.dtr(journaled=True, scratch=True)
+    days = sorted(instance.logs)
+    state = {"i": 0}
+
+    def add():
+        day = days[state["i"] % len(days)]
+        state["i"] += 1
+        entries = list(instance.logs[day])
+        instance.add_time_entry(day, "11:00 pm", "11:30 pm")
+        # Drop it again in memory only, so every call saves a day of the same size
+        instance.logs[day] = entries
+    return add
+
+
+def bench_calculate_hours(ctx):
+    return ctx.dtr().calculate_hours
+
+
+def bench_calculate_all_hours(ctx):
+    return ctx.dtr().calculate_all_hours
+
+
+def bench_generate_report(ctx):
+    return ctx.dtr().generate_report
+
+
+def bench_script_calculate_hours(ctx):
+    # dtr.py works on a module-level {day: [(start, end), ...]} of strings
+    month = ctx.store().load_month(YEAR, MONTH)
+    logs = {day: [tuple(entry) for entry in entries] for day, entries in month.items()}
+
+    def run():
+        saved, dtr.logs = dtr.logs, logs
+        try:
+            return dtr.calculate_hours()
+        finally:
+            dtr.logs = saved
+    return run
+
+
+BENCHMARKS = {
+    "DTR.load_data (uncached)": bench_load_data_uncached,
+    "DTR.load_data (cached)": bench_load_data_cached,
+    "DTR.save_data (day)": bench_save_data_day,
+    "DTR.save_data (day, journaled)": bench_save_data_day_journaled,
+    "DTR.save_data (month)": bench_save_data_month,
+    "DTR.add_time_entry (journaled)": bench_add_time_entry,
+    "DTR.calculate_hours": bench_calculate_hours,
+    "DTR.calculate_all_hours": bench_calculate_all_hours,
+    "DTR.generate_report": bench_generate_report,
+    "dtr.calculate_hours": bench_script_calculate_hours,
+}
+
+
+def measure(func, repeat, min_time=0.05):
+    """Best time per call over repeat rounds, each at least min_time long"""
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        number *= 2
+    best = elapsed / number
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - started) / number)
+    return best
+
+
+def run(args):
+    results = {}
+    with tempfile.TemporaryDirectory() as root:
+        ctx = Context(root, args)
+        for name, setup in BENCHMARKS.items():
+            if args.filter and args.filter.lower() not in name.lower():
+                continue
+            results[name] = measure(setup(ctx), args.repeat)
+            ctx.close()
+    return results
+
+
+def compare(results, baseline, threshold):
+    """Print results next to the baseline; return the names that regressed"""
+    regressed = []
+    print(f"  {'benchmark':34}{'baseline':>12}{'now':>12}  change")
+    for name, seconds in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"  {name:34}{'-':>12}{seconds * 1e6:9.1f} us  new")
+            continue
+        change = seconds / before - 1
+        flag = ""
+        if change > threshold:
+            flag = "  REGRESSION"
+            regressed.append(name)
+        print(f"  {name:34}{before * 1e6:9.1f} us{seconds * 1e6:9.1f} us  {change:+7.1%}{flag}")
+    return regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--employees", type=int, default=3, help="synthetic employees to generate")
+    parser.add_argument("--years", type=int, default=2, help="years of records per employee")
+    parser.add_argument("--sessions", type=int, default=2, help="sessions per working day")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="rounds per benchmark (best is kept)")
+    parser.add_argument("-k", "--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--save", metavar="FILE", help="write results to a JSON baseline file")
+    parser.add_argument("--compare", metavar="FILE", help="compare results with a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="slowdown counted as a regression (default: 0.25 = 25%%)")
+    args = parser.parse_args(argv)
+
+    params = {"employees": args.employees, "years": args.years,
+              "sessions": args.sessions, "seed": args.seed}
+    results = run(args)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        if baseline.get("params") != params:
+            print(f"Warning: baseline was recorded with {baseline.get('params')}, not {params}")
+        regressed = compare(results, baseline["results"], args.threshold)
+    else:
+        regressed = []
+        for name, seconds in results.items():
+            print(f"  {name:34}{seconds * 1e6:9.1f} us")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({"params": params,
+                       "python": platform.python_version(),
+                       "platform": platform.platform(),
+                       "results": results}, f, indent=2)
+        print(f"Saved {len(results)} results to {args.save}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
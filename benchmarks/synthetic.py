@@ -0,0 +1,112 @@
+"""Synthetic DTR records for benchmarks.
+
+Generates dtr_data_YEAR.json files shaped like real ones: weekdays only,
+the occasional absence, a working day split into sessions around a lunch
+break, and start/end times drawn from lateness and overtime
+distributions.  Everything is driven by a seeded random.Random, so the
+same arguments always produce the same files.
+"""
+import calendar
+import os
+import random
+
+from dtr_journal import Journal
+from dtr_time import format_minutes, parse_minutes
+
+# Latest minute of the day a session may end on
+LAST_MINUTE = 24 * 60 - 1
+
+
+class Profile:
+    """How one synthetic employee works.
+
+    sessions: sessions per working day.  The first break is a lunch break
+    of lunch_minutes, later ones are short_break minutes.
+    absent_rate: chance of not working on a weekday.
+    late_rate, late_mean: chance of starting late, and the mean of the
+    exponentially distributed minutes late.  Punctual days start up to
+    early_max minutes early.
+    overtime_rate, overtime_mean: the same for staying past day_end.
+    """
+
+    def __init__(self, sessions=2, day_start="8:00 am", day_end="5:00 pm",
+                 absent_rate=0.05, late_rate=0.2, late_mean=15, early_max=10,
+                 overtime_rate=0.15, overtime_mean=60,
+                 lunch_minutes=60, short_break=10):
+        self.sessions = sessions
+        self.day_start = day_start
+        self.day_end = day_end
+        self.absent_rate = absent_rate
+        self.late_rate = late_rate
+        self.late_mean = late_mean
+        self.early_max = early_max
+        self.overtime_rate = overtime_rate
+        self.overtime_mean = overtime_mean
+        self.lunch_minutes = lunch_minutes
+        self.short_break = short_break
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+def generate_day(rng, profile):
+    """Raw [[start, end], ...] entries for one working day"""
+    start = parse_minutes(profile.day_start)
+    if rng.random() < profile.late_rate:
+        start += int(rng.expovariate(1 / profile.late_mean)) + 1
+    else:
+        start -= rng.randint(0, profile.early_max)
+    end = parse_minutes(profile.day_end)
+    if rng.random() < profile.overtime_rate:
+        end += int(rng.expovariate(1 / profile.overtime_mean)) + 1
+    end = min(end, LAST_MINUTE)
+
+    # Split the day into equal sessions with the breaks taken out
+    breaks = [profile.lunch_minutes] + [profile.short_break] * (profile.sessions - 2)
+    breaks = breaks[:profile.sessions - 1]
+    length = max(1, (end - start - sum(breaks)) // profile.sessions)
+    entries = []
+    for i in range(profile.sessions):
+        session_end = min(start + length, LAST_MINUTE)
+        if session_end <= start:
+            break
+        entries.append([format_minutes(start), format_minutes(session_end)])
+        start = session_end + (breaks[i] if i < len(breaks) else 0)
+    return entries
+
+
+def generate_year(rng, year, profile):
+    """Raw {month: {day: entries}} data for one year, as stored in a year file"""
+    data = {}
+    for month in range(1, 13):
+        month_data = {}
+        for day in range(1, calendar.monthrange(year, month)[1] + 1):
+            if calendar.weekday(year, month, day) >= 5 or rng.random() < profile.absent_rate:
+                continue
+            month_data[str(day)] = generate_day(rng, profile)
+        data[str(month)] = month_data
+    return data
+
+
+def write_employee(directory, years, profile=None, seed=0):
+    """Write dtr_data_YEAR.json (and its month index) for each year into directory"""
+    profile = profile or Profile()
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    for year in years:
+        Journal(os.path.join(directory, f"dtr_data_{year}.json")).replace_snapshot(
+            generate_year(rng, year, profile))
+
+
+def write_tree(root, employees, years, profile=None, seed=0):
+    """Write one directory of year files per employee (emp0000, emp0001, ...)
+
+    This is the layout dtr_aggregate.discover_employees and "dtr.py import"
+    use.  Returns the employee directory names.
+    """
+    names = []
+    for e in range(employees):
+        name = f"emp{e:04d}"
+        write_employee(os.path.join(root, name), years, profile, seed=seed * 100003 + e)
+        names.append(name)
+    return names
@@ -1,5 +1,8 @@
-import datetime
-from datetime import timedelta
+import os
+import sys
+import time
+from dtr_core import hours_by_day
+from dtr_profile import enable_from_env, span
 
 # Define the daily logs (arrival/departure times)
 logs = {
@@ -36,33 +39,12 @@ logs = {
     31: [],  
 }
 
-def parse_time(t):
-    """Parse time strings in 12-hour format."""
-    return datetime.datetime.strptime(t, "%I:%M %p")
-
+@span("dtr.calculate_hours")
 def calculate_hours():
     """Calculate total hours worked and generate daily breakdown."""
-    total_minutes = 0
-    daily_hours = {}
-    
-    for day in range(1, 32):
-        day_minutes = 0
-        if day in logs and logs[day]:
-            for start, end in logs[day]:
-                start_dt = parse_time(start)
-                end_dt = parse_time(end)
-                diff = end_dt - start_dt
-                minutes = diff.total_seconds() / 60
-                day_minutes += minutes
-            
-            daily_hours[day] = round(day_minutes / 60, 2)
-            total_minutes += day_minutes
-        else:
-            daily_hours[day] = 0
-    
-    total_hours = round(total_minutes / 60, 2)
-    return total_hours, daily_hours
+    return hours_by_day(logs)
 
+@span("dtr.generate_report")
 def generate_report():
     """Generate a summary report of worked hours."""
     total_hours, daily_hours = calculate_hours()
@@ -83,6 +65,230 @@ def generate_report():
     
     return total_hours
 
-if __name__ == "__main__":
+def open_stores(args):
+    """(store_for, close) for the storage options shared by import and ingest."""
+    from dtr_storage import ShardedStore, SQLiteStore
+    
+    stores = {}
+    # All employees share one database connection
+    database = SQLiteStore(args.db, args.employee) if args.db else None
+    
+    def store_for(employee):
+        if employee not in stores:
+            if database is not None:
+                stores[employee] = database.for_employee(employee)
+            else:
+                # Other employees' year files go in their own subdirectory
+                directory = args.dir if employee == args.employee else os.path.join(args.dir, employee)
+                os.makedirs(directory, exist_ok=True)
+                stores[employee] = ShardedStore(directory, journaled=args.journaled)
+        return stores[employee]
+    
+    def close():
+        for store in stores.values():
+            store.close()
+        if database is not None:
+            database.close()
+    return store_for, close
+
+def run_import(args):
+    """Bulk import punches from a CSV or JSON-lines file into storage."""
+    from dtr_import import import_file
+    
+    def report_error(bad_row):
+        print(f"{args.file}:{bad_row.line}: {bad_row.message}", file=sys.stderr)
+    
+    fmt = args.format or ("jsonl" if args.file.endswith((".jsonl", ".ndjson")) else "csv")
+    store_for, close = open_stores(args)
+    started = time.perf_counter()
+    f = sys.stdin if args.file == "-" else open(args.file, newline="")
+    try:
+        summary = import_file(f, fmt, store_for, default_employee=args.employee, on_error=report_error)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+        close()
+    elapsed = time.perf_counter() - started
+    
+    print(f"Imported {summary.imported} entries into {summary.months_written} month(s) "
+          f"in {elapsed:.2f}s, {summary.merged} overlapping entries merged, "
+          f"{summary.rejected} row(s) rejected")
+    return 1 if summary.rejected else 0
+
+def run_ingest(args):
+    """Pair raw clock-in/clock-out events from a file into sessions and store them."""
+    import datetime
+    from dtr_events import ingest_file
+    
+    def report_error(bad_row):
+        print(f"{args.file}:{bad_row.line}: {bad_row.message}", file=sys.stderr)
+    
+    fmt = args.format or ("jsonl" if args.file.endswith((".jsonl", ".ndjson")) else "csv")
+    store_for, close = open_stores(args)
+    started = time.perf_counter()
+    f = sys.stdin if args.file == "-" else open(args.file, newline="")
+    try:
+        events, imported = ingest_file(
+            f, fmt, store_for, default_employee=args.employee, on_error=report_error,
+            window=datetime.timedelta(seconds=args.window),
+            debounce=datetime.timedelta(seconds=args.debounce),
+            max_session=datetime.timedelta(hours=args.max_session))
+    finally:
+        if f is not sys.stdin:
+            f.close()
+        close()
+    elapsed = time.perf_counter() - started
+    
+    print(f"Paired {events.events} events into {events.sessions} sessions "
+          f"({events.overnight} overnight) in {elapsed:.2f}s, {events.duplicates} duplicate taps dropped, "
+          f"{events.orphans} orphaned, {events.late} too late, {events.rejected} row(s) rejected")
+    print(f"Imported {imported.imported} entries into {imported.months_written} month(s), "
+          f"{imported.merged} overlapping entries merged")
+    return 1 if events.orphans or events.late or events.rejected else 0
+
+def parse_date_range(args):
+    """(start, end) dates from --from and --to, None where not given"""
+    import datetime
+    
+    start = datetime.date.fromisoformat(args.start) if args.start else None
+    end = datetime.date.fromisoformat(args.end) if args.end else None
+    return start, end
+
+def run_export(args):
+    """Stream a report for many employees and dates to a file."""
+    from dtr_export import FORMATS, employee_stores, export_report, report_rows
+    from dtr_storage import SQLiteStore
+    
+    try:
+        start, end = parse_date_range(args)
+    except ValueError as e:
+        print(f"Invalid date: {e}", file=sys.stderr)
+        return 2
+    extension = os.path.splitext(args.output or "")[1].lstrip(".")
+    fmt = args.format or {"txt": "text", "ndjson": "jsonl"}.get(extension, extension)
+    if fmt not in FORMATS:
+        fmt = "csv"
+    
+    database = SQLiteStore(args.db) if args.db else None
+    started = time.perf_counter()
+    f = sys.stdout if args.output in (None, "-") else open(args.output, "w", newline="")
+    try:
+        stores = employee_stores(args.dir, args.employee, database)
+        written = export_report(report_rows(stores, start, end), f, fmt)
+    finally:
+        if f is not sys.stdout:
+            f.close()
+        if database is not None:
+            database.close()
+    elapsed = time.perf_counter() - started
+    
+    print(f"Exported {written} day(s) in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+def run_hours(args):
+    """Print hours worked per employee over a date range or its pay periods."""
+    from dtr_cache import year_cache
+    from dtr_export import employee_stores
+    from dtr_periods import CalendarIndex, periods
+    from dtr_storage import SQLiteStore
+    
+    try:
+        start, end = parse_date_range(args)
+    except ValueError as e:
+        print(f"Invalid date: {e}", file=sys.stderr)
+        return 2
+    if end < start:
+        print("--to is before --from", file=sys.stderr)
+        return 2
+    ranges = list(periods(args.period, start, end, args.fiscal_start)) if args.period else [(start, end)]
+    
+    database = SQLiteStore(args.db) if args.db else None
+    try:
+        for employee, store in employee_stores(args.dir, args.employee, database, cache=year_cache):
+            index = CalendarIndex(store)
+            for first, last, hours in index.period_hours(ranges):
+                print(f"{employee}\t{first}\t{last}\t{hours}")
+    finally:
+        if database is not None:
+            database.close()
+    return 0
+
+def main(argv=None):
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Daily Time Record tools")
+    parser.add_argument("--profile", nargs="?", const="summary", metavar="TRACE_FILE",
+                        help="print timings on exit, or write a Chrome trace to TRACE_FILE (.json)")
+    commands = parser.add_subparsers(dest="command")
+    commands.add_parser("report", help="print the summary report for the built-in logs (default)")
+    
+    # Where import and ingest write their entries
+    storage_options = argparse.ArgumentParser(add_help=False)
+    storage_options.add_argument("--db", help="import into this SQLite database instead of JSON files")
+    storage_options.add_argument("--dir", default=".", help="records directory (default: current)")
+    storage_options.add_argument("--employee", default="default",
+                                 help="employee for rows without an employee column")
+    storage_options.add_argument("--journaled", action="store_true",
+                                 help="append to the journal of years kept in one dtr_data_YEAR.json file")
+    
+    import_parser = commands.add_parser("import", parents=[storage_options],
+                                        help="bulk import punches from CSV or JSON lines")
+    import_parser.add_argument("file", help="input file, or - for standard input")
+    import_parser.add_argument("--format", choices=["csv", "jsonl"],
+                               help="input format (default: guessed from the file extension)")
+    
+    ingest_parser = commands.add_parser("ingest", parents=[storage_options],
+                                        help="pair raw clock-in/clock-out events into sessions and store them")
+    ingest_parser.add_argument("file", help="input file, or - for standard input")
+    ingest_parser.add_argument("--format", choices=["csv", "jsonl"],
+                               help="input format (default: guessed from the file extension)")
+    ingest_parser.add_argument("--window", type=float, default=300,
+                               help="seconds events may arrive out of order (default: %(default)s)")
+    ingest_parser.add_argument("--debounce", type=float, default=60,
+                               help="seconds within which repeated taps count once (default: %(default)s)")
+    ingest_parser.add_argument("--max-session", type=float, default=16,
+                               help="hours after which a clock-in without clock-out is orphaned (default: %(default)s)")
+    
+    export_parser = commands.add_parser("export", help="stream a report for many employees to a file")
+    export_parser.add_argument("-o", "--output", help="output file (default: standard output)")
+    export_parser.add_argument("--format", choices=["csv", "jsonl", "text"],
+                               help="output format (default: from the file extension, else csv)")
+    export_parser.add_argument("--from", dest="start", metavar="YYYY-MM-DD", help="first day to include")
+    export_parser.add_argument("--to", dest="end", metavar="YYYY-MM-DD", help="last day to include")
+    export_parser.add_argument("--employee", action="append",
+                               help="only include this employee (repeatable; default: all)")
+    export_parser.add_argument("--db", help="export from this SQLite database instead of JSON files")
+    export_parser.add_argument("--dir", default=".", help="records directory, laid out as by import")
+    
+    hours_parser = commands.add_parser("hours", help="hours per employee over a date range or pay periods")
+    hours_parser.add_argument("--from", dest="start", metavar="YYYY-MM-DD", required=True,
+                              help="first day to include")
+    hours_parser.add_argument("--to", dest="end", metavar="YYYY-MM-DD", required=True,
+                              help="last day to include")
+    hours_parser.add_argument("--period", choices=["semi-monthly", "monthly", "quarterly", "yearly"],
+                              help="split the range into these periods")
+    hours_parser.add_argument("--fiscal-start", type=int, default=1, choices=range(1, 13), metavar="MONTH",
+                              help="month quarterly and yearly periods start from (default: 1)")
+    hours_parser.add_argument("--employee", action="append",
+                              help="only include this employee (repeatable; default: all)")
+    hours_parser.add_argument("--db", help="read from this SQLite database instead of JSON files")
+    hours_parser.add_argument("--dir", default=".", help="records directory, laid out as by import")
+    
+    args = parser.parse_args(argv)
+    if args.profile:
+        enable_from_env(args.profile)
+    if args.command == "import":
+        return run_import(args)
+    if args.command == "ingest":
+        return run_ingest(args)
+    if args.command == "export":
+        return run_export(args)
+    if args.command == "hours":
+        return run_hours(args)
+    
     total_hours = generate_report()
-    print(f"x hours: {total_hours}")
\ No newline at end of file
+    print(f"x hours: {total_hours}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
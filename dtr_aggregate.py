@@ -0,0 +1,125 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from dtr_archive import SUFFIX as ARCHIVE_SUFFIX, YearArchive
+from dtr_cache import FileCache
+from dtr_journal import Journal
+from dtr_storage import ShardedStore, find_year_files
+from dtr_time import parse_end_minutes, parse_minutes, union_minutes
+
+# Below this many files the pool costs more to start than it saves
+MIN_PARALLEL_TASKS = 4
+
+
+def year_file_minutes(path):
+    """Worked minutes per month for one year file, journal included.
+
+    path may also be an archive or a dtr_data_YEAR/ month directory.
+    Runs in worker processes, so it reads the file itself and returns only
+    a small {month: minutes} dict.
+    """
+    if os.path.isdir(path):
+        # Month files keep their day totals, so no entry is read either
+        year = int(os.path.basename(path)[len("dtr_data_"):])
+        store = ShardedStore(os.path.dirname(path), cache=FileCache(max_bytes=0))
+        return dict(store.load_totals(year).months)
+    if path.endswith(ARCHIVE_SUFFIX):
+        # Archives store each month's worked minutes, so no entry is read
+        with YearArchive(path) as archive:
+            return {month: minutes for month, (_, _, minutes) in archive.months.items()}
+    months = {}
+    for month_key, month_data in Journal(path).load().items():
+        month_minutes = 0
+        for entries in month_data.values():
+            intervals = []
+            for start, end in entries:
+                start_min = parse_minutes(start)
+                end_min = parse_end_minutes(end)
+                if start_min is not None and end_min is not None:
+                    intervals.append((start_min, end_min))
+            # Overlapping sessions are counted once, as DTR does
+            month_minutes += union_minutes(intervals)
+        months[int(month_key)] = month_minutes
+    return months
+
+
+def _year_file_task(task):
+    employee, year, path = task
+    return employee, year, year_file_minutes(path)
+
+
+def discover_employees(root, root_employee="default"):
+    """Map employee -> directory for a records tree.
+
+    Year files directly in root belong to root_employee; every subdirectory
+    holding year files belongs to the employee it is named after (the layout
+    written by "dtr.py import").  Archived and month-sharded years count.
+    """
+    sources = {}
+    if find_year_files(root, archived=True, sharded=True):
+        sources[root_employee] = root
+    for name in sorted(os.listdir(root)):
+        path = os.path.join(root, name)
+        if os.path.isdir(path) and find_year_files(path, archived=True, sharded=True):
+            sources[name] = path
+    return sources
+
+
+def aggregate_hours(sources, years=None, workers=None):
+    """Total hours for many employees across all their year files.
+
+    sources maps employee -> directory of dtr_data_YEAR.json files.  Each
+    year file is summed in its own task on a process pool and the partial
+    results are merged per employee into the calculate_all_hours shape,
+    (hours, minutes, months_data), except that months_data is keyed by
+    (year, month) since several years are combined.
+
+    workers=1 (or too few files to be worth it) runs everything serially in
+    this process; so does any platform where a process pool can't start.
+    """
+    tasks = [(employee, year, path)
+             for employee, directory in sources.items()
+             for year, path in find_year_files(directory, archived=True, sharded=True).items()
+             if years is None or year in years]
+
+    workers = workers or os.cpu_count() or 1
+    results = None
+    if workers > 1 and len(tasks) >= MIN_PARALLEL_TASKS:
+        chunksize = max(1, len(tasks) // (workers * 4))
+        try:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_year_file_task, tasks, chunksize=chunksize))
+        except (NotImplementedError, OSError, BrokenProcessPool):
+            results = None
+    if results is None:
+        results = map(_year_file_task, tasks)
+
+    month_minutes = {employee: {} for employee in sources}
+    for employee, year, months in results:
+        for month, minutes in months.items():
+            month_minutes[employee][(year, month)] = minutes
+
+    totals = {}
+    for employee, months in month_minutes.items():
+        months_data = {key: round(minutes / 60, 2) for key, minutes in sorted(months.items())}
+        hours, minutes = divmod(sum(months.values()), 60)
+        totals[employee] = (hours, minutes, months_data)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Total hours for every employee under a records directory")
+    parser.add_argument("root", nargs="?", default=".", help="records directory (default: current)")
+    parser.add_argument("--year", type=int, action="append", help="only include this year (repeatable)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: CPU count, 1 = serial)")
+    args = parser.parse_args()
+
+    totals = aggregate_hours(discover_employees(args.root), years=args.year, workers=args.workers)
+    for employee, (hours, minutes, months_data) in totals.items():
+        print(f"{employee}: {hours} hours and {minutes} minutes over {len(months_data)} month(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+
+from dtr_index import index_file_for
+from dtr_profile import count, span
+from dtr_time import Entry, merged_minutes
+from dtr_totals import YearTotals, totals_file_for
+
+# A closed year packed into flat little-endian columns:
+#
+#   header    magic, version, year, bit mask of stored months, day and entry counts
+#   months    12 x (first day row, day rows, worked minutes)
+#   days      day of month (u8), first entry row (u32), entry count (u16), worked minutes (u32)
+#   entries   start minute (u16), end minute (u16)
+#
+# Every column starts on a 4-byte boundary, so on little-endian machines
+# each one is read straight out of the memory-mapped file without a copy.
+
+MAGIC = b"DTRA"
+VERSION = 1
+SUFFIX = ".dtra"
+
+_HEADER = struct.Struct("<4sHHHxxII")
+_MONTH = struct.Struct("<III")
+_MONTHS_SIZE = 12 * _MONTH.size
+
+# (name, array typecode) in file order; day columns first, then entry columns
+_DAY_COLUMNS = (("day", "B"), ("first", "I"), ("length", "H"), ("minutes", "I"))
+_ENTRY_COLUMNS = (("start", "H"), ("end", "H"))
+
+
+def archive_file_for(data_file):
+    """Path of the archive that replaces a year data file"""
+    return os.path.splitext(data_file)[0] + SUFFIX
+
+
+def _padded(size):
+    return (size + 3) & ~3
+
+
+def _layout(day_count, entry_count):
+    """Byte offset of every column, and the total file size"""
+    offsets = {}
+    position = _HEADER.size + _MONTHS_SIZE
+    for columns, rows in ((_DAY_COLUMNS, day_count), (_ENTRY_COLUMNS, entry_count)):
+        for name, code in columns:
+            offsets[name] = position
+            position += _padded(rows * array(code).itemsize)
+    return offsets, position
+
+
+@span("write_archive")
+def write_archive(path, year, months):
+    """Write {month: {day: [Entry, ...]}} for a year as an archive file.
+
+    Entries are stored sorted within each day.  The file is written to a
+    temporary name and renamed into place, so readers never see half of it.
+    """
+    columns = {name: array(code) for name, code in _DAY_COLUMNS + _ENTRY_COLUMNS}
+    month_rows = []
+    mask = 0
+    for month in range(1, 13):
+        days = months.get(month)
+        first_day = len(columns["day"])
+        month_minutes = 0
+        if days is not None:
+            mask |= 1 << (month - 1)
+            for day in sorted(days):
+                entries = sorted(days[day])
+                minutes = merged_minutes(entries)
+                columns["day"].append(day)
+                columns["first"].append(len(columns["start"]))
+                columns["length"].append(len(entries))
+                columns["minutes"].append(minutes)
+                for entry in entries:
+                    columns["start"].append(entry.start)
+                    columns["end"].append(entry.end)
+                month_minutes += minutes
+        month_rows.append((first_day, len(columns["day"]) - first_day, month_minutes))
+
+    if sys.byteorder != "little":
+        for column in columns.values():
+            column.byteswap()
+
+    day_count, entry_count = len(columns["day"]), len(columns["start"])
+    offsets, size = _layout(day_count, entry_count)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, year, mask, day_count, entry_count))
+        for row in month_rows:
+            f.write(_MONTH.pack(*row))
+        for name, _ in _DAY_COLUMNS + _ENTRY_COLUMNS:
+            f.write(b"\0" * (offsets[name] - f.tell()))
+            f.write(columns[name].tobytes())
+        f.write(b"\0" * (size - f.tell()))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    count("bytes written", size)
+    return size
+
+
+class YearArchive:
+    """Read-only view of an archive file through mmap.
+
+    Columns are memoryviews into the mapping, so opening an archive reads
+    only its header; entries are paged in as months are asked for.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            self._read_header()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_header(self):
+        if len(self._map) < _HEADER.size + _MONTHS_SIZE:
+            raise ValueError(f"{self.path} is not a DTR archive")
+        magic, version, self.year, mask, day_count, entry_count = _HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a version {VERSION} DTR archive")
+        offsets, size = _layout(day_count, entry_count)
+        if len(self._map) < size:
+            raise ValueError(f"{self.path} is truncated")
+
+        self.months = {}
+        for month in range(1, 13):
+            if mask & (1 << (month - 1)):
+                self.months[month] = _MONTH.unpack_from(self._map, _HEADER.size + (month - 1) * _MONTH.size)
+        view = memoryview(self._map)
+        self._views.append(view)
+        for columns, rows in ((_DAY_COLUMNS, day_count), (_ENTRY_COLUMNS, entry_count)):
+            for name, code in columns:
+                setattr(self, name, self._column(view, offsets[name], code, rows))
+        count("bytes read", _HEADER.size + _MONTHS_SIZE)
+
+    def _column(self, view, offset, code, rows):
+        itemsize = array(code).itemsize
+        raw = view[offset:offset + rows * itemsize]
+        if sys.byteorder == "little":
+            column = raw.cast(code)
+            self._views.extend((raw, column))
+            return column
+        # Big-endian machines need a swapped copy
+        column = array(code, raw.tobytes())
+        column.byteswap()
+        raw.release()
+        return column
+
+    def month(self, month):
+        """Return {day: [Entry, ...]} for one month"""
+        if month not in self.months:
+            return {}
+        first_day, day_rows, _ = self.months[month]
+        start, end = self.start, self.end
+        days = {}
+        for row in range(first_day, first_day + day_rows):
+            first = self.first[row]
+            days[self.day[row]] = [Entry(start[i], end[i]) for i in range(first, first + self.length[row])]
+        count("entries loaded", sum(len(entries) for entries in days.values()))
+        return days
+
+    def load_year(self):
+        """Return {month: {day: [Entry, ...]}} for the whole year"""
+        return {month: self.month(month) for month in self.months}
+
+    def totals(self):
+        """YearTotals from the per-day minutes stored in the archive"""
+        totals = YearTotals()
+        for month, (first_day, day_rows, _) in self.months.items():
+            totals.months.setdefault(month, 0)
+            for row in range(first_day, first_day + day_rows):
+                totals.set_day(month, self.day[row], self.minutes[row])
+        return totals
+
+    def close(self):
+        # Views into the mapping have to be released before it can be closed
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        for name, _ in _DAY_COLUMNS + _ENTRY_COLUMNS:
+            self.__dict__.pop(name, None)
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def archive_year(directory, year, keep=False):
+    """Pack a year's JSON files into dtr_data_YEAR.dtra.
+
+    The archive is read back and compared with the JSON data before the
+    year file, its journal, index and totals file, or the year's
+    dtr_data_YEAR/ month directory, are removed (unless keep=True).
+    Returns (json bytes, archive bytes).
+    """
+    from dtr_storage import ShardedStore
+
+    store = ShardedStore(directory, journaled=True)
+    try:
+        data_file = store.year_files.data_file(year)
+        year_dir = store.year_dir(year)
+        if os.path.isdir(year_dir):
+            months = store.load_year(year)
+            related = [store.month_file(year, month) for month in range(1, 13)]
+            side_files = [os.path.splitext(path)[0] + ".lock" for path in related]
+        else:
+            if not os.path.exists(data_file):
+                raise FileNotFoundError(f"{data_file} does not exist")
+            months = store.load_year(year)
+            journal = store.year_files.journal(year)
+            related = [data_file, journal.journal_file, journal.rotated_file]
+            side_files = [index_file_for(data_file), totals_file_for(data_file)]
+    finally:
+        store.close()
+
+    archive_file = archive_file_for(data_file)
+    archive_size = write_archive(archive_file, year, months)
+    with YearArchive(archive_file) as archive:
+        stored = archive.load_year()
+    if _plain(stored) != _plain(months):
+        os.remove(archive_file)
+        raise ValueError(f"Archive of {year} does not match its JSON data")
+
+    json_size = sum(os.path.getsize(path) for path in related if os.path.exists(path))
+    if not keep:
+        for path in related + side_files:
+            if os.path.exists(path):
+                os.remove(path)
+        if os.path.isdir(year_dir) and not os.listdir(year_dir):
+            os.rmdir(year_dir)
+    return json_size, archive_size
+
+
+def _plain(months):
+    return {month: {day: sorted((e.start, e.end) for e in entries) for day, entries in days.items()}
+            for month, days in months.items()}
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Pack closed DTR years into read-only binary archives")
+    parser.add_argument("year", type=int, nargs="+")
+    parser.add_argument("--dir", default=".", help="directory of dtr_data_YEAR.json files (default: current)")
+    parser.add_argument("--keep", action="store_true", help="keep the JSON files after archiving")
+    args = parser.parse_args()
+
+    for year in args.year:
+        started = time.perf_counter()
+        json_size, archive_size = archive_year(args.dir, year, keep=args.keep)
+        elapsed = time.perf_counter() - started
+        print(f"{year}: {json_size:,} bytes of JSON -> {archive_size:,} byte archive "
+              f"({json_size / archive_size:.1f}x smaller) in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
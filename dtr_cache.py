@@ -0,0 +1,113 @@
+import os
+import threading
+from collections import OrderedDict
+
+from dtr_profile import count
+
+# Rough budget for parsed data kept in memory across all DTR instances
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Approximate in-memory cost of parsed values, used to enforce the budget
+ENTRY_COST = 120
+DAY_COST = 100
+
+
+def file_stamp(*paths):
+    """(size, mtime) for each path, or None for missing files"""
+    stamp = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            stamp.append(None)
+        else:
+            stamp.append((st.st_size, st.st_mtime_ns))
+    return tuple(stamp)
+
+
+def file_fingerprint(path):
+    """[size, mtime] of one file as recorded in JSON side files, or None if missing"""
+    stamp = file_stamp(path)[0]
+    return None if stamp is None else list(stamp)
+
+
+def month_cost(days):
+    """Estimated memory used by a parsed {day: [Entry, ...]} month"""
+    return sum(DAY_COST + ENTRY_COST * len(entries) for entries in days.values())
+
+
+class FileCache:
+    """Process-wide LRU cache of data parsed from DTR files.
+
+    Every value is stored with a stamp built from the size and mtime of the
+    files it was read from, and a lookup only hits while those files are
+    unchanged, so edits made by other processes are always picked up.
+    Least recently used values are evicted once the estimated memory of
+    everything cached passes max_bytes.
+    """
+
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._values = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, stamp):
+        """Return the cached value for key if it was stored with this stamp"""
+        with self._lock:
+            cached = self._values.get(key)
+            if cached is None or cached[0] != stamp:
+                self.misses += 1
+                count("cache misses")
+                return None
+            self._values.move_to_end(key)
+            self.hits += 1
+            count("cache hits")
+            return cached[1]
+
+    def put(self, key, stamp, value, cost):
+        with self._lock:
+            self._discard(key)
+            if cost > self.max_bytes:
+                return
+            self._values[key] = (stamp, value, cost)
+            self.current_bytes += cost
+            while self.current_bytes > self.max_bytes:
+                oldest = next(iter(self._values))
+                self._discard(oldest)
+                self.evictions += 1
+
+    def restamp(self, match, old_stamp, new_stamp):
+        """Carry values over to new_stamp after a write that didn't change them.
+
+        Applies to every key accepted by match(key) that is still stored
+        with old_stamp.
+        """
+        with self._lock:
+            for key, (stamp, value, cost) in self._values.items():
+                if stamp == old_stamp and match(key):
+                    self._values[key] = (new_stamp, value, cost)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+            self.current_bytes = 0
+
+    def _discard(self, key):
+        cached = self._values.pop(key, None)
+        if cached is not None:
+            self.current_bytes -= cached[2]
+
+    def __len__(self):
+        return len(self._values)
+
+
+# Shared by every JSONStore in the process
+year_cache = FileCache()
@@ -0,0 +1,167 @@
+import calendar
+
+try:
+    import numpy as np
+except ImportError:  # the columnar engine is optional
+    np = None
+
+from dtr_time import parse_minutes, union_minutes
+
+# Larger than any minute-of-day value; used to keep days apart in one array
+MINUTE_SPAN = 4096
+
+# Default working day: expected start time and regular minutes before overtime
+DEFAULT_START_TIME = "8:00 am"
+DEFAULT_REGULAR_MINUTES = 8 * 60
+
+
+def iter_store_rows(stores, years, present_months=None):
+    """Yield (employee, year, month, day, start_min, end_min) for every stored entry.
+
+    If present_months is a list, every stored (employee, year, month) is
+    appended to it, including months without entries.
+    """
+    for employee, store in stores.items():
+        for year in years:
+            for month, days in store.load_year(year).items():
+                if present_months is not None:
+                    present_months.append((employee, year, month))
+                for day, entries in days.items():
+                    for entry in entries:
+                        yield employee, year, month, day, entry.start, entry.end
+
+
+def python_monthly_summary(rows, start_time=DEFAULT_START_TIME, regular_minutes=DEFAULT_REGULAR_MINUTES):
+    """Reference pure-Python version of ColumnarReport.monthly_summary"""
+    expected = parse_minutes(start_time)
+    intervals = {}
+    for employee, year, month, day, start, end in rows:
+        intervals.setdefault((employee, year, month, day), []).append((start, end))
+
+    summary = {}
+    for (employee, year, month, day), pairs in sorted(intervals.items()):
+        worked = union_minutes(pairs)
+        first = min(start for start, _ in pairs)
+        month_summary = summary.setdefault((employee, year, month), {"worked": 0, "late": 0, "overtime": 0})
+        month_summary["worked"] += worked
+        month_summary["late"] += max(0, first - expected)
+        month_summary["overtime"] += max(0, worked - regular_minutes)
+    return summary
+
+
+class ColumnarReport:
+    """Vectorized hour totals over entries for many employees.
+
+    Entries are held as parallel NumPy arrays (employee, year, month, day,
+    start_min, end_min).  They are sorted once by day and start time, so
+    overlapping sessions can be clipped against the latest end seen so far
+    in their day.  Daily sums then come from np.add.reduceat, monthly and
+    yearly sums from further reductions, and individual months are found
+    with np.searchsorted.
+    Results are returned as plain Python numbers rounded the same way as
+    DTR, so they compare equal to the pure-Python path.
+    """
+
+    def __init__(self, rows, present_months=()):
+        if np is None:
+            raise RuntimeError("The columnar report engine requires NumPy")
+        rows = list(rows)
+        self.employees = sorted({row[0] for row in rows} | {key[0] for key in present_months})
+        self._employee_ids = employee_ids = {name: i for i, name in enumerate(self.employees)}
+        # Months that exist in storage even if they hold no entries
+        self.present_months = {(employee_ids[e], y, m) for e, y, m in present_months}
+
+        columns = np.array([(employee_ids[e], y, m, d, s, t) for e, y, m, d, s, t in rows],
+                           dtype=np.int64).reshape(-1, 6)
+        employee, year, month, day, start, end = columns.T
+        key = ((employee * 10000 + year) * 13 + month) * 32 + day
+        order = np.lexsort((end, start, key))
+        key, start, end = key[order], start[order], end[order]
+
+        # One row per (employee, year, month, day) that has entries
+        if len(key):
+            firsts = np.flatnonzero(np.r_[True, key[1:] != key[:-1]])
+            # Keys only grow, so a running max over key-tagged ends never
+            # carries one day's latest end into the next day
+            tagged = key * MINUTE_SPAN + end
+            reach = np.maximum.accumulate(tagged) - key * MINUTE_SPAN
+            previous = np.r_[0, reach[:-1]]
+            previous[firsts] = start[firsts]
+            # Time already covered by an earlier session of the day is not counted again
+            clipped = np.maximum(start, previous)
+            worked = np.where(end > clipped, end - clipped, 0)
+            self.day_key = key[firsts]
+            self.day_minutes = np.add.reduceat(worked, firsts)
+            self.day_first_start = np.minimum.reduceat(start, firsts)
+        else:
+            self.day_key = self.day_minutes = self.day_first_start = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def from_stores(cls, stores, years):
+        """Load every entry for the given years from {employee: Store}"""
+        present = []
+        rows = list(iter_store_rows(stores, years, present))
+        return cls(rows, present)
+
+    def _month_key(self, employee, year, month):
+        return (self._employee_ids[employee] * 10000 + year) * 13 + month
+
+    def _slice(self, low_key, high_key):
+        # day_key is sorted, so any key range is a contiguous slice
+        low, high = np.searchsorted(self.day_key, [low_key, high_key])
+        return slice(low, high)
+
+    def calculate_hours(self, employee, year, month):
+        """Same result as DTR.calculate_hours for that employee's month"""
+        days_in_month = calendar.monthrange(year, month)[1]
+        daily_hours = dict.fromkeys(range(1, days_in_month + 1), 0)
+        if employee not in self.employees:
+            return 0.0, daily_hours
+
+        base = self._month_key(employee, year, month) * 32
+        span = self._slice(base + 1, base + days_in_month + 1)
+        days = (self.day_key[span] - base).tolist()
+        minutes = self.day_minutes[span].tolist()
+        for day, day_minutes in zip(days, minutes):
+            daily_hours[day] = round(day_minutes / 60, 2)
+        return round(sum(minutes) / 60, 2), daily_hours
+
+    def calculate_all_hours(self, employee, year):
+        """Same result as DTR.calculate_all_hours for that employee's year"""
+        if employee not in self.employees:
+            return 0, 0, {}
+        employee_id = self._employee_ids[employee]
+        base = self._month_key(employee, year, 0) * 32
+        span = self._slice(base, base + 13 * 32)
+        months = (self.day_key[span] - base) // 32
+        month_minutes = np.bincount(months, weights=self.day_minutes[span], minlength=13).astype(np.int64)
+
+        months_data = {}
+        for month in range(1, 13):
+            if month_minutes[month] or (employee_id, year, month) in self.present_months:
+                months_data[month] = round(int(month_minutes[month]) / 60, 2)
+        hours, minutes = divmod(int(month_minutes.sum()), 60)
+        return hours, minutes, months_data
+
+    def monthly_summary(self, start_time=DEFAULT_START_TIME, regular_minutes=DEFAULT_REGULAR_MINUTES):
+        """Worked, late and overtime minutes per (employee, year, month).
+
+        A day is late by however much its first session starts after
+        start_time; overtime is whatever a day's total exceeds regular_minutes.
+        """
+        expected = parse_minutes(start_time)
+        late = np.maximum(self.day_first_start - expected, 0)
+        overtime = np.maximum(self.day_minutes - regular_minutes, 0)
+
+        month_keys, group = np.unique(self.day_key // 32, return_inverse=True)
+        sums = [np.bincount(group, weights=values, minlength=len(month_keys)).astype(np.int64)
+                for values in (self.day_minutes, late, overtime)]
+
+        summary = {}
+        for key, worked, late_min, overtime_min in zip(month_keys.tolist(), *(s.tolist() for s in sums)):
+            rest, month = divmod(key, 13)
+            employee_id, year = divmod(rest, 10000)
+            summary[(self.employees[employee_id], year, month)] = {
+                "worked": worked, "late": late_min, "overtime": overtime_min,
+            }
+        return summary
@@ -0,0 +1,337 @@
+import bisect
+import calendar
+import datetime
+
+from dtr_periods import CalendarIndex
+from dtr_profile import span
+from dtr_time import (check_day, check_entry, find_overlap, insert_entry, load_entries, merged_minutes,
+                      normalize_day, parse_datetime)
+
+# The DTR engine without any GUI.  Only what the engine itself needs is
+# imported here, so scripts, batch jobs and the report service start
+# quickly and work on machines without Tk.
+
+
+class DTR:
+    def __init__(self, month=None, year=None, journaled=False, store=None, autosave=True):
+        # Set default to current month and year if not provided
+        today = datetime.datetime.now()
+        self.month = month if month else today.month
+        self.year = year if year else today.year
+        
+        if store is None:
+            # Default to the records in the current directory
+            from dtr_storage import ShardedStore
+            store = ShardedStore(journaled=journaled)
+        self.store = store
+        # Without autosave, edited days are only recorded here until save_days is called
+        self.autosave = autosave
+        self.unsaved = set()
+        self.logs = self.load_data()
+        # Checked once here, so edits never touch the store before saving:
+        # the GUI edits on the Tk thread and only uses the store from its
+        # worker.  The store still refuses to write a year archived later.
+        self.archived = self.store.is_archived(self.year)
+        # Each day as last read from or saved to the store.  Saves pass it
+        # along so the store only applies what changed since, keeping edits
+        # other programs saved to the same day in the meantime.
+        self._saved = {day: list(entries) for day, entries in self.logs.items()}
+        # Entry id -> (day, entry), built when first needed
+        self._ids = None
+        # Running day/month/year sums, kept up to date by the store on every save
+        self.totals = self.store.load_totals(self.year)
+    
+    @span("DTR.load_data")
+    def load_data(self):
+        """Load time records for the month from the store"""
+        logs = self.store.load_month(self.year, self.month)
+        # Each day is kept sorted by start time without overlaps, which the
+        # entry helpers rely on; older files may not be, so fix them up here
+        for entries in logs.values():
+            normalize_day(entries)
+        return logs
+    
+    @span("DTR.save_data")
+    def save_data(self, day=None):
+        """Save time records to the store"""
+        if day is not None:
+            # Only the changed day needs to be written
+            entries = list(self.logs.get(day, []))
+            self.store.save_day(self.year, self.month, day, entries, base=self._saved.get(day, []))
+            self._saved[day] = entries
+        else:
+            self.store.save_month(self.year, self.month, self.logs)
+            self._saved = {day: list(entries) for day, entries in self.logs.items()}
+        # Another process may have written the year meanwhile, in which case
+        # the store rebuilt its totals rather than updating ours in place
+        self.totals = self.store.load_totals(self.year)
+    
+    def take_unsaved(self):
+        """Return {day: entries} for every day edited since the last call"""
+        days = {day: list(self.logs.get(day, [])) for day in sorted(self.unsaved)}
+        self.unsaved.clear()
+        return days
+    
+    @span("DTR.save_days")
+    def save_days(self, days):
+        """Save {day: entries} as returned by take_unsaved"""
+        if days:
+            # One write for all of them
+            self.store.save_days(self.year, self.month, days,
+                                 base={day: self._saved.get(day, []) for day in days})
+            self._saved.update((day, list(entries)) for day, entries in days.items())
+        self.totals = self.store.load_totals(self.year)
+    
+    def _changed(self, day):
+        if self.autosave:
+            self.save_data(day)
+        else:
+            self.unsaved.add(day)
+    
+    def _changed_days(self, days):
+        if self.autosave:
+            self.save_days({day: self.logs.get(day, []) for day in sorted(days)})
+        else:
+            self.unsaved.update(days)
+    
+    def _index(self):
+        if self._ids is None:
+            self._ids = {entry.id: (day, entry) for day, entries in self.logs.items() for entry in entries}
+        return self._ids
+    
+    def _reindex_day(self, day, old_entries):
+        if self._ids is not None:
+            for entry in old_entries:
+                self._ids.pop(entry.id, None)
+            for entry in self.logs.get(day, []):
+                self._ids[entry.id] = (day, entry)
+    
+    def find_entry(self, entry_id):
+        """Return (day, position in self.logs[day]) of the entry with an id, or None"""
+        for attempt in range(2):
+            found = self._index().get(entry_id)
+            if found is not None:
+                day, entry = found
+                entries = self.logs.get(day, [])
+                i = bisect.bisect_left(entries, entry)
+                if i < len(entries) and entries[i] is entry:
+                    return day, i
+                # Several entries with the same times, or an unsorted day
+                for i, other in enumerate(entries):
+                    if other is entry:
+                        return day, i
+            # self.logs was changed without going through DTR; index it again
+            self._ids = None
+        return None
+    
+    def verify_totals(self, repair=False):
+        """Recompute totals from the stored entries and list any drift"""
+        drift = self.store.verify_totals(self.year, repair=repair)
+        if drift and repair:
+            self.totals = self.store.load_totals(self.year)
+        return drift
+    
+    @span("DTR.parse_time")
+    def parse_time(self, t):
+        """Parse time strings in 12-hour format."""
+        return parse_datetime(t)
+
+    def validate_time_entry(self, start, end):
+        """Validate time entries to ensure they make logical sense"""
+        entry, message = check_entry(start, end)
+        return entry is not None, message
+
+    def add_time_entry(self, day, start_time, end_time, merge=False):
+        """Add a time entry for a specific day with validation.
+
+        An entry that overlaps a session already logged that day is
+        rejected, or with merge=True combined with it into one session.
+        """
+        if self.archived:
+            return False, f"{self.year} is archived and can't be changed."
+        
+        # Ensure day is within valid range for the month
+        message = check_day(self.year, self.month, day)
+        if message:
+            return False, message
+        
+        entry, message = check_entry(start_time, end_time)
+        if entry is None:
+            return False, message
+        
+        # Initialize the day entry if it doesn't exist
+        if day not in self.logs:
+            self.logs[day] = []
+        
+        if not merge:
+            existing = find_overlap(self.logs[day], entry)
+            if existing is not None:
+                return False, f"Entry overlaps {existing.start_text} - {existing.end_text} on that day."
+        
+        old_entries = list(self.logs[day]) if merge else ()
+        added = insert_entry(self.logs[day], entry, merge=merge)
+        self._reindex_day(day, old_entries)
+        self._changed(day)
+        if added is not entry:
+            return True, "Entry merged with an overlapping entry."
+        return True, "Entry added successfully."
+
+    def delete_time_entry(self, day, index):
+        """Delete a specific time entry"""
+        if self.archived:
+            return False, f"{self.year} is archived and can't be changed."
+        if day in self.logs and 0 <= index < len(self.logs[day]):
+            entry = self.logs[day].pop(index)
+            if self._ids is not None:
+                self._ids.pop(entry.id, None)
+            self._changed(day)
+            return True, "Entry deleted successfully."
+        return False, "Entry not found."
+    
+    @span("DTR.delete_entries")
+    def delete_entries(self, entry_ids):
+        """Delete entries by id and save them in one write.
+
+        Nothing is deleted if any of the ids is unknown.
+        """
+        if self.archived:
+            return False, f"{self.year} is archived and can't be changed."
+        located = []
+        for entry_id in dict.fromkeys(entry_ids):
+            found = self.find_entry(entry_id)
+            if found is None:
+                return False, "Entry not found."
+            located.append(found)
+        
+        # Later positions first, so the earlier ones still point at the right entries
+        for day, i in sorted(located, reverse=True):
+            entry = self.logs[day].pop(i)
+            self._ids.pop(entry.id, None)
+        self._changed_days({day for day, _ in located})
+        if len(located) == 1:
+            return True, "Entry deleted successfully."
+        return True, f"{len(located)} entries deleted successfully."
+    
+    @span("DTR.update_entries")
+    def update_entries(self, changes):
+        """Change the times of entries by id and save them in one write.
+
+        changes maps entry id -> (start, end) time strings.  Entries keep
+        their ids.  Nothing changes unless every new time is valid and no
+        day would end up with overlapping sessions.
+        """
+        if self.archived:
+            return False, f"{self.year} is archived and can't be changed."
+        updated = {}
+        for entry_id, (start_time, end_time) in changes.items():
+            found = self.find_entry(entry_id)
+            if found is None:
+                return False, "Entry not found."
+            entry, message = check_entry(start_time, end_time)
+            if entry is None:
+                return False, message
+            # A new object, since the store's cache may share the old one
+            entry.id = entry_id
+            updated[entry_id] = (found[0], entry)
+        
+        # Build the changed days aside, so a rejected change leaves self.logs alone
+        days = {day: [entry for entry in self.logs[day] if entry.id not in changes]
+                for day, _ in updated.values()}
+        for day, entry in updated.values():
+            if insert_entry(days[day], entry) is None:
+                existing = find_overlap(days[day], entry)
+                return False, f"Entry overlaps {existing.start_text} - {existing.end_text} on that day."
+        for day, entries in days.items():
+            old_entries, self.logs[day] = self.logs[day], entries
+            self._reindex_day(day, old_entries)
+        self._changed_days(days)
+        if len(updated) == 1:
+            return True, "Entry updated successfully."
+        return True, f"{len(updated)} entries updated successfully."
+
+    @span("DTR.calculate_hours")
+    def calculate_hours(self):
+        """Calculate total hours worked and generate daily breakdown."""
+        total_minutes = 0
+        daily_hours = {}
+        
+        days_in_month = calendar.monthrange(self.year, self.month)[1]
+        for day in range(1, days_in_month + 1):
+            if day in self.logs and self.logs[day]:
+                day_minutes = self.totals.day_minutes(self.month, day)
+                daily_hours[day] = round(day_minutes / 60, 2)
+                total_minutes += day_minutes
+            else:
+                daily_hours[day] = 0
+        
+        total_hours = round(total_minutes / 60, 2)
+        return total_hours, daily_hours
+
+    def load_all_data(self):
+        """Load all available data across all months for the year"""
+        return self.store.load_year(self.year)
+    
+    @span("DTR.calculate_all_hours")
+    def calculate_all_hours(self):
+        """Calculate total hours across all months for the year"""
+        # Read from the running totals instead of walking every entry
+        months_data = {month: round(minutes / 60, 2)
+                       for month, minutes in self.totals.months.items()}
+        total_minutes = self.totals.year
+        
+        hours, minutes = divmod(total_minutes, 60)
+        
+        return hours, minutes, months_data
+
+    @span("DTR.hours_between")
+    def hours_between(self, start, end):
+        """Hours worked from start to end (dates, both included), across months and years"""
+        # Like calculate_hours this reads the running totals, so edits held
+        # back with autosave=False count once they are saved
+        return CalendarIndex(self.store).hours(start, end)
+
+    @span("DTR.generate_report")
+    def generate_report(self):
+        """Generate a summary report of worked hours."""
+        total_hours, daily_hours = self.calculate_hours()
+        report = list(self._report_lines(total_hours, daily_hours))
+        return report, total_hours
+
+    def report_lines(self):
+        """Yield the summary report one line at a time"""
+        return self._report_lines(*self.calculate_hours())
+
+    def _report_lines(self, total_hours, daily_hours):
+        month_name = calendar.month_name[self.month]
+        days_in_month = calendar.monthrange(self.year, self.month)[1]
+        
+        yield f"Daily Time Record Summary for {month_name} {self.year}"
+        yield f"================================================"
+        
+        for day in range(1, days_in_month + 1):
+            if day in self.logs and self.logs[day]:
+                yield day_report_line(day, daily_hours[day], self.logs[day])
+        
+        yield f"================================================"
+        yield f"Total hours worked: {total_hours}"
+
+
+def day_report_line(day, hours, entries):
+    """One day's line of the summary report: Day 3: 8.0 hours (8:00 am - 12:00 pm, ...)"""
+    sessions_str = ", ".join(f"{entry.start_text} - {entry.end_text}" for entry in entries)
+    return f"Day {day}: {hours} hours ({sessions_str})"
+
+
+def hours_by_day(logs, days=31):
+    """(total hours, {day: hours}) for {day: [(start, end), ...]} of time strings.
+
+    Works on plain logs like the ones in dtr.py, without a store.
+    Overlapping sessions are counted once, as in DTR.
+    """
+    total_minutes = 0
+    daily_hours = {}
+    for day in range(1, days + 1):
+        minutes = merged_minutes(load_entries(logs.get(day) or []))
+        daily_hours[day] = round(minutes / 60, 2)
+        total_minutes += minutes
+    return round(total_minutes / 60, 2), daily_hours
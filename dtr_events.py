@@ -0,0 +1,231 @@
+import datetime
+import heapq
+from collections import namedtuple
+
+from dtr_import import DEFAULT_MAX_BUFFERED, BadRow, Punch, check_employee, import_punches, read_csv, read_jsonl
+from dtr_time import END_OF_DAY, Entry
+
+# Time clocks that send single taps instead of (start, end) pairs go
+# through a pipeline of generators before the bulk import:
+#
+#   parse_events -> reorder -> pair_events -> dtr_import.import_punches
+#
+# Rows become Events, a bounded window puts late arrivals back in time
+# order, and taps are paired into sessions, one Punch per day worked.
+# Anything that can't be used comes out as a BadRow with its line number,
+# so it is reported the same way as a bad row in "dtr.py import".
+
+# A single clock tap.  kind is "in", "out", or None when the clock only
+# records that someone tapped, in which case taps alternate in and out.
+Event = namedtuple("Event", "employee time kind line")
+
+# How far out of time order events may arrive and still be placed
+DEFAULT_REORDER_WINDOW = datetime.timedelta(minutes=5)
+# Repeated taps this close to the previous one are the same tap
+DEFAULT_DEBOUNCE = datetime.timedelta(seconds=60)
+# A clock-in with no clock-out within this long is an orphan
+DEFAULT_MAX_SESSION = datetime.timedelta(hours=16)
+
+KINDS = {"in": "in", "i": "in", "out": "out", "o": "out", "": None}
+
+
+class EventSummary:
+    """Counts gathered while pairing a stream of clock events"""
+
+    def __init__(self):
+        self.events = 0
+        # Repeated taps dropped by the debounce
+        self.duplicates = 0
+        # Events that arrived too far out of order to be placed
+        self.late = 0
+        self.sessions = 0
+        # Sessions that cross midnight and were split over two days
+        self.overnight = 0
+        # Clock-ins without a clock-out and clock-outs without a clock-in
+        self.orphans = 0
+        self.rejected = 0
+
+    def __repr__(self):
+        return (f"EventSummary(events={self.events}, duplicates={self.duplicates}, late={self.late}, "
+                f"sessions={self.sessions}, overnight={self.overnight}, orphans={self.orphans}, "
+                f"rejected={self.rejected})")
+
+
+def parse_events(rows, default_employee="default", summary=None):
+    """Turn raw rows into Event or BadRow items.
+
+    Rows need a "time" field with an ISO date and time (2025-07-01T08:02:13
+    or 2025-07-01 08:02), or a "date" field plus a "time" of day.  An
+    optional "type" field says "in" or "out"; without it taps alternate.
+    Times are clock time as recorded; any UTC offset is dropped.
+    """
+    summary = summary if summary is not None else EventSummary()
+    for line_no, row in rows:
+        if row is None:
+            summary.rejected += 1
+            yield BadRow(line_no, "Malformed row.")
+            continue
+        try:
+            text = row["time"]
+            if row.get("date"):
+                text = f"{row['date']}T{text}"
+            time = datetime.datetime.fromisoformat(text)
+        except KeyError:
+            summary.rejected += 1
+            yield BadRow(line_no, "Missing field 'time'.")
+            continue
+        except (TypeError, ValueError):
+            summary.rejected += 1
+            yield BadRow(line_no, "Invalid time. Use YYYY-MM-DDTHH:MM[:SS].")
+            continue
+        if time.tzinfo is not None:
+            time = time.replace(tzinfo=None)
+        kind = KINDS.get(str(row.get("type") or "").strip().lower(), False)
+        if kind is False:
+            summary.rejected += 1
+            yield BadRow(line_no, "Invalid type. Must be 'in' or 'out'.")
+            continue
+        employee = row.get("employee") or default_employee
+        message = check_employee(employee)
+        if message:
+            summary.rejected += 1
+            yield BadRow(line_no, message)
+            continue
+        summary.events += 1
+        yield Event(employee, time, kind, line_no)
+
+
+def reorder(items, window=DEFAULT_REORDER_WINDOW, summary=None):
+    """Yield events in time order from a stream that is only roughly ordered.
+
+    Events are held until one at least window later has been seen, so
+    memory is bounded by the events arriving within one window.  An event
+    older than one already passed on can't be placed and becomes a BadRow.
+    BadRows pass straight through.
+    """
+    summary = summary if summary is not None else EventSummary()
+    held = []
+    arrived = 0
+    newest = passed = None
+    for item in items:
+        if isinstance(item, BadRow):
+            yield item
+            continue
+        if passed is not None and item.time < passed:
+            summary.late += 1
+            yield BadRow(item.line, f"Event at {item.time} arrived more than {window} out of order.")
+            continue
+        # Events with the same time keep their arrival order
+        heapq.heappush(held, (item.time, arrived, item))
+        arrived += 1
+        if newest is None or item.time > newest:
+            newest = item.time
+        while held and held[0][0] <= newest - window:
+            passed, _, event = heapq.heappop(held)
+            yield event
+    while held:
+        passed, _, event = heapq.heappop(held)
+        yield event
+
+
+def split_session(employee, start, end):
+    """Yield one Punch per day a session from start to end covers"""
+    day = start.date()
+    first = start.hour * 60 + start.minute
+    while True:
+        if day == end.date():
+            last = end.hour * 60 + end.minute
+        else:
+            last = END_OF_DAY
+        if last > first:
+            yield Punch(employee, day.year, day.month, day.day, Entry(first, last))
+        if day >= end.date():
+            return
+        day += datetime.timedelta(days=1)
+        first = 0
+
+
+def pair_events(events, debounce=DEFAULT_DEBOUNCE, max_session=DEFAULT_MAX_SESSION, summary=None):
+    """Pair time-ordered events into Punch items, one per day of each session.
+
+    A tap within debounce of the employee's previous tap of the same kind
+    is dropped.  A clock-in is closed by the employee's next clock-out (or
+    next tap, for untyped clocks) within max_session.  Sessions crossing
+    midnight are split into one entry per day.  Clock-ins and clock-outs
+    left without a partner come out as BadRows, as soon as it is known
+    they won't get one.  Only each employee's open clock-in and last tap
+    are kept, so any number of events can be paired.
+    """
+    summary = summary if summary is not None else EventSummary()
+    open_ins = {}
+    last_taps = {}
+    # (time the clock-in expires, order, employee, event), soonest first
+    expiries = []
+    pushed = 0
+
+    def orphan(event, message):
+        summary.orphans += 1
+        return BadRow(event.line, message.format(event.time))
+
+    def session(employee, start, end):
+        punches = list(split_session(employee, start.time, end.time))
+        if not punches:
+            return [orphan(end, "Clock-out at {} is less than a minute after its clock-in.")]
+        summary.sessions += 1
+        if start.time.date() != end.time.date():
+            summary.overnight += 1
+        return punches
+
+    for item in events:
+        if isinstance(item, BadRow):
+            yield item
+            continue
+
+        while expiries and expiries[0][0] < item.time:
+            _, _, employee, event = heapq.heappop(expiries)
+            if open_ins.get(employee) is event:
+                del open_ins[employee]
+                yield orphan(event, "Clock-in at {} has no clock-out.")
+
+        employee = item.employee
+        last = last_taps.get(employee)
+        if last is not None and last.kind == item.kind and item.time - last.time <= debounce:
+            summary.duplicates += 1
+            continue
+        last_taps[employee] = item
+
+        opened = open_ins.pop(employee, None)
+        if item.kind == "out" or (item.kind is None and opened is not None):
+            if opened is not None:
+                yield from session(employee, opened, item)
+            else:
+                yield orphan(item, "Clock-out at {} has no clock-in.")
+            continue
+        if opened is not None:
+            yield orphan(opened, "Clock-in at {} has no clock-out.")
+        open_ins[employee] = item
+        heapq.heappush(expiries, (item.time + max_session, pushed, employee, item))
+        pushed += 1
+
+    for employee, event in sorted(open_ins.items()):
+        yield orphan(event, "Clock-in at {} has no clock-out.")
+
+
+def ingest_events(rows, store_for, default_employee="default", window=DEFAULT_REORDER_WINDOW,
+                  debounce=DEFAULT_DEBOUNCE, max_session=DEFAULT_MAX_SESSION,
+                  max_buffered=DEFAULT_MAX_BUFFERED, on_error=None):
+    """Pair raw clock events from rows and import the sessions.
+
+    Returns (EventSummary, ImportSummary).  Orphans, late events and bad
+    rows are passed to on_error(bad_row) along with rejected punches.
+    """
+    summary = EventSummary()
+    events = parse_events(rows, default_employee, summary)
+    punches = pair_events(reorder(events, window, summary), debounce, max_session, summary)
+    return summary, import_punches(punches, store_for, max_buffered, on_error)
+
+
+def ingest_file(f, fmt, store_for, **options):
+    """Ingest an open CSV or JSON-lines file of clock events; see ingest_events"""
+    rows = read_csv(f) if fmt == "csv" else read_jsonl(f)
+    return ingest_events(rows, store_for, **options)
@@ -0,0 +1,150 @@
+import calendar
+import csv
+import datetime
+import json
+import os
+from collections import namedtuple
+
+from dtr_cache import FileCache
+from dtr_core import day_report_line
+from dtr_storage import ShardedStore
+from dtr_time import merged_minutes
+
+# Reports for many employees and months are produced as a pipeline of
+# generators: employee_stores opens one store at a time, report_rows yields
+# one worked day at a time, and the writers stream each row straight to a
+# file.  Memory use stays the same whatever the number of employees or the
+# length of the date range.
+
+# One worked day in an exported report
+ReportRow = namedtuple("ReportRow", "employee date entries minutes")
+
+
+def employee_stores(root=".", employees=None, database=None, root_employee="default", cache=None):
+    """Yield (employee, store) for each employee to export, in name order.
+
+    Employees are found the way "dtr.py import" lays them out: records
+    directly in root belong to root_employee and each subdirectory holding
+    records belongs to the employee it is named after.  With a SQLiteStore
+    as database, its employees are used instead.  employees limits the
+    export to those names.  Each store is closed once the caller moves on
+    to the next employee.  JSON stores use cache, or by default none at
+    all, since an export reads nothing twice.
+    """
+    if database is not None:
+        names = database.employees()
+    else:
+        names = [name for name in os.listdir(root)
+                 if os.path.isdir(os.path.join(root, name)) and _data_paths(os.path.join(root, name))]
+        if _data_paths(root):
+            names.append(root_employee)
+    if employees is not None:
+        names = [name for name in names if name in employees]
+
+    for employee in sorted(set(names)):
+        if database is not None:
+            store = database.for_employee(employee)
+        else:
+            directory = root if employee == root_employee else os.path.join(root, employee)
+            store = ShardedStore(directory, cache=cache if cache is not None else FileCache(max_bytes=0))
+        try:
+            yield employee, store
+        finally:
+            if database is None:
+                store.close()
+
+
+def _data_paths(directory):
+    return [os.path.join(directory, entry) for entry in os.listdir(directory) if entry.startswith("dtr_data_")]
+
+
+def report_rows(stores, start=None, end=None):
+    """Yield a ReportRow for every worked day from start to end, inclusive.
+
+    stores is an iterable of (employee, store) pairs such as
+    employee_stores returns.  start and end are dates; either may be None
+    to leave that side of the range open.  Rows come out by employee, then
+    date, and only one month of entries is held at a time.
+    """
+    for employee, store in stores:
+        for year in store.years():
+            if (start is not None and year < start.year) or (end is not None and year > end.year):
+                continue
+            for month in range(1, 13):
+                first = datetime.date(year, month, 1)
+                last = datetime.date(year, month, calendar.monthrange(year, month)[1])
+                if (start is not None and last < start) or (end is not None and first > end):
+                    continue
+                days = store.load_month(year, month)
+                for day in sorted(days):
+                    if not 1 <= day <= last.day or not days[day]:
+                        continue
+                    date = datetime.date(year, month, day)
+                    if (start is None or date >= start) and (end is None or date <= end):
+                        entries = sorted(days[day])
+                        yield ReportRow(employee, date, entries, merged_minutes(entries))
+
+
+def _hours(minutes):
+    return round(minutes / 60, 2)
+
+
+def _sessions(entries):
+    return [[entry.start_text, entry.end_text] for entry in entries]
+
+
+def write_csv(rows, f):
+    """One line per worked day: employee, date, hours and its sessions"""
+    writer = csv.writer(f)
+    writer.writerow(["employee", "date", "hours", "sessions"])
+    written = 0
+    for row in rows:
+        writer.writerow([row.employee, row.date.isoformat(), _hours(row.minutes),
+                         "; ".join(f"{start} - {end}" for start, end in _sessions(row.entries))])
+        written += 1
+    return written
+
+
+def write_jsonl(rows, f):
+    """One JSON object per worked day"""
+    written = 0
+    for row in rows:
+        f.write(json.dumps({"employee": row.employee, "date": row.date.isoformat(),
+                            "hours": _hours(row.minutes), "sessions": _sessions(row.entries)}))
+        f.write("\n")
+        written += 1
+    return written
+
+
+def write_text(rows, f):
+    """The Monthly Report layout, one section per employee and month"""
+    written = 0
+    section, section_minutes = None, 0
+
+    def footer():
+        f.write("================================================\n")
+        f.write(f"Total hours worked: {_hours(section_minutes)}\n\n")
+
+    for row in rows:
+        key = (row.employee, row.date.year, row.date.month)
+        if key != section:
+            if section is not None:
+                footer()
+            section, section_minutes = key, 0
+            f.write(f"Daily Time Record Summary for {row.employee}, "
+                    f"{calendar.month_name[row.date.month]} {row.date.year}\n")
+            f.write("================================================\n")
+        f.write(day_report_line(row.date.day, _hours(row.minutes), row.entries) + "\n")
+        section_minutes += row.minutes
+        written += 1
+    if section is not None:
+        footer()
+    return written
+
+
+FORMATS = {"csv": write_csv, "jsonl": write_jsonl, "text": write_text}
+
+
+def export_report(rows, f, fmt="csv"):
+    """Stream rows to an open text file; returns the number of days written"""
+    return FORMATS[fmt](rows, f)
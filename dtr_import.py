@@ -0,0 +1,198 @@
+import csv
+import datetime
+import functools
+import json
+import os
+from collections import namedtuple
+
+from dtr_storage import ConflictError
+from dtr_time import check_day, check_entry, insert_entry, normalize_day
+
+# A validated punch ready to be stored, and a rejected input row
+Punch = namedtuple("Punch", "employee year month day entry")
+BadRow = namedtuple("BadRow", "line message")
+
+# Upper bound on punches held in memory before every open month is written
+DEFAULT_MAX_BUFFERED = 250_000
+
+
+class ImportSummary:
+    """Counts gathered while importing a stream of punches"""
+
+    def __init__(self):
+        self.imported = 0
+        self.rejected = 0
+        # Punches that overlapped a stored or earlier punch and were merged into it
+        self.merged = 0
+        self.months_written = 0
+
+    def __repr__(self):
+        return (f"ImportSummary(imported={self.imported}, rejected={self.rejected}, "
+                f"merged={self.merged}, months_written={self.months_written})")
+
+
+def read_csv(f):
+    """Yield (line number, row dict) from CSV with a header row"""
+    reader = csv.reader(f)
+    header = next(reader, None)
+    if header is None:
+        return
+    header = [name.strip() for name in header]
+    for values in reader:
+        if values:
+            yield reader.line_num, dict(zip(header, values))
+
+
+def read_jsonl(f):
+    """Yield (line number, row dict) from JSON lines; malformed lines yield None"""
+    for line_no, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_no, row if isinstance(row, dict) else None
+
+
+def check_employee(employee):
+    """Error message if employee can't name a records subdirectory, else None"""
+    if (not isinstance(employee, str) or employee in ("", ".", "..") or "\0" in employee
+            or any(sep in employee for sep in ("/", os.sep, os.altsep) if sep)):
+        return "Invalid employee. Must be a name without path separators."
+    return None
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date(text):
+    # Punch files repeat the same few hundred dates over and over
+    date = datetime.date.fromisoformat(text)
+    return date.year, date.month, date.day
+
+
+def parse_rows(rows, default_employee="default"):
+    """Turn raw rows into Punch or BadRow items.
+
+    Rows need start and end times plus either a "date" (YYYY-MM-DD) or
+    "year", "month" and "day" fields.  An optional "employee" field selects
+    whose records the punch belongs to; it becomes a directory name, so
+    names with path separators are rejected.
+    """
+    for line_no, row in rows:
+        if row is None:
+            yield BadRow(line_no, "Malformed row.")
+            continue
+        try:
+            if row.get("date"):
+                year, month, day = _parse_date(row["date"])
+            else:
+                year, month, day = int(row["year"]), int(row["month"]), int(row["day"])
+            start, end = row["start"], row["end"]
+        except KeyError as e:
+            yield BadRow(line_no, f"Missing field {e.args[0]!r}.")
+            continue
+        except (TypeError, ValueError):
+            yield BadRow(line_no, "Invalid date.")
+            continue
+
+        employee = row.get("employee") or default_employee
+        message = check_employee(employee)
+        if message:
+            yield BadRow(line_no, message)
+            continue
+        if not 1 <= month <= 12:
+            yield BadRow(line_no, "Invalid month. Must be between 1 and 12.")
+            continue
+        message = check_day(year, month, day)
+        if not message:
+            entry, message = check_entry(start, end)
+        if message:
+            yield BadRow(line_no, message)
+            continue
+        yield Punch(employee, year, month, day, entry)
+
+
+def import_punches(items, store_for, max_buffered=DEFAULT_MAX_BUFFERED, on_error=None):
+    """Append a stream of Punch/BadRow items to storage.
+
+    Punches are buffered per (employee, year, month) and each buffer is
+    merged into the stored month with a single save_days call.  Once the
+    stream reaches a later month, buffers for earlier months are written, so
+    date-ordered input writes every month exactly once and only holds one
+    month in memory.  Unordered input still works: at most max_buffered
+    punches are held before all buffers are written, and a month that shows
+    up again is merged with what was already stored.  Punches that overlap
+    another session on the same day, such as duplicates sent by a punch
+    clock, are merged into one session so no time is counted twice.
+
+    store_for(employee) returns the Store for that employee's records.
+    Bad rows are passed to on_error(bad_row) and never stop the import.
+    """
+    summary = ImportSummary()
+    buffers = {}
+    buffered = 0
+    latest = None
+
+    def write_month(store, year, month, buffer):
+        # Only the days with punches are written, on top of whatever another
+        # program saved to them since they were read; a clash means reading
+        # them again and merging the punches once more
+        while True:
+            stored = store.load_month(year, month)
+            base, days, merged = {}, {}, 0
+            for day, entries in buffer.items():
+                base[day] = stored.get(day, [])
+                day_entries = days[day] = list(base[day])
+                merged += normalize_day(day_entries)
+                for entry in entries:
+                    if insert_entry(day_entries, entry, merge=True) is not entry:
+                        merged += 1
+            try:
+                store.save_days(year, month, days, base=base)
+            except ConflictError:
+                continue
+            return merged
+
+    def flush(keys):
+        flushed = 0
+        for key in sorted(keys):
+            employee, year, month = key
+            buffer = buffers.pop(key)
+            summary.merged += write_month(store_for(employee), year, month, buffer)
+            summary.months_written += 1
+            flushed += sum(len(entries) for entries in buffer.values())
+        return flushed
+
+    for item in items:
+        if isinstance(item, BadRow):
+            summary.rejected += 1
+            if on_error is not None:
+                on_error(item)
+            continue
+
+        period = (item.year, item.month)
+        if latest is None or period > latest:
+            if latest is not None:
+                buffered -= flush([key for key in buffers if key[1:] < period])
+            latest = period
+
+        key = (item.employee, item.year, item.month)
+        buffer = buffers.get(key)
+        if buffer is None:
+            buffer = buffers[key] = {}
+        buffer.setdefault(item.day, []).append(item.entry)
+        summary.imported += 1
+
+        buffered += 1
+        if buffered >= max_buffered:
+            buffered -= flush(list(buffers))
+
+    flush(list(buffers))
+    return summary
+
+
+def import_file(f, fmt, store_for, default_employee="default",
+                max_buffered=DEFAULT_MAX_BUFFERED, on_error=None):
+    """Import an open CSV or JSON-lines file; see import_punches"""
+    rows = read_csv(f) if fmt == "csv" else read_jsonl(f)
+    return import_punches(parse_rows(rows, default_employee), store_for, max_buffered, on_error)
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+
+from dtr_cache import file_fingerprint
+from dtr_profile import count, span
+
+# Offsets of each month's JSON object inside a year snapshot, so one month can
+# be read and parsed without touching the rest of the file.  The index is
+# only trusted while the snapshot's size and mtime match the ones recorded.
+
+
+def index_file_for(data_file):
+    """Path of the month offset index kept next to a year data file"""
+    return os.path.splitext(data_file)[0] + ".idx"
+
+
+def dump_indexed(data, f):
+    """Write data to the binary file f as json.dump(data, f, indent=2) would.
+
+    Returns {month_key: [offset, length]} in bytes for each top-level value.
+    Bytes are written so the offsets stay right on Windows, where text
+    mode would change the line endings.
+    """
+    if not data:
+        f.write(b"{}")
+        return {}
+
+    offsets = {}
+    position = 0
+    for i, (month_key, month_data) in enumerate(data.items()):
+        prefix = (("{\n  " if i == 0 else ",\n  ") + json.dumps(month_key) + ": ").encode("utf-8")
+        # Nested one level deep, every line of the month gains two spaces
+        value = json.dumps(month_data, indent=2).replace("\n", "\n  ").encode("utf-8")
+        f.write(prefix)
+        f.write(value)
+        position += len(prefix)
+        offsets[month_key] = [position, len(value)]
+        position += len(value)
+    f.write(b"\n}")
+    return offsets
+
+
+def write_index(data_file, offsets):
+    """Record month offsets for the snapshot currently at data_file"""
+    index_file = index_file_for(data_file)
+    # Readers rebuild stale indexes too, possibly several processes at once
+    tmp_path = f"{index_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump({"source": file_fingerprint(data_file), "months": offsets}, f)
+    os.replace(tmp_path, index_file)
+
+
+@span("build_index")
+def build_index(data_file):
+    """Scan an existing snapshot for its month offsets and save them.
+
+    Used for files written before the index existed or edited by hand.
+    Returns the parsed data, since the scan decodes it anyway.
+    """
+    with open(data_file, 'rb') as f:
+        raw = f.read()
+    count("bytes read", len(raw))
+    text = raw.decode("utf-8")
+    data = json.loads(text)
+    # Character positions only equal byte offsets for ASCII files
+    if not text.isascii() or not isinstance(data, dict):
+        return data
+
+    decoder = json.JSONDecoder()
+    offsets = {}
+    position = text.index("{") + 1
+    while True:
+        position = _skip_space(text, position)
+        if text[position] == "}":
+            break
+        month_key, position = decoder.raw_decode(text, position)
+        position = _skip_space(text, position) + 1  # the colon
+        start = _skip_space(text, position)
+        _, position = decoder.raw_decode(text, start)
+        offsets[month_key] = [start, position - start]
+        position = _skip_space(text, position)
+        if text[position] == ",":
+            position += 1
+    try:
+        write_index(data_file, offsets)
+    except OSError:
+        # Read-only directory: later reads just scan the file again
+        pass
+    return data
+
+
+def _skip_space(text, position):
+    while text[position] in " \t\r\n":
+        position += 1
+    return position
+
+
+def load_index(data_file):
+    """Return the month offsets for data_file, or None if missing or stale"""
+    try:
+        with open(index_file_for(data_file), 'r') as f:
+            index = json.load(f)
+        if index.get("source") != file_fingerprint(data_file):
+            return None
+        return index["months"]
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+@span("read_month")
+def read_month(data_file, month_key):
+    """Read one month's raw data from a snapshot, parsing only its bytes"""
+    if not os.path.exists(data_file):
+        return {}
+    offsets = load_index(data_file)
+    if offsets is None:
+        return build_index(data_file).get(month_key, {})
+    if month_key not in offsets:
+        return {}
+    offset, length = offsets[month_key]
+    with open(data_file, 'rb') as f:
+        f.seek(offset)
+        raw = f.read(length)
+    count("bytes read", len(raw))
+    return json.loads(raw)
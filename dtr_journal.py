@@ -0,0 +1,226 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+from dtr_index import dump_indexed, read_month, write_index
+from dtr_lock import lock_for
+from dtr_profile import count, span
+
+# Compact once the journal grows past this many bytes
+DEFAULT_COMPACT_THRESHOLD = 64 * 1024
+
+
+def read_snapshot(path):
+    """Read a year snapshot file, returning an empty structure if missing"""
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            raw = f.read()
+        count("bytes read", len(raw))
+        return json.loads(raw)
+    return {}
+
+
+def write_atomic(path, data):
+    """Write JSON to a temp file and rename it over the target"""
+    # Unique per writer: a background compaction may save the same totals file
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+        count("bytes written", f.tell())
+    os.replace(tmp_path, path)
+
+
+class Journal:
+    """Append-only log of day edits layered on top of a year snapshot.
+
+    Each record holds the complete entry list of one day, so replaying a
+    record twice gives the same result.  That makes every crash point safe:
+    a torn last line is dropped, and a compaction interrupted after the
+    snapshot was replaced simply replays records that are already folded in.
+
+    The files are guarded by advisory locks shared with other processes:
+    dtr_data_YEAR.lock is held shared while reading and exclusively while
+    appending or swapping in a snapshot, and dtr_data_YEAR.compact.lock
+    lets only one process at a time rebuild the snapshot.
+    """
+
+    def __init__(self, data_file, compact_threshold=DEFAULT_COMPACT_THRESHOLD, background=True,
+                 on_compact=None):
+        self.data_file = data_file
+        self.journal_file = os.path.splitext(data_file)[0] + ".journal"
+        # The journal is renamed here while a compaction is folding it in
+        self.rotated_file = self.journal_file + ".old"
+        self.compact_threshold = compact_threshold
+        self.background = background
+        # Called with the new snapshot data after each compaction
+        self.on_compact = on_compact
+        base = os.path.splitext(data_file)[0]
+        self._lock = lock_for(base + ".lock")
+        self._compact_lock = lock_for(base + ".compact.lock")
+        self._compactor = None
+
+    def load(self):
+        """Return the snapshot with all journal records replayed on top"""
+        with self._lock.hold(exclusive=False):
+            data = read_snapshot(self.data_file)
+            for path in (self.rotated_file, self.journal_file):
+                self._replay(path, data)
+        return data
+
+    def load_month(self, month):
+        """Return one month's raw data, reading only that month from the snapshot"""
+        month_key = str(month)
+        with self._lock.hold(exclusive=False):
+            month_data = read_month(self.data_file, month_key)
+            for path in (self.rotated_file, self.journal_file):
+                for m, day, entries in self._read_records(path):
+                    if m == month:
+                        month_data[str(day)] = entries
+        return month_data
+
+    def records(self):
+        """Yield (month, day, entries) for every record not yet in the snapshot"""
+        with self._lock.hold(exclusive=False):
+            records = [record for path in (self.rotated_file, self.journal_file)
+                       for record in self._read_records(path)]
+        return iter(records)
+
+    def _replay(self, path, data):
+        for month, day, entries in self._read_records(path):
+            data.setdefault(str(month), {})[str(day)] = entries
+
+    def _read_records(self, path):
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            for line in f:
+                count("bytes read", len(line))
+                # A line without its newline was cut short by a crash
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                yield record["m"], record["d"], record["e"]
+
+    @staticmethod
+    def _repair_tail(f):
+        """Drop a torn record left by a crash so new appends start on a clean line"""
+        # Any writer, in this process or another, may have crashed mid-append
+        # since the last call, so this runs before every append
+        size = f.seek(0, os.SEEK_END)
+        if not size:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        # Look back for the end of the last complete record
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                break
+            end = start
+        else:
+            f.truncate(0)
+        f.seek(0, os.SEEK_END)
+
+    def append(self, month, day, entries):
+        """Durably record the full entry list for one day"""
+        self.extend([(month, day, entries)])
+
+    def extend(self, records):
+        """Durably record several (month, day, entries) at once, with one sync"""
+        data = b"".join(json.dumps({"m": month, "d": day, "e": entries}, separators=(",", ":")).encode("utf-8")
+                        + b"\n" for month, day, entries in records)
+        with self._lock.hold():
+            # Not 'ab': appending mode can't truncate a torn tail first
+            fd = os.open(self.journal_file, os.O_RDWR | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o666)
+            with open(fd, 'rb+') as f:
+                self._repair_tail(f)
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+                size = f.tell()
+        count("bytes written", len(data))
+
+        if size >= self.compact_threshold:
+            if self.background:
+                self.compact_in_background()
+            else:
+                self.compact()
+
+    @span("Journal.compact")
+    def compact(self):
+        """Fold the journal into the snapshot and discard it"""
+        with self._compact_lock.hold():
+            with self._lock.hold():
+                # A leftover rotated file means an earlier compaction was
+                # interrupted; fold that one first and leave new appends alone.
+                if not os.path.exists(self.rotated_file):
+                    if not os.path.exists(self.journal_file):
+                        return
+                    os.replace(self.journal_file, self.rotated_file)
+
+            # Appends go to a fresh journal while the snapshot is rebuilt
+            data = read_snapshot(self.data_file)
+            self._replay(self.rotated_file, data)
+            self._install_snapshot(data, [self.rotated_file])
+            if self.on_compact is not None:
+                self.on_compact(data)
+
+    def replace_snapshot(self, data):
+        """Write a complete snapshot and drop the journal records it supersedes"""
+        with self._compact_lock.hold():
+            self._install_snapshot(data, [self.rotated_file, self.journal_file])
+
+    def _install_snapshot(self, data, superseded):
+        # Write the new snapshot and its month index, then swap it in and
+        # delete the journal files it replaces in one step under the lock
+        tmp_path = self.data_file + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            offsets = dump_indexed(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+            count("bytes written", f.tell())
+        with self._lock.hold():
+            os.replace(tmp_path, self.data_file)
+            write_index(self.data_file, offsets)
+            for path in superseded:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def locked(self):
+        """Hold the journal exclusively, e.g. around an append and its bookkeeping"""
+        return self._lock.hold()
+
+    @contextmanager
+    def transaction(self):
+        """Hold every lock needed to read, rewrite and replace the snapshot.
+
+        Nothing else, in this process or another, can change the year's
+        files until the block ends, so a read-modify-write inside it never
+        loses an update.
+        """
+        with self._compact_lock.hold(), self._lock.hold():
+            yield
+
+    def compact_in_background(self):
+        """Start a compaction thread unless one is already running"""
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(target=self.compact, name="dtr-journal-compact")
+        self._compactor.start()
+
+    def close(self):
+        """Wait for any running background compaction to finish"""
+        if self._compactor is not None:
+            self._compactor.join()
+            self._compactor = None
@@ -0,0 +1,110 @@
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Advisory locks on small "*.lock" files next to the data they protect, so
+# several processes (two GUIs, an import and the report service) can write
+# the same records safely.  One FileLock exists per lock file and process;
+# threads take turns on it and only the outermost hold touches the file.
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+
+def lock_for(path):
+    """The process-wide FileLock for a lock file path"""
+    key = os.path.abspath(path)
+    with _locks_guard:
+        if key not in _locks:
+            _locks[key] = FileLock(key)
+        return _locks[key]
+
+
+class FileLock:
+    """Reentrant lock held across threads and processes.
+
+    Uses flock, so a shared hold lets other processes read at the same
+    time while an exclusive hold keeps everyone else out.  Windows has no
+    shared file locks, so there every hold is exclusive.  A thread that
+    already holds the lock may take it again; it can't upgrade a shared
+    hold to an exclusive one, since two processes doing that would wait
+    on each other forever.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._exclusive = False
+        self._fd = None
+
+    @contextmanager
+    def hold(self, exclusive=True):
+        with self._thread_lock:
+            if self._depth == 0:
+                self._acquire(exclusive)
+            elif exclusive and not self._exclusive:
+                raise RuntimeError(f"Can't take {self.path} exclusively while holding it shared")
+            self._depth += 1
+            try:
+                yield
+            finally:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._release()
+
+    def _acquire(self, exclusive):
+        try:
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        except OSError:
+            if exclusive:
+                raise
+            fd = self._open_for_reading()
+            if fd is None:
+                self._fd, self._exclusive = None, False
+                return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            else:
+                while True:
+                    try:
+                        # LK_LOCK retries for about 10 seconds before giving up
+                        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        continue
+        except BaseException:
+            os.close(fd)
+            raise
+        self._fd = fd
+        self._exclusive = exclusive
+
+    def _open_for_reading(self):
+        # Records in a directory we can't write to, such as a read-only
+        # share, can still be read: lock an existing lock file read-only,
+        # or read unlocked if there is none, since then nobody can be
+        # writing there either
+        try:
+            return os.open(self.path, os.O_RDONLY)
+        except OSError:
+            return None
+
+    def _release(self):
+        fd, self._fd = self._fd, None
+        if fd is None:
+            return
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
@@ -0,0 +1,43 @@
+import argparse
+
+from dtr_storage import ShardedStore, SQLiteStore
+
+
+def migrate(directory, db_path, employee="default"):
+    """Import every year in a directory into an SQLite database.
+
+    Year files, archives and month-sharded years are all read.  Each year
+    is written in a single transaction.  Re-running the migration replaces
+    the imported months rather than duplicating them.
+    """
+    # Journaled loading also picks up edits not yet compacted into the year file
+    source = ShardedStore(directory, journaled=True)
+    target = SQLiteStore(db_path, employee)
+    imported = {}
+    try:
+        for year in source.years():
+            months = source.load_year(year)
+            target.save_months(year, months)
+            imported[year] = sum(len(entries) for days in months.values() for entries in days.values())
+    finally:
+        target.close()
+        source.close()
+    return imported
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import dtr_data_YEAR records into an SQLite database")
+    parser.add_argument("database", help="SQLite database file to create or update")
+    parser.add_argument("--dir", default=".", help="records directory (default: current)")
+    parser.add_argument("--employee", default="default", help="employee the records belong to")
+    args = parser.parse_args()
+
+    imported = migrate(args.dir, args.database, args.employee)
+    if not imported:
+        print(f"No dtr_data_YEAR records found in {args.dir}")
+    for year, count in imported.items():
+        print(f"{year}: {count} entries imported")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import calendar
+import datetime
+
+# Hours over any date range, such as pay periods and fiscal quarters that
+# cross month and year boundaries.  Each year's YearTotals keeps cumulative
+# day sums, so a range costs two lookups per calendar year it touches, and
+# every edit saved through a store updates the sums in place.
+
+
+class CalendarIndex:
+    """Date-range queries over one store's running totals"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def minutes(self, start, end):
+        """Minutes worked from start to end (dates, both included)"""
+        total = 0
+        for year in range(start.year, end.year + 1):
+            first = (start.month, start.day) if year == start.year else (1, 1)
+            last = (end.month, end.day) if year == end.year else (12, 31)
+            if first <= last and self.store.has_year(year):
+                total += self.store.load_totals(year).minutes_between(first, last)
+        return total
+
+    def hours(self, start, end):
+        return round(self.minutes(start, end) / 60, 2)
+
+    def period_hours(self, periods):
+        """[(first, last, hours), ...] for (first, last) date pairs"""
+        return [(first, last, self.hours(first, last)) for first, last in periods]
+
+
+def _add_months(date, months):
+    index = date.year * 12 + date.month - 1 + months
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def _month_end(date):
+    return date.replace(day=calendar.monthrange(date.year, date.month)[1])
+
+
+def semi_monthly(start, end):
+    """Yield (first, last) for each 1st-15th and 16th-month end period"""
+    first = start.replace(day=1 if start.day <= 15 else 16)
+    while first <= end:
+        last = first.replace(day=15) if first.day == 1 else _month_end(first)
+        yield max(first, start), min(last, end)
+        first = last + datetime.timedelta(days=1)
+
+
+def monthly(start, end, months=1, first_month=1):
+    """Yield (first, last) for each run of months, aligned to first_month.
+
+    months=3 gives quarters; with first_month=7 they are the quarters of a
+    fiscal year that starts in July.
+    """
+    month_start = start.replace(day=1)
+    first = _add_months(month_start, -((start.month - first_month) % months))
+    while first <= end:
+        following = _add_months(first, months)
+        yield max(first, start), min(following - datetime.timedelta(days=1), end)
+        first = following
+
+
+# Length in months of every period kind but semi-monthly
+PERIOD_MONTHS = {"monthly": 1, "quarterly": 3, "yearly": 12}
+PERIOD_KINDS = ("semi-monthly",) + tuple(PERIOD_MONTHS)
+
+
+def periods(kind, start, end, first_month=1):
+    """Yield (first, last) for each period of a kind overlapping start..end, clipped to it.
+
+    first_month only matters for quarterly and yearly periods: it is the
+    month the (fiscal) year starts in.
+    """
+    if kind == "semi-monthly":
+        return semi_monthly(start, end)
+    return monthly(start, end, PERIOD_MONTHS[kind], first_month)
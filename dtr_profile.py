@@ -0,0 +1,169 @@
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+
+# Opt-in timing spans and counters for finding out where the time goes.
+# Nothing is recorded unless DTR_PROFILE is set or enable() is called:
+#
+#   DTR_PROFILE=1 python GUI_dtr.py            summary table on exit
+#   DTR_PROFILE=trace.json python GUI_dtr.py   Chrome trace (chrome://tracing)
+#
+# While disabled, an instrumented function costs one global check per call.
+
+ENV_VAR = "DTR_PROFILE"
+
+_profiler = None
+
+
+class Profiler:
+    """Collects span timings and counters from every thread.
+
+    Span times are inclusive; "self" time leaves out the time spent in
+    spans nested inside, so a slow load can be split into disk and parse.
+    Individual events are only kept when a trace file is written.
+    """
+
+    def __init__(self, trace_file=None):
+        self.trace_file = trace_file
+        self.started = time.perf_counter()
+        self.spans = {}
+        self.counters = {}
+        self.events = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def begin(self):
+        # Each open span accumulates the time of the spans nested in it
+        self._stack().append(0.0)
+        return time.perf_counter()
+
+    def end(self, name, started):
+        elapsed = time.perf_counter() - started
+        stack = self._stack()
+        children = stack.pop()
+        if stack:
+            stack[-1] += elapsed
+        with self._lock:
+            stats = self.spans.get(name)
+            if stats is None:
+                stats = self.spans[name] = [0, 0.0, 0.0, 0.0]
+            stats[0] += 1
+            stats[1] += elapsed
+            stats[2] += elapsed - children
+            stats[3] = max(stats[3], elapsed)
+            if self.trace_file is not None:
+                self.events.append({"name": name, "ph": "X", "pid": os.getpid(),
+                                    "tid": threading.get_ident(),
+                                    "ts": (started - self.started) * 1e6, "dur": elapsed * 1e6})
+
+    def count(self, name, n):
+        with self._lock:
+            total = self.counters[name] = self.counters.get(name, 0) + n
+            if self.trace_file is not None:
+                self.events.append({"name": name, "ph": "C", "pid": os.getpid(),
+                                    "ts": (time.perf_counter() - self.started) * 1e6,
+                                    "args": {"value": total}})
+
+    def summary(self):
+        """The collected spans and counters as printable lines"""
+        lines = [f"{'span':34}{'calls':>8}{'total ms':>11}{'self ms':>11}{'mean ms':>10}{'max ms':>10}"]
+        for name, (calls, total, own, longest) in sorted(self.spans.items(), key=lambda item: -item[1][1]):
+            lines.append(f"{name:34}{calls:8}{total * 1e3:11.2f}{own * 1e3:11.2f}"
+                         f"{total / calls * 1e3:10.3f}{longest * 1e3:10.2f}")
+        if self.counters:
+            lines.append("")
+            lines.append(f"{'counter':34}{'value':>8}")
+            for name, value in sorted(self.counters.items()):
+                lines.append(f"{name:34}{value:8}")
+        return lines
+
+    def write_trace(self, path):
+        """Write the recorded events in Chrome's trace event format"""
+        with self._lock:
+            events = list(self.events)
+        with open(path, 'w') as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def report(self, out=None):
+        """Print the summary, and write the trace file if one was requested"""
+        out = out or sys.stderr
+        print("\n".join(self.summary()), file=out)
+        if self.trace_file is not None:
+            self.write_trace(self.trace_file)
+            print(f"Trace written to {self.trace_file}", file=out)
+
+
+def enable(trace_file=None, report_at_exit=True):
+    """Start recording; returns the active Profiler"""
+    global _profiler
+    if _profiler is None:
+        _profiler = Profiler(trace_file)
+        if report_at_exit:
+            atexit.register(_profiler.report)
+    return _profiler
+
+
+def disable():
+    """Stop recording and return the Profiler that was active, if any"""
+    global _profiler
+    profiler, _profiler = _profiler, None
+    return profiler
+
+
+def enabled():
+    return _profiler is not None
+
+
+def active():
+    return _profiler
+
+
+def span(name):
+    """Decorator that records every call of the function as a span"""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = _profiler
+            if profiler is None:
+                return func(*args, **kwargs)
+            started = profiler.begin()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                profiler.end(name, started)
+        return wrapper
+    return decorate
+
+
+def count(name, n=1):
+    """Add n to a counter, such as bytes read or times parsed"""
+    profiler = _profiler
+    if profiler is not None:
+        profiler.count(name, n)
+
+
+def enable_from_env(value=None):
+    """Enable profiling if DTR_PROFILE (or value) asks for it.
+
+    "1", "summary" or any value without ".json" prints the summary table
+    on exit; a path ending in .json also writes a Chrome trace there.
+    """
+    if value is None:
+        value = os.environ.get(ENV_VAR, "")
+    if value in ("", "0"):
+        return None
+    trace_file = value if value.endswith(".json") else None
+    return enable(trace_file)
+
+
+enable_from_env()
@@ -0,0 +1,376 @@
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from urllib.parse import parse_qsl, urlsplit
+
+from dtr_core import DTR
+from dtr_import import check_employee
+from dtr_periods import PERIOD_KINDS, CalendarIndex, periods
+from dtr_storage import ConflictError, ShardedStore
+from dtr_time import parse_end_minutes, parse_minutes
+
+# HTTP/JSON access to DTR for dashboards and scripts, using only the
+# standard library.  Endpoints (employee is optional everywhere):
+#
+#   GET    /report?year=2025&month=7&employee=alice   DTR.generate_report
+#   GET    /totals?year=2025&employee=alice           DTR.calculate_all_hours
+#   GET    /hours?from=2025-07-01&to=2025-09-30&period=semi-monthly   CalendarIndex
+#   POST   /entries   {"year", "month", "day", "start", "end", "merge", "employee"}
+#   DELETE /entries?year=2025&month=7&day=3&start=8:00 am&end=12:00 pm
+
+# Largest request body accepted, in bytes
+MAX_BODY = 64 * 1024
+
+# How long a cached response may be served; writes through the service
+# invalidate it at once, this only bounds how stale edits made elsewhere can be
+DEFAULT_CACHE_TTL = 5.0
+
+REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def _int_param(params, name):
+    try:
+        value = params[name]
+        # Query strings give text; JSON bodies must give an actual integer,
+        # not a number like 7.9 or a bool that int() would quietly accept
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise TypeError
+        return int(value)
+    except KeyError:
+        raise HTTPError(400, f"Missing parameter {name!r}.")
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"Parameter {name!r} must be an integer.")
+
+
+def _date_param(params, name):
+    try:
+        return datetime.date.fromisoformat(params[name])
+    except KeyError:
+        raise HTTPError(400, f"Missing parameter {name!r}.")
+    except (TypeError, ValueError):
+        raise HTTPError(400, f"Parameter {name!r} must be a date (YYYY-MM-DD).")
+
+
+def _month_param(params):
+    month = _int_param(params, "month")
+    if not 1 <= month <= 12:
+        raise HTTPError(400, "Invalid month. Must be between 1 and 12.")
+    return month
+
+
+class ReportService:
+    """Serves DTR reports and edits for a records directory.
+
+    Each employee's year files live in their own subdirectory (the layout
+    "dtr.py import" writes); requests without an employee use the directory
+    itself.  DTR work runs on a thread pool so slow disks never block the
+    event loop, and requests for different employees or years run in
+    parallel.  Work on one employee's year is serialized, because a write
+    updates the year's totals in place.  Report and totals responses are
+    cached per employee and year and dropped whenever that year is written,
+    so most reads are answered without waiting for that lock at all.
+    """
+
+    def __init__(self, directory=".", default_employee="default", workers=None,
+                 cache_ttl=DEFAULT_CACHE_TTL):
+        self.directory = directory
+        self.default_employee = default_employee
+        self.cache_ttl = cache_ttl
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dtr-service")
+        self._stores = {}
+        self._year_locks = {}
+        # (employee, year) -> generation, bumped on every write
+        self._generations = {}
+        # request key -> (employee, year, generation, expires, body)
+        self._responses = {}
+
+    def store_for(self, employee):
+        if employee not in self._stores:
+            directory = self.directory
+            if employee != self.default_employee:
+                message = check_employee(employee)
+                if message:
+                    raise HTTPError(400, message)
+                directory = os.path.join(self.directory, employee)
+            self._stores[employee] = ShardedStore(directory, journaled=True)
+        return self._stores[employee]
+
+    def _year_lock(self, employee, year):
+        key = (employee, year)
+        if key not in self._year_locks:
+            self._year_locks[key] = asyncio.Lock()
+        return self._year_locks[key]
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def _lookup(self, key, employee, year):
+        cached = self._responses.get(key)
+        if (cached is not None and cached[2] == self._generations.get((employee, year), 0)
+                and cached[3] > time.monotonic()):
+            return cached[4]
+        return None
+
+    async def _cached(self, key, employee, year, compute):
+        body = self._lookup(key, employee, year)
+        if body is not None:
+            return body
+        async with self._year_lock(employee, year):
+            # Another request may have filled the cache while this one waited
+            body = self._lookup(key, employee, year)
+            if body is None:
+                body = json.dumps(await self._run(compute)).encode("utf-8")
+                self._responses[key] = (employee, year, self._generations.get((employee, year), 0),
+                                        time.monotonic() + self.cache_ttl, body)
+        return body
+
+    def _invalidate(self, employee, year):
+        self._generations[(employee, year)] = self._generations.get((employee, year), 0) + 1
+        for key in [key for key, value in self._responses.items() if value[:2] == (employee, year)]:
+            del self._responses[key]
+
+    def _employee(self, params):
+        employee = params.get("employee") or self.default_employee
+        if not isinstance(employee, str):
+            raise HTTPError(400, "Invalid employee.")
+        return employee
+
+    async def report(self, params):
+        employee = self._employee(params)
+        year, month = _int_param(params, "year"), _month_param(params)
+        store = self.store_for(employee)
+
+        def compute():
+            report, total_hours = DTR(month, year, store=store).generate_report()
+            return {"employee": employee, "year": year, "month": month,
+                    "total_hours": total_hours, "report": report}
+        return 200, await self._cached(("report", employee, year, month), employee, year, compute)
+
+    async def totals(self, params):
+        employee = self._employee(params)
+        year = _int_param(params, "year")
+        store = self.store_for(employee)
+
+        def compute():
+            # Any month will do; calculate_all_hours only uses the year's totals
+            hours, minutes, months_data = DTR(1, year, store=store).calculate_all_hours()
+            return {"employee": employee, "year": year, "hours": hours, "minutes": minutes,
+                    "months": {str(month): value for month, value in sorted(months_data.items())}}
+        return 200, await self._cached(("totals", employee, year), employee, year, compute)
+
+    async def hours(self, params):
+        employee = self._employee(params)
+        start, end = _date_param(params, "from"), _date_param(params, "to")
+        if end < start:
+            raise HTTPError(400, "'to' is before 'from'.")
+        kind = params.get("period")
+        if kind is not None and kind not in PERIOD_KINDS:
+            raise HTTPError(400, f"Parameter 'period' must be one of {', '.join(PERIOD_KINDS)}.")
+        first_month = _int_param(params, "fiscal_start") if "fiscal_start" in params else 1
+        if not 1 <= first_month <= 12:
+            raise HTTPError(400, "Invalid fiscal_start. Must be between 1 and 12.")
+        store = self.store_for(employee)
+        years = await self._run(store.years)
+
+        def compute():
+            index = CalendarIndex(store)
+            result = {"employee": employee, "from": start.isoformat(), "to": end.isoformat(),
+                      "hours": index.hours(start, end)}
+            if kind is not None:
+                result["periods"] = [{"from": first.isoformat(), "to": last.isoformat(), "hours": hours}
+                                     for first, last, hours in
+                                     index.period_hours(periods(kind, start, end, first_month))]
+            return result
+
+        # Not cached: each answer is a few lookups in the years' running
+        # totals.  The years are locked in order so no write is mid-way
+        async with AsyncExitStack() as stack:
+            for year in years:
+                if start.year <= year <= end.year:
+                    await stack.enter_async_context(self._year_lock(employee, year))
+            return 200, await self._run(compute)
+
+    async def add_entry(self, params):
+        employee = self._employee(params)
+        year, month, day = _int_param(params, "year"), _month_param(params), _int_param(params, "day")
+        start, end = params.get("start"), params.get("end")
+        merge = params.get("merge") in (True, "1", "true")
+        store = self.store_for(employee)
+
+        def add():
+            os.makedirs(store.directory, exist_ok=True)
+            return DTR(month, year, store=store).add_time_entry(day, start, end, merge=merge)
+        return await self._write(employee, year, add, 201)
+
+    async def delete_entry(self, params):
+        employee = self._employee(params)
+        year, month, day = _int_param(params, "year"), _month_param(params), _int_param(params, "day")
+        # Compared as minutes, so "08:00 AM" finds the entry stored as "8:00 am"
+        start, end = parse_minutes(params.get("start")), parse_end_minutes(params.get("end"))
+        if start is None or end is None:
+            raise HTTPError(400, "Invalid time format. Use '12:00 am/pm' format.")
+        store = self.store_for(employee)
+
+        def delete():
+            dtr = DTR(month, year, store=store)
+            for i, entry in enumerate(dtr.logs.get(day, [])):
+                if (entry.start, entry.end) == (start, end):
+                    return dtr.delete_time_entry(day, i)
+            raise HTTPError(404, "Entry not found.")
+        return await self._write(employee, year, delete, 200)
+
+    async def _write(self, employee, year, func, status):
+        async with self._year_lock(employee, year):
+            try:
+                success, message = await self._run(func)
+            except ConflictError as e:
+                # Another program saved an overlapping change to the same day
+                raise HTTPError(409, str(e))
+            finally:
+                self._invalidate(employee, year)
+        if not success:
+            # DTR rejected the edit: invalid times, an overlap, an archived year...
+            raise HTTPError(400, message)
+        return status, {"message": message}
+
+    ROUTES = {
+        ("GET", "/report"): report,
+        ("GET", "/totals"): totals,
+        ("GET", "/hours"): hours,
+        ("POST", "/entries"): add_entry,
+        ("DELETE", "/entries"): delete_entry,
+    }
+
+    async def dispatch(self, method, target, body):
+        """Handle one request; returns (status, JSON-able payload)"""
+        url = urlsplit(target)
+        handler = self.ROUTES.get((method, url.path))
+        if handler is None:
+            if any(path == url.path for _, path in self.ROUTES):
+                raise HTTPError(405, f"{method} is not supported on {url.path}.")
+            raise HTTPError(404, f"No such endpoint {url.path}.")
+        params = dict(parse_qsl(url.query))
+        if body:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                raise HTTPError(400, "Request body is not valid JSON.")
+            if not isinstance(payload, dict):
+                raise HTTPError(400, "Request body must be a JSON object.")
+            params.update(payload)
+        return await handler(self, params)
+
+    async def handle_connection(self, reader, writer):
+        """Serve requests on one connection until the client closes it"""
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, version, headers, body = request
+                try:
+                    status, payload = await self.dispatch(method, target, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": str(e)}
+                except Exception as e:
+                    status, payload = 500, {"error": str(e)}
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+                writer.write(_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except HTTPError as e:
+            writer.write(_response(e.status, {"error": str(e)}, False))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host="127.0.0.1", port=8080):
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        for store in self._stores.values():
+            store.close()
+
+
+async def _read_request(reader):
+    """Read one request; returns None once the client has closed the connection"""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise HTTPError(400, "Malformed request line.")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HTTPError(400, "Invalid Content-Length.")
+    if length > MAX_BODY:
+        raise HTTPError(413, "Request body is too large.")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, version, headers, body
+
+
+def _response(status, payload, keep_alive):
+    body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            f"Content-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+async def serve(service, host, port):
+    server = await service.start(host, port)
+    addresses = ", ".join(f"{a[0]}:{a[1]}" for a in (s.getsockname() for s in server.sockets))
+    print(f"Serving DTR reports for {os.path.abspath(service.directory)} on {addresses}")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON service for DTR reports and entries")
+    parser.add_argument("--dir", default=".", help="records directory (default: current)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--employee", default="default",
+                        help="employee whose records are in --dir itself (others use subdirectories)")
+    parser.add_argument("--workers", type=int, help="threads running DTR work (default: Python's choice)")
+    parser.add_argument("--cache-ttl", type=float, default=DEFAULT_CACHE_TTL,
+                        help="seconds a cached response may be served (default: %(default)s)")
+    args = parser.parse_args()
+
+    service = ReportService(args.dir, args.employee, args.workers, args.cache_ttl)
+    try:
+        asyncio.run(serve(service, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,673 @@
+import glob
+import os
+import re
+import time
+
+from dtr_archive import SUFFIX as ARCHIVE_SUFFIX, YearArchive, archive_file_for
+from dtr_cache import DAY_COST, file_stamp, month_cost, year_cache
+from dtr_journal import Journal, read_snapshot, write_atomic
+from dtr_lock import lock_for
+from dtr_time import Entry, dump_entries, load_entries, merged_minutes, rebase_day
+from dtr_totals import YearTotals, load_year_totals, totals_file_for, verify_year_totals
+
+
+class ConflictError(Exception):
+    """Another writer changed a day in a way that can't be combined with this change"""
+
+
+def _rebase(year, month, days, base, current):
+    # Each day's change from base applied to what is stored now (see rebase_day)
+    if base is None:
+        return days
+    merged = {}
+    for day, entries in days.items():
+        merged[day] = rebase_day(current.get(day, []), base.get(day, []), entries)
+        if merged[day] is None:
+            raise ConflictError(f"{year}-{month:02d}-{day:02d} was changed elsewhere and the changes "
+                                f"overlap. Reload it and try again.")
+    return merged
+
+
+def find_year_files(directory=".", archived=False, sharded=False):
+    """Map year -> path for every dtr_data_YEAR.json file in a directory.
+
+    With archived=True, years that only exist as a dtr_data_YEAR.dtra
+    archive are included too, mapped to the archive's path.  With
+    sharded=True, years kept as dtr_data_YEAR/ month directories (see
+    ShardedStore) are included and mapped to the directory, which is what
+    ShardedStore reads when a year has both.
+    """
+    years = {}
+    if sharded:
+        for path in glob.glob(os.path.join(directory, "dtr_data_*")):
+            match = re.fullmatch(r"dtr_data_(\d{4})", os.path.basename(path))
+            if match and os.path.isdir(path):
+                years[int(match.group(1))] = path
+    suffixes = (".json", ARCHIVE_SUFFIX) if archived else (".json",)
+    for suffix in suffixes:
+        for path in glob.glob(os.path.join(directory, "dtr_data_*" + suffix)):
+            match = re.fullmatch(r"dtr_data_(\d{4})" + re.escape(suffix), os.path.basename(path))
+            if match:
+                years.setdefault(int(match.group(1)), path)
+    return dict(sorted(years.items()))
+
+
+class Store:
+    """Where a DTR reads and writes its time entries.
+
+    Entries are exchanged as Entry objects keyed by integer month and day.
+    Stores also own the running YearTotals for each year they serve and keep
+    them in step with every write.
+    """
+
+    def load_year(self, year):
+        """Return {month: {day: [Entry, ...]}} for a whole year"""
+        raise NotImplementedError
+
+    def load_month(self, year, month):
+        """Return {day: [Entry, ...]} for one month"""
+        return self.load_year(year).get(month, {})
+
+    def save_day(self, year, month, day, entries, base=None):
+        """Replace the entries stored for one day; see save_days for base"""
+        raise NotImplementedError
+
+    def save_days(self, year, month, days, base=None):
+        """Replace the entries stored for several days of one month.
+
+        base is {day: [Entry, ...]} as the caller last read or saved those
+        days.  When given, each day's change from base is applied to what
+        is stored at the time of the write, under the same lock, so edits
+        other writers saved to the same day meanwhile are kept.  Raises
+        ConflictError if the changes overlap.  Without base the days are
+        overwritten.
+
+        Stores that can write them all at once override this.
+        """
+        for day, entries in days.items():
+            self.save_day(year, month, day, entries, None if base is None else base.get(day, []))
+
+    def save_month(self, year, month, days):
+        """Replace all entries stored for one month"""
+        raise NotImplementedError
+
+    def load_totals(self, year):
+        """Return the running YearTotals for a year"""
+        raise NotImplementedError
+
+    def years(self):
+        """Years with stored records, in order"""
+        raise NotImplementedError
+
+    def has_year(self, year):
+        """True if a year has stored records"""
+        return year in self.years()
+
+    def is_archived(self, year):
+        """True if a year is stored read-only and can't be edited"""
+        return False
+
+    def verify_totals(self, year, repair=False):
+        """Recompute a year's totals from its entries and list any drift"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class JSONStore(Store):
+    """The original layout: one dtr_data_YEAR.json file per year in a directory.
+
+    A year without a JSON file is read from its dtr_data_YEAR.dtra archive
+    if there is one (see dtr_archive.py).  Archived years are read-only.
+    """
+
+    def __init__(self, directory=".", journaled=False, cache=None):
+        self.directory = directory
+        # In journaled mode edits are appended to a log instead of rewriting the year file
+        self.journaled = journaled
+        # Parsed months and totals are shared with every other store in the process
+        self.cache = cache if cache is not None else year_cache
+        self._journals = {}
+        self._archives = {}
+
+    def data_file(self, year):
+        return os.path.join(self.directory, f"dtr_data_{year}.json")
+
+    def journal(self, year):
+        """The Journal layered over a year file.
+
+        It is read in both modes so that records left by a journaled writer
+        are never lost; only journaled mode appends to it.
+        """
+        if year not in self._journals:
+            data_file = self.data_file(year)
+            totals_file = totals_file_for(data_file)
+
+            def save_totals(snapshot):
+                # Persist totals matching the freshly compacted snapshot
+                YearTotals.from_data(snapshot).save(totals_file, data_file)
+
+            self._journals[year] = Journal(data_file, on_compact=save_totals)
+        return self._journals[year]
+
+    def archive(self, year):
+        """The YearArchive for a year stored only as an archive, or None"""
+        data_file = self.data_file(year)
+        if os.path.exists(data_file):
+            return None
+        archive_file = archive_file_for(data_file)
+        stamp = file_stamp(archive_file)
+        cached = self._archives.get(year)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        if cached is not None:
+            cached[1].close()
+            del self._archives[year]
+        if stamp[0] is None:
+            return None
+        archive = YearArchive(archive_file)
+        self._archives[year] = (stamp, archive)
+        return archive
+
+    def years(self):
+        return list(find_year_files(self.directory, archived=True))
+
+    def has_year(self, year):
+        data_file = self.data_file(year)
+        return os.path.exists(data_file) or os.path.exists(archive_file_for(data_file))
+
+    def is_archived(self, year):
+        return self.archive(year) is not None
+
+    def _check_writable(self, year):
+        if self.is_archived(year):
+            raise PermissionError(f"{year} is archived and can't be changed")
+
+    def _write_lock(self, year):
+        # Appends only need the journal itself; rewriting the year file needs
+        # every lock, so no other writer can slip in between read and write
+        journal = self.journal(year)
+        return journal.locked() if self.journaled else journal.transaction()
+
+    def load_raw(self, year):
+        """The year's data exactly as stored in JSON, journal included"""
+        return self.journal(year).load()
+
+    def load_year(self, year):
+        archive = self.archive(year)
+        if archive is not None:
+            return archive.load_year()
+        return {int(month): {int(day): load_entries(entries) for day, entries in month_data.items()}
+                for month, month_data in self.load_raw(year).items()}
+
+    def _stamp(self, year):
+        # Cached values for a year depend on the snapshot and both journal files
+        journal = self.journal(year)
+        return file_stamp(journal.data_file, journal.journal_file, journal.rotated_file)
+
+    def _cache_key(self, kind, year, *rest):
+        return (kind, os.path.abspath(self.data_file(year))) + rest
+
+    def load_month(self, year, month):
+        archive = self.archive(year)
+        if archive is not None:
+            # Reading from the mapped file is as cheap as a cache lookup
+            return archive.month(month)
+        key = self._cache_key("month", year, month)
+        stamp = self._stamp(year)
+        days = self.cache.get(key, stamp)
+        if days is None:
+            # Only this month's part of the year file is read and parsed
+            month_data = self.journal(year).load_month(month)
+            days = {int(day): load_entries(entries) for day, entries in month_data.items()}
+            self.cache.put(key, stamp, days, month_cost(days))
+        # Callers edit the lists they get back, so never hand out the cached ones
+        return {day: list(entries) for day, entries in days.items()}
+
+    def save_day(self, year, month, day, entries, base=None):
+        self.save_days(year, month, {day: entries}, None if base is None else {day: base})
+
+    def save_days(self, year, month, days, base=None):
+        self._check_writable(year)
+        with self._write_lock(year):
+            stamp = self._stamp(year)
+            if self.journaled:
+                if base is not None:
+                    days = _rebase(year, month, days, base, self.load_month(year, month))
+            else:
+                all_data = self.load_raw(year)
+                month_data = all_data.setdefault(str(month), {})
+                if base is not None:
+                    current = {day: load_entries(month_data[str(day)]) for day in days if str(day) in month_data}
+                    days = _rebase(year, month, days, base, current)
+            # The cached totals are shared by every reader of the year, so
+            # they are only replaced once the write has succeeded
+            totals = self.load_totals(year).copy()
+            totals.months.setdefault(month, 0)
+            for day, entries in days.items():
+                totals.set_day(month, day, merged_minutes(entries))
+            cached = self.cache.get(self._cache_key("month", year, month), stamp)
+
+            if self.journaled:
+                self.journal(year).extend([(month, day, dump_entries(entries)) for day, entries in days.items()])
+            else:
+                for day, entries in days.items():
+                    month_data[str(day)] = dump_entries(entries)
+                self._write(year, all_data, totals)
+
+            if cached is not None:
+                cached = dict(cached)
+                cached.update((day, list(entries)) for day, entries in days.items())
+            self._after_write(year, month, stamp, totals, cached)
+
+    def save_month(self, year, month, days):
+        self._check_writable(year)
+        with self._write_lock(year):
+            stamp = self._stamp(year)
+            totals = self.load_totals(year).copy()
+            totals.months.setdefault(month, 0)
+            for day in set(totals.month_days(month)) | set(days):
+                totals.set_day(month, day, merged_minutes(days.get(day, [])))
+            cached = self.cache.get(self._cache_key("month", year, month), stamp)
+
+            if self.journaled:
+                self.journal(year).extend([(month, day, dump_entries(entries)) for day, entries in days.items()])
+                # Days not passed in keep whatever the journal already had
+                if cached is not None:
+                    cached = dict(cached)
+                    cached.update(days)
+                days = cached
+            else:
+                # Load existing data first to avoid overwriting other months
+                all_data = self.load_raw(year)
+                all_data[str(month)] = {str(day): dump_entries(entries) for day, entries in days.items()}
+                self._write(year, all_data, totals)
+
+            if days is not None:
+                days = {day: list(entries) for day, entries in days.items()}
+            self._after_write(year, month, stamp, totals, days)
+
+    def _write(self, year, all_data, totals):
+        data_file = self.data_file(year)
+        self.journal(year).replace_snapshot(all_data)
+        totals.save(totals_file_for(data_file), data_file)
+
+    def _after_write(self, year, month, old_stamp, totals, days):
+        # Our own write only changed this month, so everything else cached for
+        # the year is still valid under the new file stamps
+        new_stamp = self._stamp(year)
+        path = os.path.abspath(self.data_file(year))
+        self.cache.restamp(lambda key: key[1] == path, old_stamp, new_stamp)
+        self.cache.put(self._cache_key("totals", year), new_stamp, totals, DAY_COST * len(totals.days))
+        month_key = self._cache_key("month", year, month)
+        if days is None:
+            self.cache.invalidate(month_key)
+        else:
+            self.cache.put(month_key, new_stamp, days, month_cost(days))
+
+    def load_totals(self, year):
+        archive = self.archive(year)
+        key = self._cache_key("totals", year)
+        stamp = file_stamp(archive.path) if archive is not None else self._stamp(year)
+        totals = self.cache.get(key, stamp)
+        if totals is None:
+            if archive is not None:
+                totals = archive.totals()
+            else:
+                totals = load_year_totals(self.data_file(year), self.journal(year))
+            # Rebuilding may have written the totals file, but not the data it is keyed on
+            self.cache.put(key, stamp, totals, DAY_COST * len(totals.days))
+        return totals
+
+    def verify_totals(self, year, repair=False):
+        archive = self.archive(year)
+        if archive is not None:
+            # The stored day minutes can be checked, but not rewritten
+            actual = YearTotals.from_months(archive.load_year())
+            return archive.totals().compare(actual)
+        drift = verify_year_totals(self.data_file(year), self.journal(year), repair=repair)
+        if drift and repair:
+            self.cache.invalidate(self._cache_key("totals", year))
+        return drift
+
+    def close(self):
+        for journal in self._journals.values():
+            journal.close()
+        for _, archive in self._archives.values():
+            archive.close()
+        self._archives = {}
+
+
+class ShardedStore(Store):
+    """One JSON file per month: dtr_data_YEAR/MM.json in a directory.
+
+    Each month file holds the month's entries and its day totals, so a
+    write only reads and rewrites one small file.  Writers take the
+    month's MM.lock exclusively around that read-modify-write and replace
+    the file by renaming a temp copy over it, so processes editing the
+    same month take turns, processes editing different months never wait
+    on each other, and readers never see a half-written file.
+
+    New years are sharded.  A year already kept as a dtr_data_YEAR.json
+    file or archive, and without a dtr_data_YEAR/ directory, stays there
+    and is read and written through a JSONStore on the same directory
+    (journaled as asked), so existing records need no conversion.
+    """
+
+    def __init__(self, directory=".", cache=None, journaled=False):
+        self.directory = directory
+        self.cache = cache if cache is not None else year_cache
+        self.year_files = JSONStore(directory, journaled=journaled, cache=self.cache)
+
+    def _sharded(self, year):
+        return os.path.isdir(self.year_dir(year)) or not self.year_files.has_year(year)
+
+    def year_dir(self, year):
+        return os.path.join(self.directory, f"dtr_data_{year}")
+
+    def month_file(self, year, month):
+        return os.path.join(self.year_dir(year), f"{month:02d}.json")
+
+    def years(self):
+        return list(find_year_files(self.directory, archived=True, sharded=True))
+
+    def has_year(self, year):
+        return os.path.isdir(self.year_dir(year)) or self.year_files.has_year(year)
+
+    def is_archived(self, year):
+        return not self._sharded(year) and self.year_files.is_archived(year)
+
+    def _month_lock(self, year, month):
+        return lock_for(os.path.splitext(self.month_file(year, month))[0] + ".lock")
+
+    def _year_stamp(self, year):
+        return file_stamp(*(self.month_file(year, month) for month in range(1, 13)))
+
+    def _totals_key(self, year):
+        return ("shard totals", os.path.abspath(self.year_dir(year)))
+
+    def load_month(self, year, month):
+        if not self._sharded(year):
+            return self.year_files.load_month(year, month)
+        path = self.month_file(year, month)
+        key = ("shard", os.path.abspath(path))
+        stamp = file_stamp(path)
+        days = self.cache.get(key, stamp)
+        if days is None:
+            raw = read_snapshot(path).get("days", {})
+            days = {int(day): load_entries(entries) for day, entries in raw.items()}
+            self.cache.put(key, stamp, days, month_cost(days))
+        return {day: list(entries) for day, entries in days.items()}
+
+    def load_year(self, year):
+        if not self._sharded(year):
+            return self.year_files.load_year(year)
+        return {month: self.load_month(year, month) for month in range(1, 13)
+                if os.path.exists(self.month_file(year, month))}
+
+    def load_totals(self, year):
+        if not self._sharded(year):
+            return self.year_files.load_totals(year)
+        key = self._totals_key(year)
+        stamp = self._year_stamp(year)
+        totals = self.cache.get(key, stamp)
+        if totals is None:
+            totals = YearTotals()
+            for month in range(1, 13):
+                path = self.month_file(year, month)
+                if os.path.exists(path):
+                    totals.months.setdefault(month, 0)
+                    for day, minutes in read_snapshot(path).get("minutes", {}).items():
+                        totals.set_day(month, int(day), minutes)
+            self.cache.put(key, stamp, totals, DAY_COST * len(totals.days))
+        return totals
+
+    def save_day(self, year, month, day, entries, base=None):
+        self.save_days(year, month, {day: entries}, None if base is None else {day: base})
+
+    def save_days(self, year, month, days, base=None):
+        if self._sharded(year):
+            self._update(year, month, days, False, base)
+        else:
+            self.year_files.save_days(year, month, days, base)
+
+    def save_month(self, year, month, days):
+        if self._sharded(year):
+            self._update(year, month, days, True)
+        else:
+            self.year_files.save_month(year, month, days)
+
+    def _update(self, year, month, days, replace, base=None):
+        path = self.month_file(year, month)
+        os.makedirs(self.year_dir(year), exist_ok=True)
+        with self._month_lock(year, month).hold():
+            year_stamp = self._year_stamp(year)
+            totals = self.cache.get(self._totals_key(year), year_stamp)
+            data = {} if replace else read_snapshot(path)
+            raw, minutes = data.setdefault("days", {}), data.setdefault("minutes", {})
+            if base is not None:
+                current = {day: load_entries(raw[str(day)]) for day in days if str(day) in raw}
+                days = _rebase(year, month, days, base, current)
+            for day, entries in days.items():
+                raw[str(day)] = dump_entries(entries)
+                minutes[str(day)] = merged_minutes(entries)
+            write_atomic(path, data)
+
+            if totals is not None:
+                # Only this month changed, so the cached totals stay valid
+                # for the other eleven files as they were before the write
+                totals.months.setdefault(month, 0)
+                for day in set(totals.month_days(month)) | {int(day) for day in minutes}:
+                    totals.set_day(month, day, minutes.get(str(day), 0))
+                stamp = list(year_stamp)
+                stamp[month - 1] = file_stamp(path)[0]
+                self.cache.put(self._totals_key(year), tuple(stamp), totals, DAY_COST * len(totals.days))
+
+    def verify_totals(self, year, repair=False):
+        if not self._sharded(year):
+            return self.year_files.verify_totals(year, repair=repair)
+        actual = YearTotals.from_months(self.load_year(year))
+        drift = self.load_totals(year).compare(actual)
+        if drift and repair:
+            for month in actual.months:
+                with self._month_lock(year, month).hold():
+                    path = self.month_file(year, month)
+                    data = read_snapshot(path)
+                    data["minutes"] = {day: merged_minutes(load_entries(entries))
+                                       for day, entries in data.get("days", {}).items()}
+                    write_atomic(path, data)
+            self.cache.invalidate(self._totals_key(year))
+        return drift
+
+    def close(self):
+        self.year_files.close()
+
+
+class SQLiteStore(Store):
+    """All employees and years in one SQLite database.
+
+    Entries are indexed by (employee, year, month, day).  Day totals live in
+    their own table and are written in the same transaction as the entries.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS entries (
+            employee  TEXT    NOT NULL,
+            year      INTEGER NOT NULL,
+            month     INTEGER NOT NULL,
+            day       INTEGER NOT NULL,
+            seq       INTEGER NOT NULL,
+            start_min INTEGER NOT NULL,
+            end_min   INTEGER NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS entries_by_date
+            ON entries (employee, year, month, day, seq);
+        CREATE TABLE IF NOT EXISTS day_totals (
+            employee TEXT    NOT NULL,
+            year     INTEGER NOT NULL,
+            month    INTEGER NOT NULL,
+            day      INTEGER NOT NULL,
+            minutes  INTEGER NOT NULL,
+            PRIMARY KEY (employee, year, month, day)
+        ) WITHOUT ROWID;
+    """
+
+    # Statements are constant strings so sqlite3 reuses their prepared form
+    SELECT_YEAR = ("SELECT month, day, start_min, end_min FROM entries "
+                   "WHERE employee = ? AND year = ? ORDER BY month, day, seq")
+    SELECT_MONTH = ("SELECT day, start_min, end_min FROM entries "
+                    "WHERE employee = ? AND year = ? AND month = ? ORDER BY day, seq")
+    SELECT_TOTALS = "SELECT month, day, minutes FROM day_totals WHERE employee = ? AND year = ?"
+    SELECT_YEARS = "SELECT DISTINCT year FROM day_totals WHERE employee = ? ORDER BY year"
+    SELECT_HAS_YEAR = "SELECT 1 FROM day_totals WHERE employee = ? AND year = ? LIMIT 1"
+    SELECT_EMPLOYEES = "SELECT DISTINCT employee FROM day_totals ORDER BY employee"
+    DELETE_DAY = "DELETE FROM entries WHERE employee = ? AND year = ? AND month = ? AND day = ?"
+    DELETE_MONTH = "DELETE FROM entries WHERE employee = ? AND year = ? AND month = ?"
+    DELETE_MONTH_TOTALS = "DELETE FROM day_totals WHERE employee = ? AND year = ? AND month = ?"
+    INSERT_ENTRY = ("INSERT INTO entries (employee, year, month, day, seq, start_min, end_min) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)")
+    UPSERT_TOTAL = ("INSERT OR REPLACE INTO day_totals (employee, year, month, day, minutes) "
+                    "VALUES (?, ?, ?, ?, ?)")
+
+    # Seconds to wait for another connection's lock before giving up
+    BUSY_TIMEOUT = 5.0
+
+    def __init__(self, path="dtr_data.sqlite3", employee="default", conn=None):
+        self.path = path
+        self.employee = employee
+        self._owns_conn = conn is None
+        if conn is None:
+            # Imported here so JSON-only users never load the sqlite3 module
+            import sqlite3
+            conn = sqlite3.connect(path, timeout=self.BUSY_TIMEOUT)
+            # WAL lets readers run alongside a writer and makes each commit a cheap append
+            self._set_wal(conn)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(self.SCHEMA)
+        self.conn = conn
+        self._totals = {}
+        self._data_version = None
+
+    def _set_wal(self, conn):
+        # Processes opening a new database at once race to switch it to WAL,
+        # and SQLite can report that as locked without waiting, so retry
+        import sqlite3
+
+        deadline = time.monotonic() + self.BUSY_TIMEOUT
+        while True:
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                return
+            except sqlite3.OperationalError as e:
+                if "locked" not in str(e) or time.monotonic() > deadline:
+                    raise
+                time.sleep(0.01)
+
+    def for_employee(self, employee):
+        """A store for another employee sharing this store's connection"""
+        return SQLiteStore(self.path, employee, conn=self.conn)
+
+    def employees(self):
+        """Every employee with records in the database"""
+        return [employee for employee, in self.conn.execute(self.SELECT_EMPLOYEES)]
+
+    def years(self):
+        return [year for year, in self.conn.execute(self.SELECT_YEARS, (self.employee,))]
+
+    def has_year(self, year):
+        return self.conn.execute(self.SELECT_HAS_YEAR, (self.employee, year)).fetchone() is not None
+
+    def load_year(self, year):
+        months = {}
+        for month, day, start, end in self.conn.execute(self.SELECT_YEAR, (self.employee, year)):
+            months.setdefault(month, {}).setdefault(day, []).append(Entry(start, end))
+        # Months and days that were saved empty still exist in the totals table
+        for month, day, _ in self.conn.execute(self.SELECT_TOTALS, (self.employee, year)):
+            months.setdefault(month, {}).setdefault(day, [])
+        return months
+
+    def load_month(self, year, month):
+        days = {}
+        for day, start, end in self.conn.execute(self.SELECT_MONTH, (self.employee, year, month)):
+            days.setdefault(day, []).append(Entry(start, end))
+        return days
+
+    def _entry_rows(self, year, month, day, entries):
+        return [(self.employee, year, month, day, seq, entry.start, entry.end)
+                for seq, entry in enumerate(entries)]
+
+    def save_day(self, year, month, day, entries, base=None):
+        self.save_days(year, month, {day: entries}, None if base is None else {day: base})
+
+    def save_days(self, year, month, days, base=None):
+        with self.conn:
+            if base is not None:
+                # Take the write lock before reading, so no other writer gets in between
+                if not self.conn.in_transaction:
+                    self.conn.execute("BEGIN IMMEDIATE")
+                current = {day: entries for day, entries in self.load_month(year, month).items() if day in days}
+                days = _rebase(year, month, days, base, current)
+            minutes = {day: merged_minutes(entries) for day, entries in days.items()}
+            for day, entries in days.items():
+                self.conn.execute(self.DELETE_DAY, (self.employee, year, month, day))
+                self.conn.executemany(self.INSERT_ENTRY, self._entry_rows(year, month, day, entries))
+                self.conn.execute(self.UPSERT_TOTAL, (self.employee, year, month, day, minutes[day]))
+        if year in self._totals:
+            self._totals[year].months.setdefault(month, 0)
+            for day, day_minutes in minutes.items():
+                self._totals[year].set_day(month, day, day_minutes)
+
+    def save_month(self, year, month, days):
+        self.save_months(year, {month: days})
+
+    def save_months(self, year, months):
+        """Replace several months of a year in a single transaction"""
+        with self.conn:
+            for month, days in months.items():
+                key = (self.employee, year, month)
+                self.conn.execute(self.DELETE_MONTH, key)
+                self.conn.execute(self.DELETE_MONTH_TOTALS, key)
+                self.conn.executemany(self.INSERT_ENTRY, [
+                    row for day, entries in days.items()
+                    for row in self._entry_rows(year, month, day, entries)
+                ])
+                self.conn.executemany(self.UPSERT_TOTAL, [
+                    key + (day, merged_minutes(entries)) for day, entries in days.items()
+                ])
+        # Month totals are simplest to rebuild from the table after a bulk write
+        self._totals.pop(year, None)
+
+    def _check_data_version(self):
+        # data_version changes whenever another connection, in this process
+        # or another, commits; our own writes keep the totals up to date
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version != self._data_version:
+            self._totals = {}
+            self._data_version = version
+
+    def load_totals(self, year):
+        self._check_data_version()
+        if year not in self._totals:
+            totals = YearTotals()
+            for month, day, minutes in self.conn.execute(self.SELECT_TOTALS, (self.employee, year)):
+                totals.months.setdefault(month, 0)
+                totals.set_day(month, day, minutes)
+            self._totals[year] = totals
+        return self._totals[year]
+
+    def verify_totals(self, year, repair=False):
+        actual = YearTotals.from_months(self.load_year(year))
+        drift = self.load_totals(year).compare(actual)
+        if drift and repair:
+            with self.conn:
+                self.conn.executemany(self.UPSERT_TOTAL, [
+                    (self.employee, year, month, day, minutes)
+                    for (month, day), minutes in actual.days.items()
+                ])
+            self._totals[year] = actual
+        return drift
+
+    def close(self):
+        if self._owns_conn:
+            self.conn.close()
@@ -0,0 +1,165 @@
+import time
+
+# Rows kept in the Treeview below the last visible one, so a partly shown
+# row at the bottom edge is still drawn
+OVERSCAN = 2
+
+# Rows moved per mouse wheel notch
+WHEEL_ROWS = 3
+
+# Shift and Control bits of a Tk event's state
+_EXTEND_SELECTION = 0x0001 | 0x0004
+
+
+class VirtualTable:
+    """Show a long list of rows in a ttk.Treeview, materializing only the visible ones.
+
+    Rows are identified by stable string keys, which double as Treeview
+    item ids.  set_rows compares the new key list against the current one,
+    so only rows that are new get formatted, and render() only inserts,
+    moves or deletes the Treeview items that differ from what is on
+    screen.  The scrollbar and mouse wheel move a window over the full
+    list instead of scrolling the Treeview itself, and the selection is
+    kept per key so it survives rows being scrolled out of the window.
+    """
+
+    def __init__(self, tree, scrollbar):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        self.keys = []
+        self.first = 0
+        # Seconds taken by the most recent render, for measuring redraws
+        self.last_redraw = 0.0
+        self._values = {}
+        self._shown = {}
+        self._selected = set()
+        self._replace_selection = False
+
+        scrollbar.configure(command=self.yview)
+        tree.bind("<Configure>", lambda event: self.render())
+        tree.bind("<<TreeviewSelect>>", self._on_select)
+        tree.bind("<ButtonPress-1>", self._on_press, add=True)
+        tree.bind("<KeyPress>", self._on_press, add=True)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            tree.bind(sequence, self._on_wheel)
+
+    def set_rows(self, keys, format_row):
+        """Replace the table's rows with keys, in display order.
+
+        format_row(key) returns the column values for a key and is only
+        called for keys the table hasn't seen before or that were passed
+        to invalidate.
+        """
+        values = {}
+        for key in keys:
+            row = self._values.get(key)
+            values[key] = row if row is not None else tuple(format_row(key))
+        self.keys = list(keys)
+        self._values = values
+        self._selected.intersection_update(values)
+        self.render()
+
+    def invalidate(self, keys):
+        """Forget the values of rows whose contents changed under the same key"""
+        for key in keys:
+            self._values.pop(key, None)
+
+    def row_values(self, key):
+        return self._values[key]
+
+    def selection(self):
+        """Selected keys in display order, including ones scrolled out of view"""
+        return [key for key in self.keys if key in self._selected]
+
+    def see(self, key):
+        """Scroll so the row for key is in the window"""
+        index = self.keys.index(key)
+        visible = self.visible_rows()
+        if index < self.first:
+            self.first = index
+        elif index >= self.first + visible:
+            self.first = index - visible + 1
+        self.render()
+
+    def visible_rows(self):
+        """Number of rows that fit in the Treeview at its current size"""
+        children = self.tree.get_children()
+        height = self.tree.winfo_height()
+        if children and height > 1:
+            bbox = self.tree.bbox(children[0])
+            if bbox:
+                top, row_height = bbox[1], bbox[3]
+                return max(1, (height - top) // row_height)
+        # Not drawn yet, so fall back to the height it was configured with
+        return int(self.tree.cget("height"))
+
+    def render(self):
+        """Bring the Treeview items in line with the current window of rows"""
+        started = time.perf_counter()
+        tree = self.tree
+        visible = self.visible_rows()
+        self.first = max(0, min(self.first, len(self.keys) - visible))
+        window = self.keys[self.first:self.first + visible + OVERSCAN]
+        wanted = set(window)
+
+        current = tree.get_children()
+        stale = [key for key in current if key not in wanted]
+        if stale:
+            tree.delete(*stale)
+            for key in stale:
+                del self._shown[key]
+        shown = [key for key in current if key in wanted]
+
+        for index, key in enumerate(window):
+            values = self._values[key]
+            if key not in self._shown:
+                tree.insert("", index, iid=key, values=values)
+                shown.insert(index, key)
+            else:
+                if shown[index] != key:
+                    tree.move(key, "", index)
+                    shown.remove(key)
+                    shown.insert(index, key)
+                if self._shown[key] != values:
+                    tree.item(key, values=values)
+            self._shown[key] = values
+
+        selected = [key for key in window if key in self._selected]
+        if set(selected) != set(tree.selection()):
+            tree.selection_set(selected)
+        # Items past the visible ones must never scroll the Treeview itself
+        tree.yview_moveto(0)
+
+        if self.keys:
+            total = len(self.keys)
+            self.scrollbar.set(self.first / total, min(1.0, (self.first + visible) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+        self.last_redraw = time.perf_counter() - started
+
+    def yview(self, *args):
+        """Scrollbar command: moveto FRACTION or scroll N units|pages"""
+        if args[0] == "moveto":
+            self.first = int(float(args[1]) * len(self.keys))
+        elif args[0] == "scroll":
+            step = self.visible_rows() if args[2] == "pages" else 1
+            self.first += int(args[1]) * step
+        self.render()
+
+    def _on_wheel(self, event):
+        up = event.num == 4 or getattr(event, "delta", 0) > 0
+        self.yview("scroll", -WHEEL_ROWS if up else WHEEL_ROWS, "units")
+        return "break"
+
+    def _on_press(self, event):
+        # A plain click or arrow key replaces the selection; with Shift or
+        # Control it extends it, and rows outside the window stay selected
+        self._replace_selection = not event.state & _EXTEND_SELECTION
+
+    def _on_select(self, event):
+        in_tree = set(self.tree.selection())
+        if self._replace_selection:
+            self._selected = in_tree
+            self._replace_selection = False
+        else:
+            self._selected = (self._selected - self._shown.keys()) | in_tree
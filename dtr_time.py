@@ -0,0 +1,279 @@
+import bisect
+import calendar
+import collections
+import datetime
+import functools
+import itertools
+import re
+
+from dtr_profile import count
+
+# Same grammar strptime builds for "%I:%M %p": hour 1-12 (optionally
+# zero-padded), one or two minute digits, any whitespace, am/pm in any case
+_TIME_RE = re.compile(r"(1[0-2]|0[1-9]|[1-9]):([0-5]\d|\d)\s+([ap])m", re.IGNORECASE)
+
+# An entry that ends at midnight ends here, at the close of its own day.
+# It is written "12:00 am" like the start of the day, which as an end time
+# can only mean this.
+END_OF_DAY = 24 * 60
+
+# Real data only contains a few thousand distinct spellings, so a bounded
+# cache turns almost every parse into a dictionary lookup
+PARSE_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_minutes(t):
+    # Only runs on a cache miss, so this counts real parses
+    count("times parsed")
+    match = _TIME_RE.fullmatch(t)
+    if match is None:
+        return None
+    hour, minute, half = match.groups()
+    minutes = (int(hour) % 12) * 60 + int(minute)
+    if half in "pP":
+        minutes += 12 * 60
+    return minutes
+
+
+def parse_minutes(t):
+    """Parse a 12-hour time string into minutes since midnight, or None if invalid"""
+    if not isinstance(t, str):
+        return None
+    return _parse_minutes(t)
+
+
+def parse_end_minutes(t):
+    """Like parse_minutes, for an end time: 12:00 am is the midnight that ends the day"""
+    minutes = parse_minutes(t)
+    return END_OF_DAY if minutes == 0 else minutes
+
+
+def parse_datetime(t):
+    """Parse a 12-hour time string into the datetime strptime would return, or None"""
+    minutes = parse_minutes(t)
+    if minutes is None:
+        return None
+    hour, minute = divmod(minutes, 60)
+    return datetime.datetime(1900, 1, 1, hour, minute)
+
+
+def format_minutes(minutes):
+    """Format minutes since midnight as a 12-hour time string"""
+    hour, minute = divmod(minutes % END_OF_DAY, 60)
+    suffix = "am" if hour < 12 else "pm"
+    return f"{hour % 12 or 12}:{minute:02d} {suffix}"
+
+
+# Source of Entry.id; ids are unique for the life of the process
+_entry_ids = itertools.count(1)
+
+
+class Entry:
+    """A time entry kept as minute-of-day integers instead of strings.
+
+    Each entry also gets an id when it is created, which stays the same
+    however the day's list is edited, so views can track rows by it.
+    """
+    __slots__ = ("start", "end", "id")
+
+    def __init__(self, start, end):
+        self.start = start
+        self.end = end
+        self.id = next(_entry_ids)
+
+    @classmethod
+    def from_strings(cls, start, end):
+        """Build an entry from time strings, or return None if either is invalid"""
+        start_min = parse_minutes(start)
+        end_min = parse_end_minutes(end)
+        if start_min is None or end_min is None:
+            return None
+        return cls(start_min, end_min)
+
+    @property
+    def minutes(self):
+        """Worked minutes, ignoring entries that end before they start"""
+        return self.end - self.start if self.end > self.start else 0
+
+    @property
+    def start_text(self):
+        return format_minutes(self.start)
+
+    @property
+    def end_text(self):
+        return format_minutes(self.end)
+
+    def __lt__(self, other):
+        # Orders a day's entries by start time, so bisect can keep them sorted
+        return (self.start, self.end) < (other.start, other.end)
+
+    def __iter__(self):
+        # Unpacks like the old (start, end) string tuples
+        yield self.start_text
+        yield self.end_text
+
+    def __repr__(self):
+        return f"Entry({self.start_text!r}, {self.end_text!r})"
+
+
+def load_entries(raw_entries):
+    """Parse a day's [[start, end], ...] list from JSON, dropping invalid pairs"""
+    count("entries loaded", len(raw_entries))
+    entries = []
+    for start, end in raw_entries:
+        entry = Entry.from_strings(start, end)
+        if entry is not None:
+            entries.append(entry)
+    return entries
+
+
+def dump_entries(entries):
+    """Convert a day's entries back into JSON-friendly [start, end] lists"""
+    return [[entry.start_text, entry.end_text] for entry in entries]
+
+
+def union_minutes(intervals):
+    """Minutes covered by (start, end) pairs, counting overlapping time once"""
+    total = 0
+    reach = None
+    for start, end in sorted(intervals):
+        if end <= start:
+            continue
+        if reach is None or start >= reach:
+            total += end - start
+            reach = end
+        elif end > reach:
+            total += end - reach
+            reach = end
+    return total
+
+
+def merged_minutes(entries):
+    """Worked minutes for a day's entries, counting overlapping sessions once"""
+    return union_minutes((entry.start, entry.end) for entry in entries)
+
+
+def normalize_day(entries):
+    """Sort a day list in place and merge sessions that overlap.
+
+    The helpers below need days sorted and free of overlaps, which files
+    written before that was enforced may not be.  Merging doesn't change
+    the hours, since overlapping time was only ever counted once.
+    Returns the number of sessions merged away.
+    """
+    entries.sort()
+    if all(a.end <= b.start for a, b in zip(entries, entries[1:])):
+        return 0
+    merged = []
+    for entry in entries:
+        if merged and entry.start < merged[-1].end:
+            if entry.end > merged[-1].end:
+                merged[-1] = Entry(merged[-1].start, entry.end)
+        else:
+            merged.append(entry)
+    removed = len(entries) - len(merged)
+    entries[:] = merged
+    return removed
+
+
+def _overlapping(entries, entry):
+    # Slice of a sorted, non-overlapping day list that overlaps entry (see
+    # normalize_day for lists read from older files).  Ends
+    # are sorted along with starts, so only the entry just before the
+    # insertion point can reach into it from the left.
+    i = bisect.bisect_left(entries, entry)
+    low = i - 1 if i and entries[i - 1].end > entry.start else i
+    high = i
+    while high < len(entries) and entries[high].start < entry.end:
+        high += 1
+    return low, high
+
+
+def find_overlap(entries, entry):
+    """Return an entry of the sorted day list that overlaps entry, or None"""
+    low, high = _overlapping(entries, entry)
+    return entries[low] if low < high else None
+
+
+def insert_entry(entries, entry, merge=False):
+    """Insert entry into a sorted day list in O(log n) comparisons.
+
+    Sessions that overlap it are rejected by returning None, or with
+    merge=True replaced by one session spanning all of them.  Returns the
+    entry that ended up in the list.
+    """
+    low, high = _overlapping(entries, entry)
+    if low == high:
+        entries.insert(low, entry)
+        return entry
+    if not merge:
+        return None
+    first, last = entries[low], entries[high - 1]
+    if high - low == 1 and first.start <= entry.start and first.end >= entry.end:
+        # Already covered, e.g. a punch clock sending the same session twice
+        return first
+    merged = Entry(min(first.start, entry.start), max(last.end, entry.end))
+    entries[low:high] = [merged]
+    return merged
+
+
+def rebase_day(current, base, new):
+    """Apply the change from base to new on top of current.
+
+    For a day another writer may have saved since this one read it as
+    base: sessions removed from base are removed from current and
+    sessions added are inserted into it, so both writers' edits are kept.
+    Returns the new sorted day list, or None if an added session overlaps
+    one the other writer added.
+    """
+    current = sorted(current)
+    normalize_day(current)
+    key = lambda entry: (entry.start, entry.end)
+    if sorted(map(key, current)) == sorted(map(key, base)):
+        return list(new)
+    removed = collections.Counter(map(key, base))
+    removed.subtract(map(key, new))
+    added = collections.Counter(map(key, new))
+    added.subtract(map(key, base))
+
+    result = []
+    for entry in current:
+        if removed[key(entry)] > 0:
+            removed[key(entry)] -= 1
+        else:
+            result.append(entry)
+    for entry in new:
+        if added[key(entry)] <= 0:
+            continue
+        added[key(entry)] -= 1
+        existing = find_overlap(result, entry)
+        if existing is None:
+            insert_entry(result, entry)
+        elif key(existing) != key(entry):
+            return None
+        # else: the other writer added the very same session
+    return result
+
+
+def check_entry(start, end):
+    """Validate a pair of time strings, returning (Entry, "") or (None, error message)"""
+    entry = Entry.from_strings(start, end)
+    if entry is None:
+        return None, "Invalid time format. Use '12:00 am/pm' format."
+    if entry.end <= entry.start:
+        return None, "End time must be after start time."
+    return entry, ""
+
+
+@functools.lru_cache(maxsize=None)
+def days_in_month(year, month):
+    return calendar.monthrange(year, month)[1]
+
+
+def check_day(year, month, day):
+    """Return an error message if day is outside the month, else an empty string"""
+    days = days_in_month(year, month)
+    if not 1 <= day <= days:
+        return f"Invalid day. Must be between 1 and {days}."
+    return ""
@@ -0,0 +1,225 @@
+import itertools
+import json
+import os
+
+from dtr_cache import file_fingerprint
+from dtr_journal import read_snapshot, write_atomic
+from dtr_profile import count, span
+from dtr_time import load_entries, merged_minutes
+
+
+# Bumped whenever the way day totals are computed changes, so totals files
+# written by older versions are rebuilt.  2: overlapping sessions count once.
+# 3: sessions can end at midnight.
+TOTALS_VERSION = 3
+
+# The cumulative day index gives every month 31 slots, so a day's position
+# is the same in every year, leap or not
+DAY_SLOTS = 12 * 31
+
+
+def _slot(month, day):
+    return (month - 1) * 31 + day - 1
+
+
+def totals_file_for(data_file):
+    """Path of the running totals file kept next to a year data file"""
+    directory, name = os.path.split(os.path.splitext(data_file)[0])
+    return os.path.join(directory, name.replace("dtr_data_", "dtr_totals_", 1) + ".json")
+
+
+def _day_minutes(raw_entries):
+    return merged_minutes(load_entries(raw_entries))
+
+
+class YearTotals:
+    """Running worked-minute totals per day, month and year"""
+
+    def __init__(self):
+        self.days = {}
+        self.months = {}
+        self.year = 0
+        # Minutes worked before each day slot, built on the first range query
+        self._cumulative = None
+
+    @classmethod
+    def from_data(cls, all_data):
+        """Compute totals from scratch from raw year data"""
+        totals = cls()
+        for month_key, month_data in all_data.items():
+            month = int(month_key)
+            totals.months.setdefault(month, 0)
+            for day_key, entries in month_data.items():
+                totals.set_day(month, int(day_key), _day_minutes(entries))
+        return totals
+
+    @classmethod
+    def from_months(cls, months):
+        """Compute totals from scratch from {month: {day: [Entry, ...]}}"""
+        totals = cls()
+        for month, days in months.items():
+            totals.months.setdefault(month, 0)
+            for day, entries in days.items():
+                totals.set_day(month, day, merged_minutes(entries))
+        return totals
+
+    def copy(self):
+        """Independent totals with the same sums"""
+        totals = YearTotals()
+        totals.days = dict(self.days)
+        totals.months = dict(self.months)
+        totals.year = self.year
+        return totals
+
+    def set_day(self, month, day, minutes):
+        """Replace the total for one day and adjust the month and year sums"""
+        delta = minutes - self.days.get((month, day), 0)
+        self.days[(month, day)] = minutes
+        self.months[month] = self.months.get(month, 0) + delta
+        self.year += delta
+        if delta and self._cumulative is not None:
+            # Every cumulative sum after the day moves by the same amount
+            after = _slot(month, day) + 1
+            self._cumulative[after:] = [minutes + delta for minutes in self._cumulative[after:]]
+
+    def add(self, month, day, minutes):
+        """Add (or with a negative value, remove) minutes worked on a day"""
+        self.set_day(month, day, self.days.get((month, day), 0) + minutes)
+
+    def month_days(self, month):
+        """Days of a month that have a running total"""
+        return [day for m, day in self.days if m == month]
+
+    def day_minutes(self, month, day):
+        return self.days.get((month, day), 0)
+
+    def month_minutes(self, month):
+        return self.months.get(month, 0)
+
+    def minutes_between(self, first, last):
+        """Minutes worked from one (month, day) to another, both included.
+
+        Two lookups in the cumulative day index, whatever the range.
+        """
+        if self._cumulative is None:
+            per_slot = [0] * DAY_SLOTS
+            for (month, day), minutes in self.days.items():
+                per_slot[_slot(month, day)] += minutes
+            self._cumulative = list(itertools.accumulate(per_slot, initial=0))
+        return self._cumulative[_slot(*last) + 1] - self._cumulative[_slot(*first)]
+
+    def compare(self, other):
+        """List the differences between these totals and a reference"""
+        drift = []
+        for month, day in sorted(set(self.days) | set(other.days)):
+            stored, actual = self.day_minutes(month, day), other.day_minutes(month, day)
+            if stored != actual:
+                drift.append(f"Month {month} day {day}: stored {stored} min, actual {actual} min")
+        for month in sorted(set(self.months) | set(other.months)):
+            stored, actual = self.month_minutes(month), other.month_minutes(month)
+            if stored != actual:
+                drift.append(f"Month {month}: stored {stored} min, actual {actual} min")
+        if self.year != other.year:
+            drift.append(f"Year: stored {self.year} min, actual {other.year} min")
+        return drift
+
+    def save(self, totals_file, data_file):
+        """Persist the totals, tagged with the snapshot they describe"""
+        days = {}
+        for (month, day), minutes in self.days.items():
+            days.setdefault(str(month), {})[str(day)] = minutes
+        write_atomic(totals_file, {
+            # Identifies the exact snapshot the totals were computed from
+            "source": file_fingerprint(data_file),
+            "version": TOTALS_VERSION,
+            "year": self.year,
+            "months": {str(month): minutes for month, minutes in self.months.items()},
+            "days": days,
+        })
+
+    @classmethod
+    def load(cls, totals_file, data_file):
+        """Read persisted totals, or return None if missing or out of date"""
+        if not os.path.exists(totals_file):
+            return None
+        try:
+            with open(totals_file, 'rb') as f:
+                raw = f.read()
+            count("bytes read", len(raw))
+            saved = json.loads(raw)
+        except ValueError:
+            return None
+        if saved.get("source") != file_fingerprint(data_file) or saved.get("version") != TOTALS_VERSION:
+            return None
+
+        totals = cls()
+        totals.year = saved["year"]
+        totals.months = {int(month): minutes for month, minutes in saved["months"].items()}
+        for month_key, month_days in saved["days"].items():
+            for day_key, minutes in month_days.items():
+                totals.days[(int(month_key), int(day_key))] = minutes
+        return totals
+
+
+@span("load_year_totals")
+def load_year_totals(data_file, journal=None):
+    """Load totals for a year file, rebuilding and persisting them if stale.
+
+    Persisted totals describe the snapshot only; days touched by journal
+    records are recomputed on top of them.
+    """
+    totals_file = totals_file_for(data_file)
+    totals = YearTotals.load(totals_file, data_file)
+    if totals is None:
+        totals = YearTotals.from_data(read_snapshot(data_file))
+        try:
+            totals.save(totals_file, data_file)
+        except OSError:
+            # Read-only directory: the totals are just rebuilt again next time
+            pass
+
+    if journal is not None:
+        for month, day, entries in journal.records():
+            totals.months.setdefault(month, 0)
+            totals.set_day(month, day, _day_minutes(entries))
+    return totals
+
+
+def verify_year_totals(data_file, journal=None, repair=False):
+    """Recompute a year's totals from scratch and list any drift from the stored ones"""
+    stored = load_year_totals(data_file, journal)
+    data = journal.load() if journal is not None else read_snapshot(data_file)
+    drift = stored.compare(YearTotals.from_data(data))
+    if drift and repair:
+        YearTotals.from_data(read_snapshot(data_file)).save(totals_file_for(data_file), data_file)
+    return drift
+
+
+def main():
+    import argparse
+
+    from dtr_storage import ShardedStore
+
+    parser = argparse.ArgumentParser(description="Verify the running totals kept for a DTR year")
+    parser.add_argument("year", type=int)
+    parser.add_argument("--dir", default=".", help="records directory (default: current)")
+    parser.add_argument("--repair", action="store_true", help="rewrite the stored totals if drift is found")
+    args = parser.parse_args()
+
+    # Year files and month-sharded years alike
+    store = ShardedStore(args.dir)
+    try:
+        drift = store.verify_totals(args.year, repair=args.repair)
+    finally:
+        store.close()
+    for line in drift:
+        print(line)
+    if not drift:
+        print(f"Totals for {args.year} match the data.")
+    elif args.repair:
+        print("Totals rebuilt.")
+    raise SystemExit(1 if drift and not args.repair else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+import queue
+import threading
+import traceback
+
+# How often the Tk loop checks for finished jobs
+POLL_MS = 50
+
+
+class BackgroundWorker:
+    """Run jobs on one background thread and hand results back to the Tk loop.
+
+    Jobs run one at a time in the order they were submitted, so a store is
+    only ever used from this thread and a load queued after a save sees
+    that save.  Results go through a thread-safe queue that poll() drains
+    from root.after, which means on_done and on_error callbacks always run
+    on the Tk main thread and may touch widgets.
+    """
+
+    def __init__(self, root, poll_ms=POLL_MS):
+        self.root = root
+        self.poll_ms = poll_ms
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="dtr-worker", daemon=True)
+        self._thread.start()
+        self._poll_id = root.after(poll_ms, self._poll)
+
+    def submit(self, func, on_done=None, on_error=None):
+        """Queue func() to run in the background.
+
+        on_done(result) or on_error(exception) is called on the Tk thread
+        once it finishes.
+        """
+        self._jobs.put((func, on_done, on_error))
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            func, on_done, on_error = job
+            try:
+                result = func()
+            except Exception as e:
+                self._results.put((on_error, e, True))
+            else:
+                self._results.put((on_done, result, False))
+
+    def poll(self):
+        """Run the callbacks of every job that has finished"""
+        while True:
+            try:
+                callback, value, failed = self._results.get_nowait()
+            except queue.Empty:
+                return
+            if callback is not None:
+                callback(value)
+            elif failed:
+                traceback.print_exception(type(value), value, value.__traceback__)
+
+    def _poll(self):
+        self.poll()
+        self._poll_id = self.root.after(self.poll_ms, self._poll)
+
+    def close(self):
+        """Finish every queued job, then stop the thread.
+
+        Blocks until the queue is empty, so nothing submitted before close
+        is lost.  Callbacks of the last jobs are run before returning.
+        """
+        self.root.after_cancel(self._poll_id)
+        self._jobs.put(None)
+        self._thread.join()
+        self.poll()